@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Stdlib-only load generator for ``python -m score_function serve``.
+
+    python benchmarks/loadtest.py --target tcp:127.0.0.1:8080 --connections 16 --requests 2000
+    python benchmarks/loadtest.py --target unix:/run/sf.sock --pipeline 8 --batch 100
+
+Each connection is kept alive and sends ``--pipeline`` requests before reading
+their responses. Prints one JSON object with requests/sec and p50/p90/p99
+latency in milliseconds.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+async def _open(target: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    kind, _, address = target.partition(":")
+    if kind == "unix":
+        return await asyncio.open_unix_connection(address)
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host or "127.0.0.1", int(port))
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def _connection(target: str, request: bytes, count: int, pipeline: int, latencies: List[float]) -> int:
+    reader, writer = await _open(target)
+    errors = 0
+    sent = 0
+    while sent < count:
+        depth = min(pipeline, count - sent)
+        start = time.perf_counter()
+        writer.write(request * depth)
+        await writer.drain()
+        for _ in range(depth):
+            if await _read_response(reader) != 200:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        sent += depth
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    metrics = json.loads(Path(args.metrics).read_text())
+    payload = json.dumps([metrics] * args.batch if args.batch > 1 else metrics).encode()
+    request = (
+        f"POST /score HTTP/1.1\r\nHost: loadtest\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n"
+    ).encode() + payload
+    per_connection = max(1, args.requests // args.connections)
+    latencies: List[float] = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(
+        *(_connection(args.target, request, per_connection, args.pipeline, latencies) for _ in range(args.connections))
+    )
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    total = per_connection * args.connections
+    return {
+        "target": args.target,
+        "connections": args.connections,
+        "pipeline": args.pipeline,
+        "batch": args.batch,
+        "requests": total,
+        "errors": sum(errors),
+        "seconds": round(elapsed, 4),
+        "requests_per_sec": round(total / elapsed, 1),
+        "records_per_sec": round(total * args.batch / elapsed, 1),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50), 3),
+            "p90": round(_percentile(latencies, 0.90), 3),
+            "p99": round(_percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the Score Function server")
+    parser.add_argument("--target", default="tcp:127.0.0.1:8080", help="unix:PATH or tcp:HOST:PORT")
+    parser.add_argument("--metrics", default=str(ROOT / "examples" / "metrics.sample.json"))
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests across all connections")
+    parser.add_argument("--pipeline", type=int, default=1, help="Requests in flight per connection")
+    parser.add_argument("--batch", type=int, default=1, help="Metric sets per request body")
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Throughput of score_many() (or --stream scoring) from 1 to N worker processes.
+
+    python benchmarks/parallel_scaling.py --records 200000 --max-workers 8
+    python benchmarks/parallel_scaling.py --stream    # JSONL bytes in, JSONL text out
+
+Prints one JSON line per worker count with records/sec and speedup over 1.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from score_function import FACE_ORDER, FACE_TERMS, compile_config, load_config  # noqa: E402
+from score_function.parallel import DEFAULT_CHUNKSIZE, score_many  # noqa: E402
+from score_function.stream import score_lines  # noqa: E402
+
+
+def synthetic_records(count: int, seed: int) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        record: Dict[str, Any] = {
+            face: {metric: rng.random() for metric, _, _ in FACE_TERMS[face]} for face in FACE_ORDER
+        }
+        record["sec"]["critical_count"] = int(rng.random() < 0.05)
+        record["uncertainty_sigma"] = rng.random() * 0.3
+        yield record
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=str(ROOT / "score-function.yml"))
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--stream", action="store_true", help="Time score_lines() over encoded JSONL lines")
+    args = parser.parse_args()
+
+    config = compile_config(load_config(Path(args.config)))
+    records = list(synthetic_records(args.records, args.seed))
+    lines = [json.dumps(record).encode() + b"\n" for record in records] if args.stream else []
+    counts = sorted({1, args.max_workers} | {2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers})
+    baseline = None
+    for workers in counts:
+        start = time.perf_counter()
+        if args.stream:
+            score_lines(config, lines, io.StringIO(), print, workers=workers, chunksize=args.chunksize)
+        else:
+            for _ in score_many(config, records, workers=workers, chunksize=args.chunksize):
+                pass
+        elapsed = time.perf_counter() - start
+        rate = args.records / elapsed
+        baseline = baseline or rate
+        print(json.dumps({
+            "workers": workers,
+            "records": args.records,
+            "seconds": round(elapsed, 4),
+            "records_per_sec": round(rate, 1),
+            "speedup": round(rate / baseline, 2),
+        }))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
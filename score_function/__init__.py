@@ -2,15 +2,90 @@
 """Score Function calculator CLI (dependency-free)."""
 from __future__ import annotations
 
-import argparse
+import importlib
 import json
 import math
+import os
 import sys
-from pathlib import Path
-from typing import Any, Dict, Iterable, Tuple
+from types import MappingProxyType
+
+# Startup matters for one-shot CLI runs in CI: typing, pathlib, argparse,
+# hashlib and PyYAML are imported only where they are actually needed
+# (tests/test_startup.py keeps it that way).
+TYPE_CHECKING = False
+if TYPE_CHECKING:  # pragma: no cover
+    import argparse
+    from pathlib import Path
+    from typing import Any, Dict, Iterable, List, Mapping, Tuple
 
 FACE_ORDER = ("spec", "code", "test", "sec", "pr", "dep")
 
+# Linear terms per face as (metric key, weight key, inverted), in the order
+# compute_faces() sums them. Inverted terms contribute ``1 - clip(x)``.
+FACE_TERMS: Dict[str, Tuple[Tuple[str, str, bool], ...]] = {
+    "spec": (("RC", "RC", False), ("TR", "TR", False), ("AM", "AM_inv", True),
+             ("CN", "CN_inv", True), ("EX", "EX", False)),
+    "code": (("SA", "SA", False), ("CC", "CC_inv", True), ("DP", "DP_inv", True),
+             ("DE", "DE", False), ("DT", "DT", False), ("PF", "PF", False)),
+    "test": (("CV", "CV", False), ("MT", "MT", False), ("FL", "FL_inv", True),
+             ("SK", "SK_inv", True), ("ST", "ST", False)),
+    "sec": (("CVSS_sum", "VV", True), ("SE", "SE", False), ("dep_vulns", "DPV_inv", True),
+            ("AT", "AT", False), ("ML", "ML", False)),
+    "pr": (("RR", "RR", False), ("risk", "RK_inv", True), ("DV", "DV", False),
+           ("RB", "RB_inv", True), ("CI", "CI", False)),
+    "dep": (("SR", "SR", False), ("CFR", "CFR_inv", True), ("MT", "MT_inv", True),
+            ("RBK", "RBK_inv", True), ("PRG", "PRG_inv", True), ("EB", "EB_inv", True)),
+}
+
+# Multiplicative penalties per face as (scale, metric key, threshold key, inverted).
+# Inverted penalties feed ``1 - clip(x)`` into the logistic.
+FACE_PENALTIES: Dict[str, Tuple[Tuple[float, str, str, bool], ...]] = {
+    "spec": ((0.3, "AM", "ambig_tau", False), (0.3, "CN", "conflict_tau", False)),
+    "code": ((0.4, "CC", "cc_tau", False),),
+    "test": ((0.5, "MT", "low_mt_tau", True), (0.3, "CV", "low_cv_tau", True)),
+    "sec": (),
+    "pr": ((0.4, "risk", "risk_tau", False),),
+    "dep": ((0.5, "PRG", "perf_reg_tau", False), (0.3, "CFR", "cfr_tau", False)),
+}
+
+# Environment variable naming a directory for load_config()'s parse cache.
+CONFIG_CACHE_ENV = "SCORE_FUNCTION_CACHE_DIR"
+
+# Subcommands handled by ``python -m score_function <name> ...``, mapped to the
+# module whose ``main(argv)`` implements them. Imported only when used.
+SUBCOMMANDS: Dict[str, str] = {
+    "bench": "score_function.bench",
+    "calibrate": "score_function.calibrate",
+    "compile": "score_function.precompile",
+    "convert": "score_function.bulk",
+    "history": "score_function.history",
+    "montecarlo": "score_function.montecarlo",
+    "replay": "score_function.replay",
+    "rollup": "score_function.rollup",
+    "serve": "score_function.server",
+    "whatif": "score_function.sensitivity",
+}
+
+# Active hot-path instrumentation (see score_function.instrument); None keeps
+# every hook down to a single global check.
+_INSTRUMENTATION: Any = None
+
+# Security face multiplier once ``critical_count >= 1``.
+CRITICAL_FACTOR = 0.25
+
+# Flat metric names ("face.key") in MetricsInput order, used by columnar APIs.
+METRIC_COLUMNS: Tuple[str, ...] = tuple(
+    name
+    for face in FACE_ORDER
+    for name in (
+        *(f"{face}.{metric}" for metric, _, _ in FACE_TERMS[face]),
+        *(("sec.critical_count",) if face == "sec" else ()),
+    )
+) + ("uncertainty_sigma",)
+
+# Columns that may be omitted; they default to 0 like in score_function().
+OPTIONAL_COLUMNS = ("sec.critical_count", "uncertainty_sigma")
+
 
 def clip(value: float, lower: float = 0.0, upper: float = 1.0) -> float:
     """Clamp value into [lower, upper]."""
@@ -28,19 +103,78 @@ def penalty(scale: float, value: float, tau: float, k: float) -> float:
 
 
 def load_json(path: Path) -> Any:
+    if _INSTRUMENTATION is not None:
+        return _INSTRUMENTATION.time_call("load_json", _load_json, path)
+    return _load_json(path)
+
+
+def _load_json(path: Path | str) -> Any:
     try:
-        return json.loads(path.read_text())
+        with open(path, encoding="utf-8") as handle:
+            return json.loads(handle.read())
     except json.JSONDecodeError as exc:  # pragma: no cover - informative error
         raise SystemExit(f"Invalid JSON in {path}: {exc}")
+    except UnicodeDecodeError as exc:
+        raise SystemExit(f"Invalid JSON in {path}: {exc} (binary metrics files are read with --stream)")
+
+
+def _skip_spaces(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t":
+        pos += 1
+    return pos
+
+
+def _flow_value(text: str, pos: int, stops: str) -> Tuple[Any, int]:
+    """Parse one flow node starting at ``pos``; return ``(value, next_pos)``."""
+    pos = _skip_spaces(text, pos)
+    opener = text[pos]
+    if opener in "{[":
+        closer = "}" if opener == "{" else "]"
+        mapping: Dict[str, Any] = {}
+        sequence: list[Any] = []
+        pos = _skip_spaces(text, pos + 1)
+        if text[pos] == closer:
+            return (mapping if opener == "{" else sequence), pos + 1
+        while True:
+            if opener == "{":
+                key, pos = _flow_value(text, pos, ":")
+                pos = _skip_spaces(text, pos)
+                if text[pos] != ":":
+                    raise ValueError(f"expected ':' at column {pos + 1}")
+                mapping[str(key)], pos = _flow_value(text, pos + 1, ",}")
+            else:
+                item, pos = _flow_value(text, pos, ",]")
+                sequence.append(item)
+            pos = _skip_spaces(text, pos)
+            if text[pos] == closer:
+                return (mapping if opener == "{" else sequence), pos + 1
+            if text[pos] != ",":
+                raise ValueError(f"expected ',' or '{closer}' at column {pos + 1}")
+            pos += 1
+    if opener in "\"'":
+        end = text.index(opener, pos + 1)
+        return text[pos + 1:end], end + 1
+    end = pos
+    while end < len(text) and text[end] not in stops:
+        end += 1
+    return _parse_scalar(text[pos:end].strip()), end
+
+
+def _parse_flow(value: str) -> Any:
+    """Parse a YAML flow collection (``{a: 1, b: [x, 'y']}``) in a single pass."""
+    try:
+        parsed, pos = _flow_value(value, 0, "")
+        if _skip_spaces(value, pos) != len(value):
+            raise ValueError(f"unexpected text at column {pos + 1}")
+    except (IndexError, ValueError) as exc:
+        reason = "unterminated" if isinstance(exc, IndexError) else exc
+        raise SystemExit(f"Unsupported flow value in YAML: {value} ({reason})") from exc
+    return parsed
 
 
 def _parse_scalar(value: str) -> Any:
-    if value.startswith("{") and value.endswith("}"):
-        import re
-
-        jsonish = re.sub(r"([\{,]\s*)([A-Za-z_][\w-]*)\s*:", r'\1"\\2":', value)
-        jsonish = jsonish.replace("'", '"')
-        return json.loads(jsonish)
+    if value[:1] in ("{", "["):
+        return _parse_flow(value)
     if value.startswith('"') and value.endswith('"'):
         return value[1:-1]
     if value.startswith("'") and value.endswith("'"):
@@ -83,35 +217,433 @@ def _load_simple_yaml(text: str) -> Dict[str, Any]:
     return root
 
 
-def load_config(path: Path) -> Dict[str, Any]:
-    text = path.read_text()
+def _config_cache_file(cache_dir: Path | str, path: Path | str) -> str:
+    import hashlib
+
+    key = hashlib.sha256(os.path.realpath(path).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_dir, f"config-{key}.json")
+
+
+def _read_config_cache(cache_file: str, mtime_ns: int, digest: str) -> Any:
     try:
-        import yaml  # type: ignore
+        with open(cache_file, encoding="utf-8") as handle:
+            entry = json.loads(handle.read())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("mtime_ns") != mtime_ns or entry.get("digest") != digest:
+        return None
+    return entry.get("config")
 
-        return yaml.safe_load(text)
-    except Exception:
-        pass
+
+def _write_config_cache(cache_file: str, path: Path | str, mtime_ns: int, digest: str, config: Any) -> None:
+    entry = {"path": os.path.realpath(path), "mtime_ns": mtime_ns, "digest": digest, "config": config}
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, separators=(",", ":")))
+        os.replace(tmp, cache_file)
+    except (OSError, TypeError, ValueError):  # pragma: no cover - cache is best effort
+        pass
+
+
+# PyYAML module once imported, False once known to be missing, None if not tried.
+_YAML: Any = None
+
+
+def _yaml() -> Any:
+    global _YAML
+    if _YAML is None:
+        try:
+            import yaml  # type: ignore
+        except ImportError:
+            _YAML = False
+        else:
+            _YAML = yaml
+    return _YAML
+
+
+def _parse_config_text(text: str, *, is_json: bool = False, source: str = "") -> Dict[str, Any]:
+    if is_json or text.lstrip().startswith("{"):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as exc:
+            if is_json:
+                raise SystemExit(f"Invalid JSON config {source}: {exc}") from exc
+    yaml = _yaml()
+    if not yaml:
         return _load_simple_yaml(text)
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as exc:
+        raise SystemExit(f"Invalid YAML config: {exc}") from exc
+
+
+def load_config(path: Path | str, *, cache_dir: Path | str | None = None) -> Dict[str, Any]:
+    """Load a YAML/JSON config.
+
+    ``*.json`` files (e.g. written by ``python -m score_function compile``) are
+    parsed with :mod:`json` only and never import PyYAML. With ``cache_dir`` (or ``$SCORE_FUNCTION_CACHE_DIR``) the parsed config is
+    stored on disk keyed by path, mtime and content hash, and later calls on an
+    unchanged file skip parsing entirely.
+
+    The config is validated here, so a bad weight or threshold fails with a
+    :class:`ConfigError` naming every offending key before any record is scored.
+    """
+    if _INSTRUMENTATION is not None:
+        return _INSTRUMENTATION.time_call("load_config", _load_config, path, cache_dir)
+    return _load_config(path, cache_dir)
+
+
+def _load_config(path: Path | str, cache_dir: Path | str | None) -> Dict[str, Any]:
+    config = _read_config(path, cache_dir)
+    validate_config(config, os.fspath(path))
+    return config
+
+
+def _read_config(path: Path | str, cache_dir: Path | str | None) -> Dict[str, Any]:
+    is_json = os.fspath(path).endswith(".json")
+    cache_dir = cache_dir or os.environ.get(CONFIG_CACHE_ENV)
+    with open(path, "rb") as handle:
+        data = handle.read()
+    if not cache_dir:
+        return _parse_config_text(data.decode("utf-8"), is_json=is_json, source=os.fspath(path))
+    import hashlib
+
+    mtime_ns = os.stat(path).st_mtime_ns
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    cache_file = _config_cache_file(cache_dir, path)
+    cached = _read_config_cache(cache_file, mtime_ns, digest)
+    if cached is not None:
+        return cached
+    config = _parse_config_text(data.decode("utf-8"), is_json=is_json, source=os.fspath(path))
+    _write_config_cache(cache_file, path, mtime_ns, digest, config)
+    return config
+
+
+class MetricsError(SystemExit):
+    """Invalid metrics input.
+
+    Subclasses ``SystemExit`` so the CLI still exits with the message, while
+    streaming callers can catch it per record and keep going.
+    """
 
 
 def _ensure_face(metrics: Dict[str, Any], face: str) -> Dict[str, Any]:
     try:
         return metrics[face]
-    except KeyError as exc:  # pragma: no cover - input validation
-        raise SystemExit(f"Missing face '{face}' in metrics") from exc
+    except (KeyError, TypeError) as exc:  # pragma: no cover - input validation
+        raise MetricsError(f"Missing face '{face}' in metrics") from exc
 
 
 def _get(metric_face: Dict[str, Any], key: str) -> float:
     try:
         return float(metric_face[key])
     except KeyError as exc:  # pragma: no cover - input validation
-        raise SystemExit(f"Missing metric '{key}'") from exc
+        raise MetricsError(f"Missing metric '{key}'") from exc
+    except (TypeError, ValueError) as exc:
+        raise MetricsError(f"Invalid metric '{key}': {exc}") from exc
+
+
+class ConfigError(SystemExit):
+    """Invalid config, found when it is loaded or compiled.
+
+    ``errors`` lists ``(key path, problem)`` pairs such as
+    ``("weights.code.PF", "missing")``. Subclasses ``SystemExit`` like
+    :class:`MetricsError`, so the CLI exits with every problem listed.
+    """
+
+    def __init__(self, errors: List[Tuple[str, str]], source: str | None = None) -> None:
+        self.errors = errors
+        where = f" {source}" if source else ""
+        super().__init__(f"Invalid config{where}:\n" + "\n".join(f"  {path}: {problem}" for path, problem in errors))
+
+
+# How far a face's weights may be from summing to 1.
+WEIGHT_SUM_TOLERANCE = 1e-6
+
+_GATE_KEYS = ("floor_each", "min_each", "min_geo")
+
+
+def config_errors(config: Any) -> List[Tuple[str, str]]:
+    """Every problem in ``config`` as ``(key path, problem)``; empty when valid.
+
+    Checks that each face has exactly its weights, each in [0, 1] and summing
+    to 1, every penalty threshold in [0, 1], the gate values in [0, 100],
+    ``k_steep`` and the ``external_weights`` multipliers positive.
+    """
+    errors: List[Tuple[str, str]] = []
+
+    def number(path: str, value: Any, low: float, high: float, *, strict_low: bool = False) -> float | None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append((path, f"expected a number, got {value!r}"))
+            return None
+        if not (value > low if strict_low else value >= low) or not value <= high:
+            if high == math.inf:
+                errors.append((path, f"{value!r} must be {'>' if strict_low else '>='} {low:g}"))
+            else:
+                errors.append((path, f"{value!r} is outside {'(' if strict_low else '['}{low:g}, {high:g}]"))
+            return None
+        return float(value)
+
+    def mapping(path: str, node: Any, keys: Iterable[str] | None = None) -> Dict[str, Any]:
+        if not isinstance(node, dict):
+            errors.append((path, "missing" if node is None else f"expected a mapping, got {node!r}"))
+            return {}
+        if keys is not None:
+            errors.extend((f"{path}.{key}", "unknown key") for key in node if key not in keys)
+        return node
+
+    if not isinstance(config, dict):
+        return [("(root)", f"expected a mapping, got {config!r}")]
+    if config.get("version", 1) != 1:
+        errors.append(("version", f"unsupported version {config['version']!r} (expected 1)"))
+    if not isinstance(config.get("profile", "sre"), str):
+        errors.append(("profile", f"expected a profile name, got {config['profile']!r}"))
+    if "k_steep" in config:
+        number("k_steep", config["k_steep"], 0.0, math.inf, strict_low=True)
+
+    gate = mapping("gate", config.get("gate"), _GATE_KEYS)
+    for key in _GATE_KEYS:
+        if gate and key not in gate:
+            errors.append((f"gate.{key}", "missing"))
+        elif key in gate:
+            number(f"gate.{key}", gate[key], 0.0, 100.0)
+
+    weights = mapping("weights", config.get("weights"), FACE_ORDER)
+    thresholds = mapping("thresholds", config.get("thresholds"), FACE_ORDER)
+    for face in FACE_ORDER:
+        weight_keys = [weight_key for _, weight_key, _ in FACE_TERMS[face]]
+        if weights:
+            face_weights = mapping(f"weights.{face}", weights.get(face), weight_keys)
+            total = 0.0
+            for key in weight_keys:
+                value = face_weights.get(key)
+                if face_weights and value is None:
+                    errors.append((f"weights.{face}.{key}", "missing"))
+                    total = math.nan
+                elif value is not None:
+                    checked = number(f"weights.{face}.{key}", value, 0.0, 1.0)
+                    total += math.nan if checked is None else checked
+            if face_weights and not math.isnan(total) and abs(total - 1.0) > WEIGHT_SUM_TOLERANCE:
+                errors.append((f"weights.{face}", f"weights sum to {total:.6g}, expected 1"))
+        tau_keys = [tau_key for _, _, tau_key, _ in FACE_PENALTIES[face]]
+        if thresholds and (tau_keys or face in thresholds):  # faces without penalties need no entry
+            face_thresholds = mapping(f"thresholds.{face}", thresholds.get(face), tau_keys)
+            for key in tau_keys:
+                if face_thresholds and key not in face_thresholds:
+                    errors.append((f"thresholds.{face}.{key}", "missing"))
+                elif key in face_thresholds:
+                    number(f"thresholds.{face}.{key}", face_thresholds[key], 0.0, 1.0)
+
+    external = config.get("external_weights")
+    if external is not None:
+        for name, multipliers in mapping("external_weights", external).items():
+            for face, value in mapping(f"external_weights.{name}", multipliers, FACE_ORDER).items():
+                number(f"external_weights.{name}.{face}", value, 0.0, math.inf, strict_low=True)
+    return errors
+
+
+def validate_config(config: Any, source: str | None = None) -> None:
+    """Raise :class:`ConfigError` listing every problem in ``config``."""
+    errors = config_errors(config)
+    if errors:
+        raise ConfigError(errors, source)
+
+
+class CompiledConfig:
+    """Flattened, validated and immutable view of a Score Function config.
+
+    Built once with :func:`compile_config`, which rejects invalid configs with
+    a :class:`ConfigError`; :func:`compute_faces`, :func:`score_function` and
+    the batch engine accept it in place of the raw config dict and skip all
+    nested lookups. ``raw`` is a private copy of the config.
+    """
+
+    __slots__ = (
+        "raw",
+        "_fingerprint",
+        "_frozen",
+        "k",
+        "profile",
+        "terms",
+        "face_terms",
+        "penalties",
+        "coefficients",
+        "external_weights",
+        "profile_weights",
+        "floor_each",
+        "min_each",
+        "min_geo",
+        "face_functions",
+        "faces_function",
+    )
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        validate_config(config)
+        self._frozen = False
+        self.raw = config = json.loads(json.dumps(config))
+        self._fingerprint: str | None = None
+        self.k = float(config.get("k_steep", 14))
+        self.profile = config.get("profile", "sre")
+        weights, thresholds, gate = config["weights"], config["thresholds"], config["gate"]
+        # Per face: ((metric, weight, inverted), ...) in FACE_TERMS order.
+        self.terms: Tuple[Tuple[str, Tuple[Tuple[str, float, bool], ...]], ...] = tuple(
+            (
+                face,
+                tuple(
+                    (metric, float(weights[face][weight_key]), inverted)
+                    for metric, weight_key, inverted in FACE_TERMS[face]
+                ),
+            )
+            for face in FACE_ORDER
+        )
+        self.face_terms = MappingProxyType(dict(self.terms))
+        # Per face: ((metric, scale, tau, k, inverted), ...) in FACE_PENALTIES order.
+        self.penalties: Mapping[str, Tuple[Tuple[str, float, float, float, bool], ...]] = MappingProxyType({
+            face: tuple(
+                (metric, scale, float(thresholds[face][tau_key]), self.k, inverted)
+                for scale, metric, tau_key, inverted in FACE_PENALTIES[face]
+            )
+            for face in FACE_ORDER
+        })
+        # Linear weights flattened in METRIC_COLUMNS order (0.0 for unweighted columns).
+        flat = {f"{face}.{metric}": weight for face, terms in self.terms for metric, weight, _ in terms}
+        self.coefficients: Tuple[float, ...] = tuple(flat.get(name, 0.0) for name in METRIC_COLUMNS)
+        self.external_weights: Mapping[str, Tuple[float, ...]] = MappingProxyType({
+            name: tuple(float(multipliers.get(face, 1.0)) for face in FACE_ORDER)
+            for name, multipliers in (config.get("external_weights") or {}).items()
+        })
+        self.profile_weights = self.external_weights.get(self.profile, (1.0,) * len(FACE_ORDER))
+        self.floor_each = float(gate["floor_each"])
+        self.min_each = float(gate["min_each"])
+        self.min_geo = float(gate["min_geo"])
+        face_functions, self.faces_function = _generate_face_functions(self)
+        self.face_functions = MappingProxyType(face_functions)
+        self._frozen = True
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name != "_fingerprint" and getattr(self, "_frozen", False):
+            raise AttributeError(f"CompiledConfig is immutable (cannot set {name!r})")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"CompiledConfig is immutable (cannot delete {name!r})")
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Dict[str, Any]]]:
+        return (CompiledConfig, (self.raw,))
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable digest of the config contents, e.g. for result cache keys."""
+        if self._fingerprint is None:
+            import hashlib
+
+            self._fingerprint = hashlib.blake2b(
+                json.dumps(self.raw, sort_keys=True, separators=(",", ":")).encode("utf-8"), digest_size=16
+            ).hexdigest()
+        return self._fingerprint
+
+    def __repr__(self) -> str:
+        return f"CompiledConfig(profile={self.profile!r}, k={self.k!r})"
+
+
+def _face_source(plan: CompiledConfig, face: str, indent: str) -> List[str]:
+    """Straight-line source scoring ``face`` from ``m`` into ``s`` with constants inlined.
+
+    Mirrors compute_faces() operation for operation so results are bit-identical.
+    """
+    terms = plan.face_terms[face]
+    index = {metric: i for i, (metric, _, _) in enumerate(terms)}
+    lines = []
+    for i, (metric, _, _) in enumerate(terms):
+        lines.append(f"x{i} = float(m[{metric!r}])")
+        # Same as clip(): NaN and values above 1 map to 1.0.
+        lines.append(f"x{i} = 1.0 if not x{i} <= 1.0 else (0.0 if x{i} < 0.0 else x{i})")
+    linear = " + ".join(
+        f"{weight!r} * (1.0 - x{i})" if inverted else f"{weight!r} * x{i}"
+        for i, (_, weight, inverted) in enumerate(terms)
+    )
+    lines.append(f"s = 100.0 * ({linear})")
+    penalties = [
+        f"(1.0 - {scale!r} * (1.0 / (1.0 + exp({-k!r} * ({'(1.0 - x%d)' % index[metric] if inverted else 'x%d' % index[metric]} - {tau!r})))))"
+        for metric, scale, tau, k, inverted in plan.penalties[face]
+    ]
+    if penalties:
+        lines.append(f"s = s * ({' * '.join(penalties)})")
+    if face == "sec":
+        lines.append(f"if int(m.get('critical_count', 0)) >= 1: s = s * {CRITICAL_FACTOR!r}")
+    return [indent + line for line in lines]
+
+
+def _generate_face_functions(plan: CompiledConfig) -> Tuple[Dict[str, Any], Any]:
+    """Generate per-face scorers and an all-faces scorer for ``plan``."""
+    source: List[str] = []
+    for face in FACE_ORDER:
+        source.append(f"def face_{face}(m):")
+        source.extend(_face_source(plan, face, "    "))
+        source.append("    return s")
+    source.append("def faces(metrics):")
+    for face in FACE_ORDER:
+        source.append(f"    m = metrics[{face!r}]")
+        source.extend(_face_source(plan, face, "    "))
+        source.append(f"    s_{face} = s")
+    source.append("    return {" + ", ".join(f"{face!r}: s_{face}" for face in FACE_ORDER) + "}")
+    namespace: Dict[str, Any] = {"exp": math.exp}
+    exec(compile("\n".join(source), "<score_function compiled config>", "exec"), namespace)
+    return {face: namespace[f"face_{face}"] for face in FACE_ORDER}, namespace["faces"]
+
+
+def compile_config(config: Dict[str, Any] | CompiledConfig) -> CompiledConfig:
+    """Validate ``config`` once and return its :class:`CompiledConfig`."""
+    if isinstance(config, CompiledConfig):
+        return config
+    return CompiledConfig(config)
+
+
+# Errors the generated scorers raise on malformed metrics; the checked path
+# below then re-runs the input to report a precise MetricsError.
+_FAST_PATH_ERRORS = (KeyError, TypeError, ValueError, AttributeError, IndexError)
+
+
+def _compiled_face_checked(plan: CompiledConfig, face: str, face_metrics: Dict[str, Any]) -> float:
+    values: Dict[str, float] = {}
+    total = 0.0
+    for metric, weight, inverted in plan.face_terms[face]:
+        value = clip(_get(face_metrics, metric))
+        values[metric] = value
+        total += weight * (1.0 - value) if inverted else weight * value
+    score = 100.0 * total
+    pen = 1.0
+    for metric, scale, tau, k, inverted in plan.penalties[face]:
+        value = 1.0 - values[metric] if inverted else values[metric]
+        pen *= 1.0 - scale * (1.0 / (1.0 + math.exp(-k * (value - tau))))
+    score *= pen
+    if face == "sec" and int(face_metrics.get("critical_count", 0)) >= 1:
+        score *= CRITICAL_FACTOR
+    return score
+
+
+def _compiled_face(plan: CompiledConfig, face: str, face_metrics: Dict[str, Any]) -> float:
+    """Score one face from its metrics using a compiled config."""
+    try:
+        return plan.face_functions[face](face_metrics)
+    except _FAST_PATH_ERRORS:
+        return _compiled_face_checked(plan, face, face_metrics)
+
+
+def _compute_faces_compiled(plan: CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, float]:
+    try:
+        return plan.faces_function(metrics)
+    except _FAST_PATH_ERRORS:
+        return {face: _compiled_face_checked(plan, face, _ensure_face(metrics, face)) for face in FACE_ORDER}
 
 
-def compute_faces(config: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, float]:
+def compute_faces(config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, float]:
+    if _INSTRUMENTATION is not None:
+        return _INSTRUMENTATION.compute_faces(config, metrics)
+    if isinstance(config, CompiledConfig):
+        return _compute_faces_compiled(config, metrics)
     weights = config["weights"]
     thresholds = config["thresholds"]
     k = config.get("k_steep", 14)
@@ -186,7 +718,7 @@ def compute_faces(config: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str,
         + weights["sec"]["ML"] * ml
     )
     if int(sec_metrics.get("critical_count", 0)) >= 1:
-        sec_score *= 0.25
+        sec_score *= CRITICAL_FACTOR
     faces["sec"] = sec_score
 
     pr_metrics = _ensure_face(metrics, "pr")
@@ -228,49 +760,262 @@ def compute_faces(config: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str,
     return faces
 
 
-def score_function(config: Dict[str, Any], metrics: Dict[str, Any]) -> Dict[str, Any]:
+def score_function(config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    if _INSTRUMENTATION is not None:
+        return _INSTRUMENTATION.score_function(_score_function, config, metrics)
+    return _score_function(config, metrics)
+
+
+def _score_function(config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, Any]:
     faces = compute_faces(config, metrics)
-    profile = config.get("profile", "sre")
-    weights = config.get("external_weights", {}).get(profile, {})
-    floor_each = config["gate"]["floor_each"]
+    if isinstance(config, CompiledConfig):
+        profile = config.profile
+        multipliers = config.profile_weights
+        floor_each, min_each, min_geo = config.floor_each, config.min_each, config.min_geo
+    else:
+        profile = config.get("profile", "sre")
+        weights = config.get("external_weights", {}).get(profile, {})
+        multipliers = tuple(weights.get(face, 1.0) for face in FACE_ORDER)
+        gate = config["gate"]
+        floor_each, min_each, min_geo = gate["floor_each"], gate["min_each"], gate["min_geo"]
 
+    sigma = clip(float(metrics.get("uncertainty_sigma", 0.0)))
+    result: Dict[str, Any] = {"faces": {face: round(faces[face], 4) for face in FACE_ORDER}}
+    result.update(_profile_result(faces, multipliers, floor_each, min_each, min_geo, sigma))
+    result["profile"] = profile
+    return result
+
+
+def _profile_result(
+    faces: Dict[str, float],
+    multipliers: Tuple[float, ...],
+    floor_each: float,
+    min_each: float,
+    min_geo: float,
+    sigma: float,
+) -> Dict[str, Any]:
+    """Derive the profile-dependent part of a result from profile-independent faces."""
     weighted_faces = {
-        face: faces[face] * weights.get(face, 1.0)
-        for face in FACE_ORDER
+        face: faces[face] * multiplier
+        for face, multiplier in zip(FACE_ORDER, multipliers)
     }
 
     adjusted = [max(floor_each, weighted_faces[face]) / 100.0 for face in FACE_ORDER]
     geo = 100.0 * math.prod(adjusted) ** (1.0 / len(adjusted))
 
-    sigma = clip(float(metrics.get("uncertainty_sigma", 0.0)))
     final = geo * (1.0 - 0.1 * sigma)
 
-    gate_ok = min(faces.values()) >= config["gate"]["min_each"] and geo >= config["gate"]["min_geo"]
+    gate_ok = min(faces.values()) >= min_each and geo >= min_geo
 
     return {
-        "faces": {face: round(faces[face], 4) for face in FACE_ORDER},
         "weighted_faces": {face: round(weighted_faces[face], 4) for face in FACE_ORDER},
         "geo": round(geo, 4),
         "final": round(final, 4),
         "gate_ok": bool(gate_ok),
-        "profile": profile,
+    }
+
+
+def _profile_settings(
+    config: Dict[str, Any] | CompiledConfig,
+) -> Tuple[str, Mapping[str, Tuple[float, ...]], float, float, float]:
+    """``(profile, external weights, floor_each, min_each, min_geo)`` without compiling a dict config."""
+    if isinstance(config, CompiledConfig):
+        return config.profile, config.external_weights, config.floor_each, config.min_each, config.min_geo
+    external = {
+        name: tuple(weights.get(face, 1.0) for face in FACE_ORDER)
+        for name, weights in config.get("external_weights", {}).items()
+    }
+    gate = config["gate"]
+    return config.get("profile", "sre"), external, gate["floor_each"], gate["min_each"], gate["min_geo"]
+
+
+def resolve_profiles(config: Dict[str, Any] | CompiledConfig, profiles: str | Iterable[str] | None) -> Tuple[str, ...]:
+    """Expand a profile selection (``"sre,speed"``, ``"all"``, a list or None).
+
+    ``None`` selects the config's own ``profile``; ``"all"`` selects it plus every
+    profile in ``external_weights``.
+    """
+    profile, external, _, _, _ = _profile_settings(config)
+    if profiles is None:
+        return (profile,)
+    names = [name.strip() for name in profiles.split(",")] if isinstance(profiles, str) else list(profiles)
+    known = list(external)
+    if profile not in external:
+        known.insert(0, profile)
+    selected: List[str] = []
+    for name in names:
+        for resolved in known if name == "all" else [name]:
+            if resolved not in known:
+                raise SystemExit(f"Unknown profile '{resolved}' (known: {', '.join(known)})")
+            if resolved not in selected:
+                selected.append(resolved)
+    if not selected:
+        raise SystemExit("No profiles selected")
+    return tuple(selected)
+
+
+def _profile_weights(plan: CompiledConfig, profile: str) -> Tuple[float, ...]:
+    return plan.external_weights.get(profile, (1.0,) * len(FACE_ORDER))
+
+
+def score_profiles(
+    config: Dict[str, Any] | CompiledConfig,
+    metrics: Dict[str, Any],
+    profiles: str | Iterable[str] | None = "all",
+) -> Dict[str, Any]:
+    """Score ``metrics`` under several profiles, computing the faces only once.
+
+    Returns ``{"faces": {...}, "profiles": {name: {"weighted_faces", "geo",
+    "final", "gate_ok"}}}``; each profile entry equals the matching fields of
+    :func:`score_function` run with ``config["profile"] = name``. Like
+    :func:`score_function`, a dict config is scored without compiling it.
+    """
+    _, external, floor_each, min_each, min_geo = _profile_settings(config)
+    names = resolve_profiles(config, profiles)
+    faces = compute_faces(config, metrics)
+    sigma = clip(float(metrics.get("uncertainty_sigma", 0.0)))
+    neutral = (1.0,) * len(FACE_ORDER)
+    return {
+        "faces": {face: round(faces[face], 4) for face in FACE_ORDER},
+        "profiles": {
+            name: _profile_result(faces, external.get(name, neutral), floor_each, min_each, min_geo, sigma)
+            for name in names
+        },
     }
 
 
 def main(argv: Iterable[str] | None = None) -> int:
-    parser = argparse.ArgumentParser(description="Score Function calculator")
+    argv = list(argv) if argv is not None else sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        return importlib.import_module(SUBCOMMANDS[argv[0]]).main(argv[1:])
+    if len(argv) == 2 and not any(arg.startswith("-") for arg in argv):
+        # The common CI call (config + metrics, no options) skips argparse.
+        return _score_file(argv[0], argv[1])
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Score Function calculator",
+        epilog=f"Subcommands: {', '.join(SUBCOMMANDS)} (see '<subcommand> --help')",
+    )
     parser.add_argument("config", help="Path to score-function.yml (or JSON)")
-    parser.add_argument("metrics", help="Path to metrics.json")
-    args = parser.parse_args(list(argv) if argv is not None else None)
+    parser.add_argument(
+        "metrics", help="Path to metrics.json (metrics.jsonl, a binary metrics file or '-' with --stream)"
+    )
+    parser.add_argument("--config-cache", help=f"Cache parsed configs in this directory (or ${CONFIG_CACHE_ENV})")
+    parser.add_argument("--stream", action="store_true", help="Score JSONL input line by line and emit JSONL")
+    parser.add_argument(
+        "--format",
+        choices=("json", "jsonl", "csv", "binary"),
+        help="Output format (default: json, or jsonl with --stream); see score_function.formats",
+    )
+    parser.add_argument("--errors", help="With --stream, write per-line errors here as JSONL (default: stderr)")
+    parser.add_argument("--workers", type=int, default=1, help="With --stream, score in N worker processes")
+    parser.add_argument(
+        "--chunksize", type=int, help="With --workers, records per dispatched chunk (binary input: per mmap chunk)"
+    )
+    parser.add_argument(
+        "--profiles",
+        help="Comma-separated profiles to score in one pass ('all' = every external_weights profile)",
+    )
+    parser.add_argument("--result-cache", help="Reuse results from this shared SQLite result cache file")
+    parser.add_argument("--result-cache-ttl", type=float, help="With --result-cache, seconds before entries expire")
+    parser.add_argument("--history", help="Also append the result to this score history file (SQLite)")
+    parser.add_argument("--repo", help="With --history, repository name the result belongs to")
+    parser.add_argument("--commit", help="With --history, commit the metrics were collected at")
+    parser.add_argument("--timestamp", help="With --history, ISO 8601 or Unix time of the run (default: now)")
+    parser.add_argument(
+        "--profile-out",
+        help="Write aggregated hot-path timings as JSON (or a cProfile dump for *.prof / *.pstats)",
+    )
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not args.stream:
+        parser.error("--workers requires --stream")
+    if args.result_cache and args.stream:
+        parser.error("--result-cache scores single records; it cannot be combined with --stream")
+    if args.profiles and (args.workers > 1 or args.result_cache):
+        parser.error("--profiles cannot be combined with --workers or --result-cache")
+    if args.history and (args.stream or args.profiles or not args.repo):
+        parser.error("--history needs --repo and scores single records (no --stream or --profiles)")
+
+    if args.profile_out:
+        from .instrument import profile_to
+
+        with profile_to(args.profile_out):
+            return _run(args)
+    return _run(args)
+
+
+def _write_result(result: Dict[str, Any], fmt: str | None = None, profiles: Tuple[str, ...] | None = None) -> None:
+    if fmt is None or fmt == "json":
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    from .formats import write_results
+
+    out = sys.stdout.buffer if fmt == "binary" else sys.stdout
+    write_results(fmt, out, [result], profiles=profiles or (result["profile"],))
+
+
+def _score_file(config_path: str, metrics_path: str) -> int:
+    # A single record is scored from the config dict: compiling (code
+    # generation) only pays off once many records are scored.
+    result = score_function(load_config(config_path), load_json(metrics_path))
+    _write_result(result)
+    return 0
 
-    config_path = Path(args.config)
-    metrics_path = Path(args.metrics)
 
-    config = load_config(config_path)
-    metrics = load_json(metrics_path)
-    result = score_function(config, metrics)
-    json.dump(result, sys.stdout, indent=2)
-    sys.stdout.write("\n")
+def _run(args: argparse.Namespace) -> int:
+    config = load_config(args.config, cache_dir=args.config_cache)
+    profiles = resolve_profiles(config, args.profiles) if args.profiles else None
+
+    if args.stream:
+        from .formats import sniff
+
+        if args.metrics != "-" and sniff(args.metrics) == "metrics":
+            from .bulk import run_binary
+
+            if args.workers > 1:
+                raise SystemExit("--workers does not apply to binary metrics input (it is scored from one mmap)")
+
+            return run_binary(
+                config, args.metrics, args.format or "jsonl", chunk_rows=args.chunksize, profiles=profiles
+            )
+
+        from .stream import run_stream
+
+        return run_stream(
+            compile_config(config),
+            args.metrics,
+            args.errors,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            profiles=profiles,
+            fmt=args.format or "jsonl",
+        )
+
+    metrics = load_json(args.metrics)
+    if profiles is not None:
+        result = score_profiles(config, metrics, profiles)
+    elif args.result_cache:
+        from .cache import ScoreCache
+
+        cache = ScoreCache(path=args.result_cache, ttl=args.result_cache_ttl)
+        try:
+            result = cache.score(config, metrics)
+        finally:
+            cache.close()
+    else:
+        result = score_function(config, metrics)
+    if args.history:
+        from .history import HistoryStore
+
+        with HistoryStore(args.history) as store:
+            store.append(result, repo=args.repo, commit=args.commit, timestamp=args.timestamp)
+    if _INSTRUMENTATION is not None:
+        _INSTRUMENTATION.time_call("serialize", _write_result, result, args.format, profiles)
+    else:
+        _write_result(result, args.format, profiles)
     return 0
 
 
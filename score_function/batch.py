@@ -0,0 +1,396 @@
+"""Columnar batch scoring over many metric sets at once.
+
+Metrics are passed as columns keyed by :data:`score_function.METRIC_COLUMNS`
+(``"spec.RC"``, ``"sec.critical_count"``, ...). Each formula of
+:func:`score_function.compute_faces` runs as one pass over a whole column, using
+NumPy when it is installed and ``array('d')`` buffers otherwise. Results are
+returned unrounded; :func:`score_function.score_function` stays the reference.
+"""
+from __future__ import annotations
+
+import math
+import operator
+from array import array
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+
+from . import (
+    CRITICAL_FACTOR,
+    FACE_ORDER,
+    FACE_TERMS,
+    METRIC_COLUMNS,
+    OPTIONAL_COLUMNS,
+    CompiledConfig,
+    _ensure_face,
+    _get,
+    _profile_weights,
+    compile_config,
+    resolve_profiles,
+)
+
+
+def _numpy() -> Any:
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        return None
+    return numpy
+
+
+def _resolve_numpy(use_numpy: Optional[bool]) -> Any:
+    if use_numpy is False:
+        return None
+    np = _numpy()
+    if np is None and use_numpy:
+        raise SystemExit("NumPy is required for use_numpy=True")
+    return np
+
+
+def _clip_unit(np: Any, x: Any) -> Any:
+    """``clip()`` over an array: like ``np.clip(x, 0, 1)`` but NaN maps to 1.0 as in the reference."""
+    return np.where(x <= 1.0, np.maximum(x, 0.0), 1.0)
+
+
+class _ArrayOps:
+    """Column operations over ``array('d')`` buffers (stdlib fallback)."""
+
+    @staticmethod
+    def column(values: Sequence[float]) -> array:
+        return values if isinstance(values, array) and values.typecode == "d" else array("d", values)
+
+    @staticmethod
+    def zeros(n: int) -> array:
+        return array("d", bytes(8 * n))
+
+    @staticmethod
+    def clip(x: array) -> array:
+        return array("d", [max(0.0, min(1.0, v)) for v in x])
+
+    @staticmethod
+    def term(x: array, weight: float, inverted: bool) -> array:
+        if inverted:
+            return array("d", [weight * (1.0 - v) for v in x])
+        return array("d", [weight * v for v in x])
+
+    @staticmethod
+    def add(a: array, b: array) -> array:
+        return array("d", map(operator.add, a, b))
+
+    @staticmethod
+    def mul(a: array, b: array) -> array:
+        return array("d", map(operator.mul, a, b))
+
+    @staticmethod
+    def scale(a: array, factor: float) -> array:
+        return array("d", [factor * v for v in a])
+
+    @staticmethod
+    def penalty(x: array, scale: float, tau: float, k: float, inverted: bool) -> array:
+        exp = math.exp
+        if inverted:
+            return array("d", [1.0 - scale * (1.0 / (1.0 + exp(-k * ((1.0 - v) - tau)))) for v in x])
+        return array("d", [1.0 - scale * (1.0 / (1.0 + exp(-k * (v - tau)))) for v in x])
+
+    @staticmethod
+    def scale_where_ge(a: array, cond: array, threshold: float, factor: float) -> array:
+        return array("d", [v * factor if c >= threshold else v for v, c in zip(a, cond)])
+
+    @staticmethod
+    def floor_ratio(a: array, floor: float) -> array:
+        return array("d", [max(floor, v) / 100.0 for v in a])
+
+    @staticmethod
+    def geo(prod: array, n_faces: int) -> array:
+        exponent = 1.0 / n_faces
+        return array("d", [100.0 * p ** exponent for p in prod])
+
+    @staticmethod
+    def final(geo: array, sigma: array) -> array:
+        return array("d", [g * (1.0 - 0.1 * max(0.0, min(1.0, s))) for g, s in zip(geo, sigma)])
+
+    @staticmethod
+    def minimum(a: array, b: array) -> array:
+        return array("d", map(min, a, b))
+
+    @staticmethod
+    def gate(min_face: array, geo: array, min_each: float, min_geo: float) -> array:
+        return array("B", [m >= min_each and g >= min_geo for m, g in zip(min_face, geo)])
+
+
+class _NumpyOps:
+    """Column operations over ``numpy.ndarray`` (float64)."""
+
+    def __init__(self, np: Any) -> None:
+        self.np = np
+
+    def column(self, values: Sequence[float]) -> Any:
+        return self.np.asarray(values, dtype=self.np.float64)
+
+    def zeros(self, n: int) -> Any:
+        return self.np.zeros(n, dtype=self.np.float64)
+
+    def clip(self, x: Any) -> Any:
+        return _clip_unit(self.np, x)
+
+    @staticmethod
+    def term(x: Any, weight: float, inverted: bool) -> Any:
+        return weight * (1.0 - x) if inverted else weight * x
+
+    @staticmethod
+    def add(a: Any, b: Any) -> Any:
+        return a + b
+
+    @staticmethod
+    def mul(a: Any, b: Any) -> Any:
+        return a * b
+
+    @staticmethod
+    def scale(a: Any, factor: float) -> Any:
+        return factor * a
+
+    def penalty(self, x: Any, scale: float, tau: float, k: float, inverted: bool) -> Any:
+        value = 1.0 - x if inverted else x
+        return 1.0 - scale * (1.0 / (1.0 + self.np.exp(-k * (value - tau))))
+
+    def scale_where_ge(self, a: Any, cond: Any, threshold: float, factor: float) -> Any:
+        return self.np.where(cond >= threshold, a * factor, a)
+
+    def floor_ratio(self, a: Any, floor: float) -> Any:
+        return self.np.maximum(floor, a) / 100.0
+
+    @staticmethod
+    def geo(prod: Any, n_faces: int) -> Any:
+        return 100.0 * prod ** (1.0 / n_faces)
+
+    def final(self, geo: Any, sigma: Any) -> Any:
+        return geo * (1.0 - 0.1 * _clip_unit(self.np, sigma))
+
+    def minimum(self, a: Any, b: Any) -> Any:
+        return self.np.minimum(a, b)
+
+    @staticmethod
+    def gate(min_face: Any, geo: Any, min_each: float, min_geo: float) -> Any:
+        return (min_face >= min_each) & (geo >= min_geo)
+
+
+def _ops(use_numpy: Optional[bool]) -> Any:
+    np = _resolve_numpy(use_numpy)
+    return _ArrayOps() if np is None else _NumpyOps(np)
+
+
+def columns_from_records(
+    records: Iterable[Mapping[str, Any]], *, use_numpy: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Transpose metric dicts (``metrics.json`` shape) into columns."""
+    columns = {name: array("d") for name in METRIC_COLUMNS}
+    appenders = [
+        (face, metric, columns[f"{face}.{metric}"].append)
+        for face in FACE_ORDER
+        for metric, _, _ in FACE_TERMS[face]
+    ]
+    critical = columns["sec.critical_count"].append
+    sigma = columns["uncertainty_sigma"].append
+    for record in records:
+        face_metrics = {face: _ensure_face(record, face) for face in FACE_ORDER}  # type: ignore[arg-type]
+        for face, metric, append in appenders:
+            append(_get(face_metrics[face], metric))
+        critical(float(int(face_metrics["sec"].get("critical_count", 0))))
+        sigma(float(record.get("uncertainty_sigma", 0.0)))
+    np = _resolve_numpy(use_numpy)
+    if np is None:
+        return columns
+    return {name: np.frombuffer(column, dtype=np.float64) for name, column in columns.items()}
+
+
+def _column_length(columns: Mapping[str, Sequence[float]]) -> int:
+    lengths = {len(columns[name]) for name in METRIC_COLUMNS if name in columns}
+    if len(lengths) > 1:
+        raise SystemExit(f"Metric columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else 0
+
+
+def score_function_batch(
+    config: Dict[str, Any] | CompiledConfig,
+    columns: Mapping[str, Sequence[float]],
+    *,
+    use_numpy: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Score every row of ``columns`` and return columnar results.
+
+    The result mirrors :func:`score_function.score_function` with one column per
+    scalar: ``faces`` and ``weighted_faces`` map each face to a float column,
+    ``geo``/``final`` are float columns and ``gate_ok`` is a boolean column
+    (``array('B')`` without NumPy).
+    """
+    ops = _ops(use_numpy)
+    n = _column_length(columns)
+    plan = compile_config(config)
+    faces = _batch_faces(ops, plan, columns)
+    result = _combine(ops, plan, plan.profile_weights, faces, _sigma(ops, columns, n))
+    result["profile"] = plan.profile
+    return result
+
+
+def score_profiles_batch(
+    config: Dict[str, Any] | CompiledConfig,
+    columns: Mapping[str, Sequence[float]],
+    profiles: str | Iterable[str] | None = "all",
+    *,
+    use_numpy: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Score every row under several profiles, computing the faces once.
+
+    Returns ``{"faces": {face: column}, "profiles": {name: {"weighted_faces",
+    "geo", "final", "gate_ok"}}}``. With NumPy the profile-dependent part is
+    one broadcast over a ``profiles x faces x records`` array.
+    """
+    ops = _ops(use_numpy)
+    n = _column_length(columns)
+    plan = compile_config(config)
+    names = resolve_profiles(plan, profiles)
+    faces = _batch_faces(ops, plan, columns)
+    sigma = _sigma(ops, columns, n)
+    if isinstance(ops, _NumpyOps):
+        per_profile = _combine_broadcast(ops.np, plan, names, faces, sigma)
+    else:
+        per_profile = {name: _combine(ops, plan, _profile_weights(plan, name), faces, sigma) for name in names}
+    for result in per_profile.values():
+        del result["faces"]
+    return {"faces": faces, "profiles": per_profile}
+
+
+def _sigma(ops: Any, columns: Mapping[str, Sequence[float]], n: int) -> Any:
+    return ops.column(columns["uncertainty_sigma"]) if "uncertainty_sigma" in columns else ops.zeros(n)
+
+
+def _batch_faces(ops: Any, plan: CompiledConfig, columns: Mapping[str, Sequence[float]]) -> Dict[str, Any]:
+    for name in METRIC_COLUMNS:
+        if name not in columns and name not in OPTIONAL_COLUMNS:
+            raise SystemExit(f"Missing metric column '{name}'")
+
+    clipped: Dict[str, Any] = {}
+
+    def clipped_column(name: str) -> Any:
+        if name not in clipped:
+            clipped[name] = ops.clip(ops.column(columns[name]))
+        return clipped[name]
+
+    faces: Dict[str, Any] = {}
+    for face, terms in plan.terms:
+        total = None
+        for metric, weight, inverted in terms:
+            term = ops.term(clipped_column(f"{face}.{metric}"), weight, inverted)
+            total = term if total is None else ops.add(total, term)
+        score = ops.scale(total, 100.0)
+        pen = None
+        for metric, scale, tau, k, inverted in plan.penalties[face]:
+            factor = ops.penalty(clipped_column(f"{face}.{metric}"), scale, tau, k, inverted)
+            pen = factor if pen is None else ops.mul(pen, factor)
+        if pen is not None:
+            score = ops.mul(score, pen)
+        if face == "sec" and "sec.critical_count" in columns:
+            score = ops.scale_where_ge(score, ops.column(columns["sec.critical_count"]), 1.0, CRITICAL_FACTOR)
+        faces[face] = score
+    return faces
+
+
+def _combine(
+    ops: Any,
+    plan: CompiledConfig,
+    multipliers: Sequence[float],
+    faces: Dict[str, Any],
+    sigma: Any,
+) -> Dict[str, Any]:
+    weighted = {
+        face: ops.scale(faces[face], multiplier)
+        for face, multiplier in zip(FACE_ORDER, multipliers)
+    }
+    prod = None
+    min_face = None
+    for face in FACE_ORDER:
+        adjusted = ops.floor_ratio(weighted[face], plan.floor_each)
+        prod = adjusted if prod is None else ops.mul(prod, adjusted)
+        min_face = faces[face] if min_face is None else ops.minimum(min_face, faces[face])
+    geo = ops.geo(prod, len(FACE_ORDER))
+    return {
+        "faces": faces,
+        "weighted_faces": weighted,
+        "geo": geo,
+        "final": ops.final(geo, sigma),
+        "gate_ok": ops.gate(min_face, geo, plan.min_each, plan.min_geo),
+    }
+
+
+def _combine_broadcast(
+    np: Any, plan: CompiledConfig, names: Sequence[str], faces: Dict[str, Any], sigma: Any
+) -> Dict[str, Dict[str, Any]]:
+    face_matrix = np.stack([faces[face] for face in FACE_ORDER])
+    weights = np.array([_profile_weights(plan, name) for name in names], dtype=np.float64)
+    weighted = face_matrix[np.newaxis, :, :] * weights[:, :, np.newaxis]  # profiles x faces x records
+    adjusted = np.maximum(plan.floor_each, weighted) / 100.0
+    # Multiply face by face (not np.prod) so rounding matches score_function exactly.
+    prod = adjusted[:, 0, :]
+    for i in range(1, len(FACE_ORDER)):
+        prod = prod * adjusted[:, i, :]
+    geo = 100.0 * prod ** (1.0 / len(FACE_ORDER))
+    final = geo * (1.0 - 0.1 * _clip_unit(np, sigma))[np.newaxis, :]
+    gate_ok = (face_matrix.min(axis=0) >= plan.min_each)[np.newaxis, :] & (geo >= plan.min_geo)
+    return {
+        name: {
+            "faces": faces,
+            "weighted_faces": {face: weighted[p, i] for i, face in enumerate(FACE_ORDER)},
+            "geo": geo[p],
+            "final": final[p],
+            "gate_ok": gate_ok[p],
+        }
+        for p, name in enumerate(names)
+    }
+
+
+def _pylist(column: Any) -> list:
+    """Python floats for a NumPy or ``array`` column, converted in one pass."""
+    return column.tolist() if hasattr(column, "tolist") else list(column)
+
+
+def iter_profile_rows(batch: Mapping[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Yield per-record :func:`score_function.score_profiles` dicts from a profiles batch."""
+    faces = [batch["faces"][face] for face in FACE_ORDER]
+    profiles = {
+        name: (
+            [result["weighted_faces"][face] for face in FACE_ORDER],
+            result["geo"],
+            result["final"],
+            result["gate_ok"],
+        )
+        for name, result in batch["profiles"].items()
+    }
+    n = len(faces[0])
+    for i in range(n):
+        yield {
+            "faces": {face: round(float(col[i]), 4) for face, col in zip(FACE_ORDER, faces)},
+            "profiles": {
+                name: {
+                    "weighted_faces": {face: round(float(col[i]), 4) for face, col in zip(FACE_ORDER, weighted)},
+                    "geo": round(float(geo[i]), 4),
+                    "final": round(float(final[i]), 4),
+                    "gate_ok": bool(gate_ok[i]),
+                }
+                for name, (weighted, geo, final, gate_ok) in profiles.items()
+            },
+        }
+
+
+def iter_rows(batch: Mapping[str, Any]) -> Iterable[Dict[str, Any]]:
+    """Yield per-record result dicts (rounded like ``score_function``) from a batch."""
+    faces = [_pylist(batch["faces"][face]) for face in FACE_ORDER]
+    weighted = [_pylist(batch["weighted_faces"][face]) for face in FACE_ORDER]
+    profile = batch["profile"]
+    columns = zip(_pylist(batch["geo"]), _pylist(batch["final"]), _pylist(batch["gate_ok"]))
+    for i, (geo, final, gate_ok) in enumerate(columns):
+        yield {
+            "faces": {face: round(col[i], 4) for face, col in zip(FACE_ORDER, faces)},
+            "weighted_faces": {face: round(col[i], 4) for face, col in zip(FACE_ORDER, weighted)},
+            "geo": round(geo, 4),
+            "final": round(final, 4),
+            "gate_ok": bool(gate_ok),
+            "profile": profile,
+        }
@@ -0,0 +1,361 @@
+"""Benchmark suite: ``python -m score_function bench``.
+
+Times the scoring hot path, config loading, CLI cold start and the
+``summarize_*`` helpers of ``tools/collect_metrics.py`` on seeded synthetic
+data, and reports ops/sec, per-op latency percentiles and peak traced memory
+as JSON. ``--compare BASELINE`` exits non-zero when a case regresses.
+
+    python -m score_function bench --quick --output bench.json
+    python -m score_function bench --compare bench.json --tolerance 0.3    # bench.json from an earlier --output
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib.util
+import json
+import math
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import (
+    FACE_ORDER,
+    FACE_TERMS,
+    _load_simple_yaml,
+    compile_config,
+    compute_faces,
+    load_config,
+    score_function,
+)
+from .precompile import precompile
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CONFIG = ROOT / "score-function.yml"
+COLLECT_METRICS = ROOT / "tools" / "collect_metrics.py"
+
+REPORT_SIZES = (100, 10_000)
+QUICK_REPORT_SIZES = (100, 1_000)
+
+Case = Tuple[str, Callable[[], Any], int, bool]  # (name, operation, repeats, trace_memory)
+
+
+# -- synthetic data ------------------------------------------------------------
+
+
+def synthetic_metrics(rng: random.Random) -> Dict[str, Any]:
+    """One metrics record shaped like ``examples/metrics.sample.json``."""
+    record: Dict[str, Any] = {
+        face: {metric: round(rng.random(), 4) for metric, _, _ in FACE_TERMS[face]} for face in FACE_ORDER
+    }
+    record["sec"]["critical_count"] = int(rng.random() < 0.05)
+    record["uncertainty_sigma"] = round(rng.random() * 0.3, 4)
+    return record
+
+
+def synthetic_eslint(rng: random.Random, files: int) -> List[Dict[str, Any]]:
+    rules = ("complexity", "no-unused-vars", "eqeqeq", "max-depth")
+    return [
+        {
+            "filePath": f"src/module_{i}.js",
+            "errorCount": rng.randint(0, 3),
+            "fatalErrorCount": 0,
+            "warningCount": rng.randint(0, 5),
+            "messages": [
+                {"ruleId": rng.choice(rules), "severity": rng.randint(1, 2), "line": rng.randint(1, 500)}
+                for _ in range(rng.randint(0, 4))
+            ],
+        }
+        for i in range(files)
+    ]
+
+
+def synthetic_syft(rng: random.Random, matches: int) -> Dict[str, Any]:
+    severities = ("Critical", "High", "Medium", "Low", "Negligible")
+    return {
+        "matches": [
+            {
+                "vulnerability": {
+                    "id": f"CVE-2024-{i:05d}",
+                    "severity": rng.choice(severities),
+                    "cvss": [{"metrics": [{"score": round(rng.uniform(0, 10), 1)}]}],
+                },
+                "status": rng.choice(("affected", "fixed", "unknown")),
+            }
+            for i in range(matches)
+        ],
+        "descriptor": {"name": "grype"},
+    }
+
+
+def synthetic_semgrep(rng: random.Random, results: int) -> Dict[str, Any]:
+    severities = ("ERROR", "WARNING", "INFO")
+    return {
+        "results": [
+            {"check_id": f"rule.{i % 50}", "path": f"src/{i}.py", "extra": {"severity": rng.choice(severities)}}
+            for i in range(results)
+        ],
+        "errors": [],
+    }
+
+
+def synthetic_pytest(rng: random.Random, tests: int) -> Dict[str, Any]:
+    outcomes = [rng.choices(("passed", "failed", "skipped"), (90, 5, 5))[0] for _ in range(tests)]
+    return {
+        "duration": float(tests) * 0.01,
+        "summary": {
+            "total": tests,
+            "passed": outcomes.count("passed"),
+            "failed": outcomes.count("failed"),
+            "skipped": outcomes.count("skipped"),
+        },
+        "tests": [
+            {"nodeid": f"tests/test_{i}.py::test", "outcome": outcome, "duration": round(rng.random(), 4)}
+            for i, outcome in enumerate(outcomes)
+        ],
+    }
+
+
+# -- measurement -----------------------------------------------------------------
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    pos = q * (len(sorted_values) - 1)
+    lower = math.floor(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def measure(
+    operation: Callable[[], Any], *, repeats: int, min_sample_time: float, trace_memory: bool = True
+) -> Dict[str, Any]:
+    """Time ``operation`` and trace its peak memory (in a separate run).
+
+    ``peak_bytes`` is ``None`` for operations whose work happens outside this
+    process (e.g. CLI cold start).
+    """
+    operation()  # warm-up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        if time.perf_counter() - start >= min_sample_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples: List[float] = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(number):
+                operation()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            operation()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    return {
+        "ops_per_sec": round(1.0 / mean, 3) if mean > 0 else None,
+        "mean_s": mean,
+        "p50_s": _percentile(samples, 0.50),
+        "p90_s": _percentile(samples, 0.90),
+        "p99_s": _percentile(samples, 0.99),
+        "peak_bytes": peak,
+        "iterations": number * repeats,
+    }
+
+
+def package_version() -> str:
+    """Installed distribution version, else the one in the checkout's pyproject."""
+    from importlib import metadata
+
+    try:
+        return metadata.version("score-function")
+    except metadata.PackageNotFoundError:
+        pass
+    pyproject = ROOT / "pyproject.toml"
+    if pyproject.exists():
+        match = re.search(r'^version\s*=\s*"([^"]+)"', pyproject.read_text(), re.MULTILINE)
+        if match:
+            return match.group(1)
+    return "unknown"
+
+
+# -- cases -------------------------------------------------------------------------
+
+
+def _load_collect_metrics() -> Any:
+    if not COLLECT_METRICS.exists():
+        return None
+    spec = importlib.util.spec_from_file_location("_bench_collect_metrics", COLLECT_METRICS)
+    if spec is None or spec.loader is None:  # pragma: no cover - defensive
+        return None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _cold_start(config_path: Path, metrics_path: Path) -> Callable[[], Any]:
+    command = [sys.executable, "-m", "score_function", str(config_path), str(metrics_path)]
+
+    def run() -> None:
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=ROOT)
+
+    return run
+
+
+def build_cases(
+    config_path: Path, *, seed: int, quick: bool, workdir: Path, pattern: Optional[str] = None
+) -> List[Case]:
+    """Cases whose name matches ``pattern``; set-up for the others is skipped."""
+
+    def wanted(name: str) -> bool:
+        return pattern is None or re.search(pattern, name) is not None
+
+    rng = random.Random(seed)
+    config_text = config_path.read_text()
+    config = load_config(config_path)
+    compiled = compile_config(config)
+    metrics = synthetic_metrics(rng)
+    repeats = 5 if quick else 20
+
+    cases: List[Case] = [
+        ("compute_faces", lambda: compute_faces(config, metrics), repeats, True),
+        ("compute_faces.compiled", lambda: compute_faces(compiled, metrics), repeats, True),
+        ("score_function", lambda: score_function(config, metrics), repeats, True),
+        ("score_function.compiled", lambda: score_function(compiled, metrics), repeats, True),
+        ("load_config.simple_yaml", lambda: _load_simple_yaml(config_text), repeats, True),
+    ]
+    config_json = json.dumps(config)
+    cases.append(("load_config.json", lambda: json.loads(config_json), repeats, True))
+    try:
+        import yaml  # type: ignore
+    except ImportError:
+        pass
+    else:
+        cases.append(("load_config.pyyaml", lambda: yaml.safe_load(config_text), repeats, True))
+
+    cold_repeats = 3 if quick else 10
+    if wanted("cli_cold_start") or wanted("cli_cold_start.precompiled"):
+        metrics_path = workdir / "metrics.json"
+        metrics_path.write_text(json.dumps(metrics))
+        cases.append(("cli_cold_start", _cold_start(config_path, metrics_path), cold_repeats, False))
+        if wanted("cli_cold_start.precompiled"):
+            precompiled = workdir / "score-function.json"
+            precompile(str(config_path), str(precompiled))
+            cases.append(("cli_cold_start.precompiled", _cold_start(precompiled, metrics_path), cold_repeats, False))
+
+    generators = {
+        "eslint": synthetic_eslint,
+        "syft": synthetic_syft,
+        "semgrep": synthetic_semgrep,
+        "pytest": synthetic_pytest,
+    }
+    report_cases = [
+        (f"summarize_{name}[{size}]", name, size)
+        for size in (QUICK_REPORT_SIZES if quick else REPORT_SIZES)
+        for name in generators
+    ]
+    report_cases = [case for case in report_cases if wanted(case[0])]
+    collect = _load_collect_metrics() if report_cases else None
+    if collect is not None:
+        for case_name, name, size in report_cases:
+            # Seeded per case so a report does not depend on which other cases were built.
+            report = generators[name](random.Random(f"{seed}:{case_name}"), size)
+            summarize = getattr(collect, f"summarize_{name}")
+            cases.append((case_name, lambda f=summarize, r=report: f(r), repeats, True))
+    return [case for case in cases if wanted(case[0])]
+
+
+def run_benchmarks(
+    config_path: Path = DEFAULT_CONFIG,
+    *,
+    seed: int = 1,
+    quick: bool = False,
+    pattern: Optional[str] = None,
+    workdir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Run all (or ``pattern``-matching) cases and return the JSON report."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        selected = build_cases(config_path, seed=seed, quick=quick, workdir=workdir or Path(tmp), pattern=pattern)
+        min_sample_time = 0.005 if quick else 0.05
+        results = {
+            name: measure(operation, repeats=repeats, min_sample_time=min_sample_time, trace_memory=trace)
+            for name, operation, repeats, trace in selected
+        }
+    version = package_version()
+    return {
+        "score_function_version": version,
+        # Cold-start wall time (p50 seconds) per release, tracked across versions.
+        "cold_start": {
+            "score_function_version": version,
+            **{name: result["p50_s"] for name, result in results.items() if name.startswith("cli_cold_start")},
+        },
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "quick": quick,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a message for every case slower or hungrier than ``baseline``."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        ops, peak = result.get("ops_per_sec"), result.get("peak_bytes")
+        if base.get("ops_per_sec") and ops is not None and ops < base["ops_per_sec"] * (1.0 - tolerance):
+            regressions.append(f"{name}: {ops:.1f} ops/s vs baseline {base['ops_per_sec']:.1f}")
+        if base.get("peak_bytes") and peak is not None and peak > base["peak_bytes"] * (1.0 + tolerance) + 1024:
+            regressions.append(f"{name}: peak {peak} B vs baseline {base['peak_bytes']} B")
+    return regressions
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="score_function bench", description="Run the Score Function benchmarks")
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG), help="Config used for the scoring cases")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic data generators")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats and smaller reports")
+    parser.add_argument("--filter", help="Only run cases whose name matches this regex")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default 0.25)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    report = run_benchmarks(Path(args.config), seed=args.seed, quick=args.quick, pattern=args.filter)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for message in regressions:
+            print(f"[bench] regression: {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,143 @@
+"""Bulk scoring of binary metric files straight from a memory map.
+
+    python -m score_function convert metrics.jsonl -o metrics.sfm
+    python -m score_function score-function.yml metrics.sfm --stream --format binary > results.sfr
+
+A binary metrics file (layout in :mod:`score_function.formats`) is mapped
+once and scored ``chunk_rows`` records at a time by the batch engine. With
+NumPy each chunk's columns are strided views into the map, so records are
+never decoded into dicts; binary output is packed from the result columns the
+same way. ``convert`` turns ``metrics.json`` (an object or an array) or JSONL
+into such a file.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from . import CompiledConfig, MetricsError, compile_config, resolve_profiles
+from .batch import _resolve_numpy, iter_profile_rows, iter_rows, score_function_batch, score_profiles_batch
+from .formats import (
+    RESULT_RECORD,
+    RESULTS_MAGIC,
+    BinaryFile,
+    MetricsWriter,
+    encode_header,
+    encode_result_batch,
+    open_writer,
+)
+
+DEFAULT_CHUNK_ROWS = 65_536
+
+
+def score_binary(
+    config: Dict[str, Any] | CompiledConfig,
+    path: os.PathLike[str] | str,
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    profiles: str | Iterable[str] | None = None,
+    use_numpy: Optional[bool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield one columnar batch result per chunk of a binary metrics file.
+
+    Batches are :func:`~score_function.batch.score_function_batch` results, or
+    :func:`~score_function.batch.score_profiles_batch` results with ``profiles``.
+    """
+    plan = compile_config(config)
+    np = _resolve_numpy(use_numpy)
+    with BinaryFile(path) as binary:
+        if binary.kind != "metrics":
+            raise SystemExit(f"{path} is not a binary metrics file")
+        for start in range(0, len(binary), chunk_rows):
+            columns = binary.columns(start, start + chunk_rows, np=np)
+            if profiles is None:
+                yield score_function_batch(plan, columns, use_numpy=np is not None)
+            else:
+                yield score_profiles_batch(plan, columns, profiles, use_numpy=np is not None)
+
+
+def run_binary(
+    config: Dict[str, Any] | CompiledConfig,
+    path: str,
+    fmt: str,
+    *,
+    chunk_rows: Optional[int] = None,
+    profiles: Optional[Tuple[str, ...]] = None,
+) -> int:
+    """CLI driver for ``--stream`` over a binary metrics file."""
+    plan = compile_config(config)
+    names = profiles or resolve_profiles(plan, None)
+    np = _resolve_numpy(None)
+    batches = score_binary(plan, path, chunk_rows=chunk_rows or DEFAULT_CHUNK_ROWS, profiles=profiles)
+    if fmt == "binary" and np is not None:
+        out = sys.stdout.buffer
+        out.write(encode_header(RESULTS_MAGIC, RESULT_RECORD.size, names))
+        for batch in batches:
+            out.write(encode_result_batch(np, batch, names))
+        out.flush()
+        return 0
+    writer = open_writer(fmt, sys.stdout.buffer if fmt == "binary" else sys.stdout, profiles=names)
+    rows = iter_rows if profiles is None else iter_profile_rows
+    for batch in batches:
+        for result in rows(batch):
+            writer.write(result)
+    writer.close()
+    return 0
+
+
+def _read_records(source: str, reader: IO[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """``(record number, metrics)`` from a JSON document or JSONL lines."""
+    if source != "-" and not source.endswith(".jsonl"):
+        try:
+            data = json.loads(reader.read())
+        except json.JSONDecodeError as exc:
+            raise SystemExit(f"Invalid JSON in {source}: {exc}") from exc
+        yield from enumerate(data if isinstance(data, list) else [data], 1)
+        return
+    for lineno, line in enumerate(reader, 1):
+        if line.strip():
+            try:
+                yield lineno, json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise SystemExit(f"{source}:{lineno}: invalid JSON: {exc}") from exc
+
+
+def convert(source: str, output: str) -> int:
+    """Write the metrics in ``source`` (JSON, JSONL or '-') to ``output``; returns the record count."""
+    try:
+        reader = sys.stdin if source == "-" else open(source, encoding="utf-8", buffering=1 << 20)
+    except FileNotFoundError as exc:
+        raise SystemExit(f"Missing metrics file: {source}") from exc
+    tmp = f"{output}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as out:
+            writer = MetricsWriter(out)
+            for number, record in _read_records(source, reader):
+                try:
+                    writer.write(record)
+                except (MetricsError, ValueError, TypeError, OverflowError) as exc:
+                    raise SystemExit(f"{source}:{number}: {exc}") from exc
+            writer.close()
+        os.replace(tmp, output)
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return writer.count
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="score_function convert", description="Convert JSON/JSONL metrics to the binary metrics layout"
+    )
+    parser.add_argument("metrics", help="metrics.json (object or array), metrics.jsonl, or '-' for JSONL on stdin")
+    parser.add_argument("-o", "--output", required=True, help="Binary metrics file to write")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    count = convert(args.metrics, args.output)
+    print(f"[score-function] wrote {count} records to {args.output}", file=sys.stderr)
+    return 0
@@ -0,0 +1,216 @@
+"""Bounded memoizing cache in front of :func:`score_function.score_function`.
+
+    cache = ScoreCache(max_entries=10_000, ttl=3600, path="/tmp/sf-results.sqlite")
+    result = cache.score(plan, metrics)        # dict, like score_function()
+    body = cache.score_json(plan, metrics)     # compact JSON, no re-serialization on hits
+
+Keys are ``(config fingerprint, profile, quantized metric vector)``: every value
+in :data:`score_function.METRIC_COLUMNS` order is rounded to a multiple of
+``quantum``, so metrics that differ by less than ``quantum`` share one entry
+(and the result of whichever was scored first). Non-finite values, and values
+too large to quantize, are keyed by their exact ``repr``. Entries are evicted
+least recently used first once ``max_entries`` or ``max_bytes`` is exceeded,
+and expire ``ttl`` seconds after they were stored.
+
+With ``path`` the cache is backed by a SQLite file that several processes
+(e.g. CLI runs on one CI runner) can share; the in-memory LRU sits in front of
+it. The file drops expired rows and is trimmed to ``max_entries`` rows when it
+is opened and every 256 inserts across all processes sharing it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from . import CompiledConfig, compile_config, score_function
+from .parallel import pack_record
+
+DEFAULT_QUANTUM = 1e-6
+DEFAULT_MAX_ENTRIES = 4096
+
+# Shared-file rows are pruned back to max_entries every this many inserts,
+# counted in the file itself so that short-lived processes add up.
+_PRUNE_EVERY = 256
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+Key = Tuple[str, str, Tuple[int | str, ...]]
+
+
+class ScoreCache:
+    """LRU + TTL result cache with hit/miss/eviction statistics."""
+
+    def __init__(
+        self,
+        *,
+        quantum: float = DEFAULT_QUANTUM,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        path: Optional[Path | str] = None,
+    ) -> None:
+        if quantum <= 0:
+            raise ValueError("quantum must be positive")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.quantum = quantum
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "shared_hits": 0}
+        self.bytes = 0
+        # key -> (expires_at or None, encoded result, accounted size)
+        self._entries: "OrderedDict[Key, Tuple[Optional[float], str, int]]" = OrderedDict()
+        self._plan: Optional[Tuple[Any, CompiledConfig]] = None
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = _open_shared(Path(path))
+            with self._db:
+                self._prune(time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _compiled(self, config: Dict[str, Any] | CompiledConfig) -> CompiledConfig:
+        if isinstance(config, CompiledConfig):
+            return config
+        if self._plan is None or self._plan[0] is not config:
+            self._plan = (config, compile_config(config))
+        return self._plan[1]
+
+    def key(self, config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Key:
+        """Cache key for ``metrics``; raises MetricsError for unscorable input."""
+        plan = self._compiled(config)
+        quantum = self.quantum
+        vector = []
+        for value in pack_record(metrics):
+            scaled = value / quantum
+            # NaN / inf score fine (clip() maps them) but cannot be rounded to an int.
+            vector.append(round(scaled) if math.isfinite(scaled) else repr(value))
+        return plan.fingerprint, plan.profile, tuple(vector)
+
+    def score_json(self, config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> str:
+        """Return the result as compact JSON, scoring only on a cache miss."""
+        plan = self._compiled(config)
+        key = self.key(plan, metrics)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, text, size = entry
+            if expires is None or expires > now:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return text
+            self._drop(key, size)
+            self.stats["expirations"] += 1
+        if self._db is not None:
+            shared = self._shared_get(key, now)
+            if shared is not None:
+                self.stats["shared_hits"] += 1
+                self._store(key, *shared)
+                return shared[0]
+        self.stats["misses"] += 1
+        text = _ENCODER.encode(score_function(plan, metrics))
+        expires = None if self.ttl is None else now + self.ttl
+        self._store(key, text, expires)
+        if self._db is not None:
+            self._shared_put(key, text, expires, now)
+        return text
+
+    def score(self, config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Cached equivalent of ``score_function(config, metrics)`` (a fresh dict)."""
+        return json.loads(self.score_json(config, metrics))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # -- in-memory LRU -------------------------------------------------------
+
+    def _store(self, key: Key, text: str, expires: Optional[float]) -> None:
+        size = len(text) + 8 * len(key[2]) + len(key[0]) + len(key[1])
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        self._entries[key] = (expires, text, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self.bytes > self.max_bytes and len(self._entries) > 1
+        ):
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: Key, size: int) -> None:
+        del self._entries[key]
+        self.bytes -= size
+
+    # -- shared SQLite file --------------------------------------------------
+
+    @staticmethod
+    def _row_key(key: Key) -> str:
+        vector = hashlib.blake2b(repr(key[2]).encode("ascii"), digest_size=16).hexdigest()
+        return f"{key[0]}:{key[1]}:{vector}"
+
+    def _shared_get(self, key: Key, now: float) -> Optional[Tuple[str, Optional[float]]]:
+        assert self._db is not None
+        row_key = self._row_key(key)
+        row = self._db.execute("SELECT value, expires FROM results WHERE key = ?", (row_key,)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires <= now:
+            with self._db:
+                self._db.execute("DELETE FROM results WHERE key = ?", (row_key,))
+            self.stats["expirations"] += 1
+            return None
+        with self._db:
+            self._db.execute("UPDATE results SET used = ? WHERE key = ?", (now, row_key))
+        return value, expires
+
+    def _shared_put(self, key: Key, text: str, expires: Optional[float], now: float) -> None:
+        assert self._db is not None
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                (self._row_key(key), text, expires, now),
+            )
+            self._db.execute("UPDATE meta SET value = value + 1 WHERE name = 'inserts'")
+            (inserts,) = self._db.execute("SELECT value FROM meta WHERE name = 'inserts'").fetchone()
+            if inserts % _PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired rows and trim the file to ``max_entries`` (inside a transaction)."""
+        assert self._db is not None
+        self._db.execute("DELETE FROM results WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+
+def _open_shared(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(path), timeout=10.0, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    with db:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, used REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        db.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('inserts', 0)")
+    return db
@@ -0,0 +1,496 @@
+"""Fit weights, taus and ``k_steep`` to labeled outcomes.
+
+    python -m score_function calibrate score-function.yml labeled.jsonl --label incident -o fitted.yml
+    python -m score_function calibrate score-function.yml corpus.sfm --labels labels.txt --fit weights -o fitted.json
+
+Each record carries a 0/1 outcome (``--label KEY`` in JSON/JSONL records, or
+one label per line in ``--labels`` for any corpus ``replay`` reads); 1 is the
+outcome to predict, e.g. "incident within 30 days". The model is
+``P(y = 1) = sigmoid(a + b * final / 100)``, so a useful config ends up with a
+clearly negative slope ``b``.
+
+Parameters are unconstrained: face weights are a softmax over logits (each
+face sums to 1), taus a logistic of a logit (inside ``(0, 1)``) and ``k_steep``
+the exponential of a log. Faces are linear in the weights times logistic
+penalties, and ``geo`` is a floored geometric mean, so ``log final`` is a sum of
+per-face ``log`` terms and its gradient is closed-form (as in
+:mod:`score_function.sensitivity`); one full-batch step is a few NumPy passes
+over the records. The link ``(a, b)`` is first fitted alone by Newton steps,
+then everything is optimised jointly with Adam on the mean log loss plus an L2
+pull (``--l2``) towards the starting config. A ``--holdout`` share of the
+records (seeded split) is kept out of the fit to report generalisation.
+
+The fitted config keeps everything else from the input, is validated like a
+loaded config and is written as YAML in the layout of ``score-function.yml``
+(or JSON for ``*.json``); weights are rounded to 6 places with the residual
+folded into each face's largest weight. Diagnostics (log loss, AUC and Brier
+score before and after, link, steps) go to stdout as JSON. NumPy is required.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import (
+    CRITICAL_FACTOR,
+    FACE_ORDER,
+    FACE_PENALTIES,
+    FACE_TERMS,
+    CompiledConfig,
+    compile_config,
+    load_config,
+    validate_config,
+)
+from .batch import _clip_unit, _numpy, columns_from_records
+from .bulk import _read_records
+from .replay import Corpus
+
+PARAMETER_GROUPS = ("weights", "taus", "k")
+DEFAULT_STEPS = 500
+DEFAULT_LEARNING_RATE = 0.05
+DEFAULT_L2 = 1e-4
+DEFAULT_HOLDOUT = 0.2
+DEFAULT_TOLERANCE = 1e-6  # relative improvement of the best loss over _PATIENCE steps that counts as converged
+_TAU_EDGE = 1e-3  # keeps tau logits finite for thresholds of exactly 0 or 1
+_NEWTON_STEPS = 25
+_PATIENCE = 20
+_LINK_RIDGE = 1e-6
+
+
+def _sigmoid(np: Any, x: Any) -> Any:
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _parse_label(value: Any) -> float:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return float(value)
+    if isinstance(value, str) and value.strip().lower() in ("0", "1", "true", "false"):
+        return float(value.strip().lower() in ("1", "true"))
+    raise ValueError(f"expected a 0/1 label, got {value!r}")
+
+
+def load_labeled(path: str, label: str = "label", labels_path: Optional[str] = None) -> Tuple[Dict[str, Any], Any]:
+    """``(columns, labels)`` as NumPy arrays from a labeled corpus."""
+    np = _numpy()
+    if np is None:
+        raise SystemExit("calibrate requires NumPy")
+    if labels_path is not None:
+        corpus = Corpus(path, use_numpy=True)
+        columns = {name: np.array(column) for name, column in corpus.columns.items()}
+        corpus.close()
+        with open(labels_path, encoding="utf-8") as handle:
+            values = []
+            for lineno, line in enumerate(handle, 1):
+                if line.strip():
+                    try:
+                        values.append(_parse_label(line))
+                    except ValueError as exc:
+                        raise SystemExit(f"{labels_path}:{lineno}: {exc}") from exc
+        if len(values) != len(columns["uncertainty_sigma"]):
+            raise SystemExit(f"{labels_path} has {len(values)} labels for {len(columns['uncertainty_sigma'])} records")
+        return columns, np.array(values)
+
+    values = []
+
+    def records(reader: Any) -> Iterable[Dict[str, Any]]:
+        for number, record in _read_records(path, reader):
+            if not isinstance(record, dict) or label not in record:
+                raise SystemExit(f"{path}:{number}: missing label '{label}'")
+            try:
+                values.append(_parse_label(record[label]))
+            except ValueError as exc:
+                raise SystemExit(f"{path}:{number}: {exc}") from exc
+            yield record
+
+    try:
+        reader = sys.stdin if path == "-" else open(path, encoding="utf-8", buffering=1 << 20)
+    except FileNotFoundError as exc:
+        raise SystemExit(f"Missing metrics file: {path}") from exc
+    try:
+        columns = columns_from_records(records(reader), use_numpy=True)
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+    return columns, np.array(values)
+
+
+class _Data:
+    """Parameter-independent inputs: clipped metric values as the terms and penalties see them."""
+
+    def __init__(self, np: Any, plan: CompiledConfig, columns: Dict[str, Any], labels: Any) -> None:
+        self.n = len(labels)
+        self.labels = labels
+
+        def value(name: str, inverted: bool) -> Any:
+            x = _clip_unit(np, np.asarray(columns[name], dtype=np.float64))
+            return 1.0 - x if inverted else x
+
+        self.terms = {
+            face: np.stack([value(f"{face}.{metric}", inverted) for metric, _, inverted in FACE_TERMS[face]], axis=1)
+            for face in FACE_ORDER
+        }
+        self.penalties = {
+            face: [value(f"{face}.{metric}", inverted) for _, metric, _, inverted in FACE_PENALTIES[face]]
+            for face in FACE_ORDER
+        }
+        critical = columns.get("sec.critical_count")
+        self.critical = (
+            np.ones(self.n) if critical is None else np.where(np.asarray(critical) >= 1.0, CRITICAL_FACTOR, 1.0)
+        )
+        sigma = columns.get("uncertainty_sigma")
+        self.log_damping = np.zeros(self.n) if sigma is None else np.log(1.0 - 0.1 * _clip_unit(np, sigma))
+
+    def subset(self, np: Any, index: Any) -> "_Data":
+        part = object.__new__(_Data)
+        part.n = len(index)
+        part.labels = self.labels[index]
+        part.terms = {face: matrix[index] for face, matrix in self.terms.items()}
+        part.penalties = {face: [column[index] for column in columns] for face, columns in self.penalties.items()}
+        part.critical = self.critical[index]
+        part.log_damping = self.log_damping[index]
+        return part
+
+
+class Model:
+    """Config parameters in unconstrained form, flattened into one vector.
+
+    Layout: per-face weight logits (FACE_TERMS order), tau logits
+    (FACE_PENALTIES order), ``log k``, then the link ``a`` and ``b``.
+    """
+
+    def __init__(self, np: Any, plan: CompiledConfig) -> None:
+        self.np = np
+        self.plan = plan
+        self.slices: Dict[str, slice] = {}
+        pieces = []
+        offset = 0
+        for face in FACE_ORDER:
+            weights = np.array([weight for _, weight, _ in plan.face_terms[face]], dtype=np.float64)
+            # Zero weights cannot be expressed by a softmax; start them just above zero.
+            logits = np.log(np.maximum(weights, 1e-6))
+            pieces.append(logits - logits.mean())
+            self.slices[face] = slice(offset, offset + len(weights))
+            offset += len(weights)
+        taus = [tau for face in FACE_ORDER for _, _, tau, _, _ in plan.penalties[face]]
+        taus_array = np.clip(np.array(taus, dtype=np.float64), _TAU_EDGE, 1.0 - _TAU_EDGE)
+        pieces.append(np.log(taus_array / (1.0 - taus_array)))
+        self.slices["taus"] = slice(offset, offset + len(taus))
+        offset += len(taus)
+        pieces.append(np.array([math.log(plan.k), 0.0, 0.0]))
+        self.k_index, self.a_index, self.b_index = offset, offset + 1, offset + 2
+        self.initial = np.concatenate(pieces)
+
+    def weights(self, params: Any, face: str) -> Any:
+        logits = params[self.slices[face]]
+        exp = self.np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    def taus(self, params: Any) -> Any:
+        return 1.0 / (1.0 + self.np.exp(-params[self.slices["taus"]]))
+
+    def mask(self, groups: Sequence[str]) -> Any:
+        """1.0 for trained entries (the link is always trained), 0.0 for frozen ones."""
+        mask = self.np.zeros(len(self.initial))
+        if "weights" in groups:
+            for face in FACE_ORDER:
+                mask[self.slices[face]] = 1.0
+        if "taus" in groups:
+            mask[self.slices["taus"]] = 1.0
+        if "k" in groups:
+            mask[self.k_index] = 1.0
+        mask[self.a_index] = mask[self.b_index] = 1.0
+        return mask
+
+    def scores(self, params: Any, data: _Data, *, gradient: bool = False) -> Tuple[Any, Any]:
+        """``final / 100`` per record and, with ``gradient``, a function of per-record weights.
+
+        The returned ``backward(c)`` gives ``sum_i c_i * d log final_i / d params``
+        for the config part of ``params``.
+        """
+        np = self.np
+        plan = self.plan
+        k = math.exp(params[self.k_index])
+        taus = self.taus(params)
+        log_geo = np.full(data.n, math.log(100.0))
+        cache = []
+        t = 0
+        n_faces = len(FACE_ORDER)
+        for face, multiplier in zip(FACE_ORDER, plan.profile_weights):
+            weights = self.weights(params, face)
+            linear = data.terms[face] @ weights
+            pen = np.ones(data.n)
+            penalty_cache = []
+            for (scale, _, _, _), v in zip(FACE_PENALTIES[face], data.penalties[face]):
+                tau = taus[t]
+                sig = 1.0 / (1.0 + np.exp(-k * (v - tau)))
+                factor = 1.0 - scale * sig
+                pen *= factor
+                penalty_cache.append((t, tau, v, scale * sig * (1.0 - sig) / factor))
+                t += 1
+            face_score = 100.0 * linear * pen
+            if face == "sec":
+                face_score = face_score * data.critical
+            adjusted = multiplier * face_score
+            active = adjusted > plan.floor_each
+            log_geo += np.log(np.maximum(plan.floor_each, adjusted) / 100.0) / n_faces
+            cache.append((face, weights, linear, active, penalty_cache))
+        score = np.exp(log_geo + data.log_damping) / 100.0
+        if not gradient:
+            return score, None
+
+        def backward(c: Any) -> Any:
+            grad = np.zeros(len(params))
+            for face, weights, linear, active, penalty_cache in cache:
+                # d log face / d ... only where the floor is inactive (then linear > 0).
+                cf = np.where(active, c, 0.0) / n_faces
+                safe = np.where(active, linear, 1.0)
+                grad[self.slices[face]] = weights * (data.terms[face].T @ (cf / safe) - cf.sum())
+                for index, tau, v, slope in penalty_cache:
+                    # d log factor / d tau = k * slope, / d k = -(v - tau) * slope
+                    grad[self.slices["taus"].start + index] = (cf * slope).sum() * k * tau * (1.0 - tau)
+                    grad[self.k_index] += -(cf * slope * (v - tau)).sum() * k
+            return grad
+
+        return score, backward
+
+    def loss(self, params: Any, data: _Data, l2: float = 0.0, mask: Any = None) -> Tuple[float, Any]:
+        """Mean log loss (+ L2 towards the start) and its gradient."""
+        np = self.np
+        score, backward = self.scores(params, data, gradient=True)
+        a, b = params[self.a_index], params[self.b_index]
+        eta = a + b * score
+        p = _sigmoid(np, eta)
+        y = data.labels
+        value = float(np.mean(np.logaddexp(0.0, eta) - y * eta))
+        r = (p - y) / data.n
+        grad = backward(r * b * score)
+        grad[self.a_index] = r.sum()
+        grad[self.b_index] = (r * score).sum()
+        diff = params - self.initial
+        diff[self.a_index] = diff[self.b_index] = 0.0
+        value += l2 * float(diff @ diff)
+        grad += 2.0 * l2 * diff
+        if mask is not None:
+            grad *= mask
+        return value, grad
+
+    def fit_link(self, params: Any, data: _Data) -> Any:
+        """Newton steps on ``(a, b)`` with the config part held fixed."""
+        np = self.np
+        score, _ = self.scores(params, data)
+        y = data.labels
+        a, b = 0.0, 0.0
+        for _ in range(_NEWTON_STEPS):
+            p = _sigmoid(np, a + b * score)
+            w = p * (1.0 - p) + 1e-12
+            # A tiny ridge keeps (a, b) finite when the labels are separable.
+            ridge = _LINK_RIDGE * data.n
+            g = np.array([(p - y).sum() + ridge * a, ((p - y) * score).sum() + ridge * b])
+            h = np.array([[w.sum(), (w * score).sum()], [(w * score).sum(), (w * score * score).sum()]])
+            step = np.linalg.solve(h + ridge * np.eye(2), g)
+            a, b = a - step[0], b - step[1]
+            if abs(step).max() < 1e-10:
+                break
+        params = params.copy()
+        params[self.a_index], params[self.b_index] = a, b
+        return params
+
+    def config(self, params: Any, fit: Sequence[str] = PARAMETER_GROUPS) -> Dict[str, Any]:
+        """The fitted config: the input config with the ``fit`` groups of weights, taus and ``k_steep`` replaced.
+
+        Groups that were not fitted are copied from the input config unchanged.
+        """
+        config = json.loads(json.dumps(self.plan.raw))
+        if "weights" in fit:
+            for face in FACE_ORDER:
+                weights = [round(float(w), 6) for w in self.weights(params, face)]
+                largest = max(range(len(weights)), key=weights.__getitem__)
+                weights[largest] = round(weights[largest] + 1.0 - math.fsum(weights), 6)
+                for (_, key, _), weight in zip(FACE_TERMS[face], weights):
+                    config["weights"][face][key] = weight
+        if "taus" in fit:
+            taus = iter(self.taus(params).tolist())
+            for face in FACE_ORDER:
+                for _, _, key, _ in FACE_PENALTIES[face]:
+                    config["thresholds"][face][key] = round(next(taus), 4)
+        if "k" in fit:
+            config["k_steep"] = round(math.exp(params[self.k_index]), 4)
+        validate_config(config, "fitted config")
+        return config
+
+
+def auc(np: Any, labels: Any, risk: Any) -> Optional[float]:
+    """Area under the ROC curve of ``risk`` for ``labels`` (tied ranks averaged)."""
+    positives = float(labels.sum())
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        return None
+    _, inverse, counts = np.unique(risk, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    ranks = (ends - (counts - 1) / 2.0)[inverse]
+    return float((ranks[labels == 1].sum() - positives * (positives + 1) / 2.0) / (positives * negatives))
+
+
+def _evaluate(model: Model, params: Any, data: _Data) -> Dict[str, Any]:
+    np = model.np
+    if not data.n:
+        return {"records": 0}
+    score, _ = model.scores(params, data)
+    eta = params[model.a_index] + params[model.b_index] * score
+    p = _sigmoid(np, eta)
+    y = data.labels
+    return {
+        "records": data.n,
+        "positive_rate": round(float(y.mean()), 4),
+        "log_loss": round(float(np.mean(np.logaddexp(0.0, eta) - y * eta)), 6),
+        "brier": round(float(np.mean((p - y) ** 2)), 6),
+        # Low scores should mean the outcome, so rank records by -final.
+        "auc": None if (value := auc(np, y, -score)) is None else round(value, 4),
+        "mean_final": round(float(100.0 * score.mean()), 4),
+    }
+
+
+def calibrate(
+    config: Dict[str, Any] | CompiledConfig,
+    columns: Dict[str, Any],
+    labels: Any,
+    *,
+    fit: Sequence[str] = PARAMETER_GROUPS,
+    steps: int = DEFAULT_STEPS,
+    learning_rate: float = DEFAULT_LEARNING_RATE,
+    l2: float = DEFAULT_L2,
+    holdout: float = DEFAULT_HOLDOUT,
+    seed: int = 0,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Fit ``fit`` (a subset of :data:`PARAMETER_GROUPS`); returns ``(config, diagnostics)``."""
+    np = _numpy()
+    if np is None:
+        raise SystemExit("calibrate requires NumPy")
+    unknown = sorted(set(fit) - set(PARAMETER_GROUPS))
+    if unknown:
+        raise SystemExit(f"Unknown parameter groups: {', '.join(unknown)} (choose from {', '.join(PARAMETER_GROUPS)})")
+    plan = compile_config(config)
+    labels = np.asarray(labels, dtype=np.float64)
+    data = _Data(np, plan, columns, labels)
+    order = np.random.default_rng(seed).permutation(data.n)
+    cut = int(round(data.n * (1.0 - holdout)))
+    train, test = data.subset(np, order[:cut]), data.subset(np, order[cut:])
+    if not train.n:
+        raise SystemExit("No training records (check --holdout)")
+
+    model = Model(np, plan)
+    start = model.fit_link(model.initial, train)
+    mask = model.mask(fit)
+    params = start.copy()
+    m = np.zeros(len(params))
+    v = np.zeros(len(params))
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    best = []  # lowest loss so far, per step
+    best_params = params
+    step = 0
+    for step in range(1, steps + 1):
+        value, grad = model.loss(params, train, l2, mask)
+        if not best or value < best[-1]:
+            best_params = params
+        best.append(min(value, best[-1]) if best else value)
+        if step > _PATIENCE and best[-_PATIENCE - 1] - best[-1] < tolerance * abs(best[-1]):
+            break
+        m = beta1 * m + (1.0 - beta1) * grad
+        v = beta2 * v + (1.0 - beta2) * grad * grad
+        params = params - learning_rate * (m / (1.0 - beta1 ** step)) / (np.sqrt(v / (1.0 - beta2 ** step)) + eps)
+    params = best_params
+
+    fitted = model.config(params, fit)
+    # Score the rounded config exactly as it will be written.
+    final_model = Model(np, compile_config(fitted))
+    final_params = final_model.initial.copy()
+    final_params[final_model.a_index] = params[model.a_index]
+    final_params[final_model.b_index] = params[model.b_index]
+    diagnostics = {
+        "fit": [group for group in PARAMETER_GROUPS if group in fit],
+        "steps": step,
+        "converged": step < steps,
+        "train_loss": [round(best[0], 6), round(best[-1], 6)],
+        "link": {"a": round(float(params[model.a_index]), 4), "b": round(float(params[model.b_index]), 4)},
+        "k_steep": [plan.k, fitted["k_steep"]],
+        "before": {"train": _evaluate(model, start, train), "holdout": _evaluate(model, start, test)},
+        "after": {
+            "train": _evaluate(final_model, final_params, train),
+            "holdout": _evaluate(final_model, final_params, test),
+        },
+    }
+    return fitted, diagnostics
+
+
+def dump_config(config: Dict[str, Any]) -> str:
+    """YAML in the layout of ``score-function.yml`` (readable without PyYAML)."""
+    lines: List[str] = []
+    for key, value in config.items():
+        if not isinstance(value, dict):
+            lines.append(f"{key}: {json.dumps(value)}")
+            continue
+        if lines:
+            lines.append("")
+        lines.append(f"{key}:")
+        width = max((len(name) for name in value), default=0) + 1
+        for name, item in value.items():
+            if isinstance(item, dict):
+                flow = ", ".join(f"{k}: {json.dumps(v)}" for k, v in item.items())
+                lines.append(f"  {name + ':':<{width}} {{ {flow} }}")
+            else:
+                lines.append(f"  {name}: {json.dumps(item)}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="score_function calibrate", description="Fit weights, taus and k_steep to labeled outcomes"
+    )
+    parser.add_argument("config", help="Starting score-function.yml (or JSON)")
+    parser.add_argument(
+        "metrics", help="Labeled metrics.json/metrics.jsonl ('-' for stdin), or any corpus with --labels"
+    )
+    parser.add_argument("-o", "--output", required=True, help="Fitted config to write (YAML, or JSON for *.json)")
+    parser.add_argument("--label", default="label", help="Record key holding the 0/1 outcome (default 'label')")
+    parser.add_argument("--labels", help="File with one 0/1 label per record, e.g. for binary metrics files")
+    parser.add_argument("--fit", default=",".join(PARAMETER_GROUPS), help="Parameters to fit (default weights,taus,k)")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="Maximum Adam steps")
+    parser.add_argument("--lr", type=float, default=DEFAULT_LEARNING_RATE, help="Adam learning rate")
+    parser.add_argument("--l2", type=float, default=DEFAULT_L2, help="L2 pull towards the starting parameters")
+    parser.add_argument("--holdout", type=float, default=DEFAULT_HOLDOUT, help="Share of records held out (0-1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the holdout split")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    config = load_config(Path(args.config))
+    columns, labels = load_labeled(args.metrics, args.label, args.labels)
+    fitted, diagnostics = calibrate(
+        config,
+        columns,
+        labels,
+        fit=[group.strip() for group in args.fit.split(",") if group.strip()],
+        steps=args.steps,
+        learning_rate=args.lr,
+        l2=args.l2,
+        holdout=args.holdout,
+        seed=args.seed,
+    )
+    tmp = f"{args.output}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        if args.output.endswith(".json"):
+            json.dump(fitted, handle, indent=2)
+            handle.write("\n")
+        else:
+            handle.write(dump_config(fitted))
+    os.replace(tmp, args.output)
+    json.dump(diagnostics, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    print(f"[score-function] wrote {args.output}", file=sys.stderr)
+    return 0
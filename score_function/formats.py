@@ -0,0 +1,423 @@
+"""Result output formats and the fixed-layout binary files.
+
+    python -m score_function score-function.yml metrics.json --format csv
+    python -m score_function score-function.yml repos.jsonl --stream --format binary > results.sfr
+
+    with BinaryFile("results.sfr") as results:
+        table = results.to_numpy()          # zero-copy structured array over the mmap
+        failing = table[table["gate_ok"] == 0]
+
+``json`` is the usual indented object (a JSON array with ``--stream``),
+``jsonl`` one compact object per line, and ``csv`` one row per result and
+profile: ``faces.<face>``, ``weighted_faces.<face>``, ``geo``, ``final``,
+``gate_ok``, ``profile`` and the passthrough keys (``id``, ``path``).
+
+``binary`` files are little-endian and laid out so they can be memory-mapped
+and read without parsing::
+
+    header   <4sHHII   magic, version, record size, name count, data offset
+    names    name count x 32 bytes, UTF-8, NUL-padded
+    records  from the data offset (a multiple of 8), record size bytes each
+
+Result files (magic ``SFR1``) name the profiles. Each 120-byte record is
+``<14dBB6x``: the six faces, the six weighted faces, ``geo`` and ``final`` as
+float64 (faces in :data:`score_function.FACE_ORDER`), then ``gate_ok`` and the
+index of the record's profile in the names, one byte each. Passthrough keys
+are not stored.
+
+Metric files (magic ``SFM1``, e.g. ``tools/collect_metrics.py --format
+binary`` or ``python -m score_function convert``) name their columns, normally
+:data:`score_function.METRIC_COLUMNS`; each record is one float64 per column.
+:mod:`score_function.bulk` scores them straight from the map.
+"""
+from __future__ import annotations
+
+import abc
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import FACE_ORDER, METRIC_COLUMNS
+from .parallel import pack_record
+from .stream import FLUSH_EVERY, PASSTHROUGH_KEYS
+
+FORMATS = ("json", "jsonl", "csv", "binary")
+
+RESULTS_MAGIC = b"SFR1"
+METRICS_MAGIC = b"SFM1"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHHII")
+NAME_SIZE = 32
+RESULT_RECORD = struct.Struct(f"<{2 * len(FACE_ORDER) + 2}dBB6x")
+
+CSV_COLUMNS: Tuple[str, ...] = (
+    *(f"faces.{face}" for face in FACE_ORDER),
+    *(f"weighted_faces.{face}" for face in FACE_ORDER),
+    "geo",
+    "final",
+    "gate_ok",
+    "profile",
+    *PASSTHROUGH_KEYS,
+)
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def encode_header(magic: bytes, record_size: int, names: Sequence[str]) -> bytes:
+    """Header and name table of a binary file; records start right after it."""
+    table = bytearray()
+    for name in names:
+        encoded = name.encode("utf-8")
+        if len(encoded) >= NAME_SIZE:
+            raise ValueError(f"name too long for a binary file: {name!r}")
+        table += encoded.ljust(NAME_SIZE, b"\0")
+    offset = HEADER.size + len(table)
+    offset += -offset % 8
+    header = HEADER.pack(magic, FORMAT_VERSION, record_size, len(names), offset) + table
+    return header.ljust(offset, b"\0")
+
+
+def _rows(result: Dict[str, Any]) -> Iterator[Tuple[Dict[str, float], Dict[str, Any], str]]:
+    """``(faces, profile fields, profile name)`` per profile of a result."""
+    if "profiles" in result:
+        for name, fields in result["profiles"].items():
+            yield result["faces"], fields, name
+    else:
+        yield result["faces"], result, result["profile"]
+
+
+class _Writer(abc.ABC):
+    """Buffered writer of results in one format; call :meth:`close` at the end."""
+
+    def __init__(self, out: IO[Any]) -> None:
+        self.out = out
+        self.pending: List[Any] = []
+
+    def write(self, result: Dict[str, Any]) -> None:
+        self.pending.extend(self.encode(result))
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    @abc.abstractmethod
+    def encode(self, result: Dict[str, Any]) -> Iterable[Any]:
+        """The chunks to buffer for ``result``."""
+
+    def flush(self) -> None:
+        if self.pending:
+            self.out.write("".join(self.pending))
+            self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.out.flush()
+
+
+class _JSONLWriter(_Writer):
+    def encode(self, result: Dict[str, Any]) -> Iterable[str]:
+        return (_ENCODER.encode(result) + "\n",)
+
+
+class _JSONWriter(_Writer):
+    """A JSON array with one compact result per line."""
+
+    def __init__(self, out: IO[str]) -> None:
+        super().__init__(out)
+        self.separator = "[\n"
+
+    def encode(self, result: Dict[str, Any]) -> Iterable[str]:
+        text = self.separator + _ENCODER.encode(result)
+        self.separator = ",\n"
+        return (text,)
+
+    def close(self) -> None:
+        self.pending.append("[]\n" if self.separator == "[\n" else "\n]\n")
+        super().close()
+
+
+class _CSVWriter(_Writer):
+    def __init__(self, out: IO[str]) -> None:
+        super().__init__(out)
+        self.csv = csv.writer(out, lineterminator="\n")
+        self.pending.append(CSV_COLUMNS)
+
+    def encode(self, result: Dict[str, Any]) -> Iterable[Tuple[Any, ...]]:
+        extra = tuple(result.get(key, "") for key in PASSTHROUGH_KEYS)
+        return [
+            (
+                *(faces[face] for face in FACE_ORDER),
+                *(fields["weighted_faces"][face] for face in FACE_ORDER),
+                fields["geo"],
+                fields["final"],
+                "true" if fields["gate_ok"] else "false",
+                name,
+                *extra,
+            )
+            for faces, fields, name in _rows(result)
+        ]
+
+    def flush(self) -> None:
+        if self.pending:
+            self.csv.writerows(self.pending)
+            self.pending.clear()
+
+
+class _BinaryWriter(_Writer):
+    def __init__(self, out: IO[bytes], profiles: Sequence[str]) -> None:
+        if len(profiles) > 255:
+            raise ValueError("binary result files hold at most 255 profiles")
+        super().__init__(out)
+        self.index = {name: i for i, name in enumerate(profiles)}
+        self.pending.append(encode_header(RESULTS_MAGIC, RESULT_RECORD.size, profiles))
+
+    def encode(self, result: Dict[str, Any]) -> Iterable[bytes]:
+        pack = RESULT_RECORD.pack
+        records = []
+        for faces, fields, name in _rows(result):
+            if name not in self.index:
+                raise ValueError(f"profile {name!r} is not in the file header")
+            weighted = fields["weighted_faces"]
+            records.append(
+                pack(
+                    *(faces[face] for face in FACE_ORDER),
+                    *(weighted[face] for face in FACE_ORDER),
+                    fields["geo"],
+                    fields["final"],
+                    1 if fields["gate_ok"] else 0,
+                    self.index[name],
+                )
+            )
+        return records
+
+    def flush(self) -> None:
+        if self.pending:
+            self.out.write(b"".join(self.pending))
+            self.pending.clear()
+
+
+class MetricsWriter:
+    """Write metric dicts as a binary metrics file in ``METRIC_COLUMNS`` order."""
+
+    def __init__(self, out: IO[bytes]) -> None:
+        self.out = out
+        self.record = struct.Struct(f"<{len(METRIC_COLUMNS)}d")
+        self.pending: List[bytes] = [encode_header(METRICS_MAGIC, self.record.size, METRIC_COLUMNS)]
+        self.count = 0
+
+    def write(self, metrics: Dict[str, Any]) -> None:
+        """Append one record; raises MetricsError for unscorable input."""
+        self.pending.append(self.record.pack(*pack_record(metrics)))
+        self.count += 1
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.out.write(b"".join(self.pending))
+            self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.out.flush()
+
+
+def sniff(path: os.PathLike[str] | str) -> Optional[str]:
+    """``"results"`` or ``"metrics"`` for a binary file, None for anything else."""
+    try:
+        with open(path, "rb") as handle:
+            magic = handle.read(len(RESULTS_MAGIC))
+    except OSError:
+        return None
+    return {RESULTS_MAGIC: "results", METRICS_MAGIC: "metrics"}.get(magic)
+
+
+def result_dtype(np: Any) -> Any:
+    """NumPy structured dtype of one result record."""
+    n = len(FACE_ORDER)
+    return np.dtype(
+        [
+            ("faces", "<f8", (n,)),
+            ("weighted_faces", "<f8", (n,)),
+            ("geo", "<f8"),
+            ("final", "<f8"),
+            ("gate_ok", "u1"),
+            ("profile", "u1"),
+            ("_pad", "V6"),
+        ]
+    )
+
+
+def encode_result_batch(np: Any, batch: Dict[str, Any], names: Sequence[str]) -> bytes:
+    """Result records for a NumPy batch (``score_function_batch`` or ``score_profiles_batch``).
+
+    Values are rounded to 4 decimals like ``score_function``; profiles of one
+    record are adjacent, as :class:`_BinaryWriter` writes them.
+    """
+    profiles = batch["profiles"] if "profiles" in batch else {batch["profile"]: batch}
+    step = len(profiles)
+    faces = np.round(np.column_stack([batch["faces"][face] for face in FACE_ORDER]), 4)
+    table = np.zeros(len(faces) * step, dtype=result_dtype(np))
+    for offset, (name, fields) in enumerate(profiles.items()):
+        rows = table[offset::step]
+        rows["faces"] = faces
+        rows["weighted_faces"] = np.round(np.column_stack([fields["weighted_faces"][face] for face in FACE_ORDER]), 4)
+        rows["geo"] = np.round(fields["geo"], 4)
+        rows["final"] = np.round(fields["final"], 4)
+        rows["gate_ok"] = fields["gate_ok"]
+        rows["profile"] = names.index(name)
+    return table.tobytes()
+
+
+def open_writer(fmt: str, out: IO[Any], *, profiles: Sequence[str] = ()) -> _Writer:
+    """Return a writer for ``fmt``; ``binary`` needs a byte stream and every profile up front."""
+    if fmt == "json":
+        return _JSONWriter(out)
+    if fmt == "jsonl":
+        return _JSONLWriter(out)
+    if fmt == "csv":
+        return _CSVWriter(out)
+    if fmt == "binary":
+        return _BinaryWriter(out, profiles)
+    raise ValueError(f"Unknown format '{fmt}' (known: {', '.join(FORMATS)})")
+
+
+def write_results(
+    fmt: str, out: IO[Any], results: Iterable[Dict[str, Any]], *, profiles: Sequence[str] = ()
+) -> int:
+    """Write ``results`` to ``out`` in ``fmt`` and return how many were written."""
+    writer = open_writer(fmt, out, profiles=profiles)
+    count = 0
+    for result in results:
+        writer.write(result)
+        count += 1
+    writer.close()
+    return count
+
+
+class BinaryFile:
+    """Read-only memory map of a binary result (``SFR1``) or metric (``SFM1``) file.
+
+    ``buffer`` is a :class:`memoryview` over the records, :meth:`rows` unpacks
+    them with :mod:`struct`, :meth:`to_numpy` views them as a NumPy structured
+    array without copying and iterating yields result or metric dicts.
+    """
+
+    def __init__(self, path: os.PathLike[str] | str) -> None:
+        self.path = os.fspath(path)
+        with open(self.path, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{self.path}: not a score-function binary file")
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, offset = HEADER.unpack_from(self._mmap)
+        if magic not in (RESULTS_MAGIC, METRICS_MAGIC) or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{self.path}: not a score-function binary file (version {FORMAT_VERSION})")
+        self.kind = "results" if magic == RESULTS_MAGIC else "metrics"
+        self.names: Tuple[str, ...] = tuple(
+            bytes(self._mmap[start:start + NAME_SIZE]).rstrip(b"\0").decode("utf-8")
+            for start in range(HEADER.size, HEADER.size + count * NAME_SIZE, NAME_SIZE)
+        )
+        self.record = RESULT_RECORD if self.kind == "results" else struct.Struct(f"<{count}d")
+        if record_size != self.record.size:
+            self._mmap.close()
+            raise ValueError(f"{self.path}: record size {record_size}, expected {self.record.size}")
+        self.offset = offset
+        self.count = (len(self._mmap) - offset) // record_size
+        self.buffer = memoryview(self._mmap)[offset:offset + self.count * record_size]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> "BinaryFile":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap the file; a map still exported to NumPy arrays is left to the garbage collector."""
+        try:
+            self.buffer.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Unpacked record tuples, straight from the map."""
+        return self.record.iter_unpack(self.buffer)
+
+    def dtype(self, np: Any) -> Any:
+        if self.kind == "metrics":
+            return np.dtype([(name, "<f8") for name in self.names])
+        return result_dtype(np)
+
+    def to_numpy(self) -> Any:
+        """Structured array over the mapped records (no copy); needs NumPy."""
+        import numpy as np  # type: ignore
+
+        return np.frombuffer(self.buffer, dtype=self.dtype(np), count=self.count)
+
+    def columns(self, start: int = 0, stop: Optional[int] = None, *, np: Any = None) -> Dict[str, Any]:
+        """Metric columns of records ``start:stop`` for the batch engine.
+
+        With NumPy (``np``) every column is a strided view into the map, so
+        nothing is copied; otherwise each column is an ``array('d')``.
+        """
+        if self.kind != "metrics":
+            raise ValueError(f"{self.path}: not a binary metrics file")
+        stop = self.count if stop is None else min(stop, self.count)
+        width = len(self.names)
+        view = self.buffer[start * self.record.size:stop * self.record.size]
+        if np is not None:
+            matrix = np.frombuffer(view, dtype="<f8").reshape(-1, width)
+            return {name: matrix[:, i] for i, name in enumerate(self.names)}
+        values = array("d")
+        values.frombytes(view)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return {name: values[i::width] for i, name in enumerate(self.names)}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.results() if self.kind == "results" else self.metrics()
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """Result dicts shaped like :func:`score_function.score_function` output."""
+        n = len(FACE_ORDER)
+        for row in self.rows():
+            yield {
+                "faces": dict(zip(FACE_ORDER, row[:n])),
+                "weighted_faces": dict(zip(FACE_ORDER, row[n:2 * n])),
+                "geo": row[2 * n],
+                "final": row[2 * n + 1],
+                "gate_ok": bool(row[2 * n + 2]),
+                "profile": self.names[row[2 * n + 3]],
+            }
+
+    def metrics(self) -> Iterator[Dict[str, Any]]:
+        """Nested metric dicts (``metrics.json`` shape)."""
+        for row in self.rows():
+            record: Dict[str, Any] = {}
+            for name, value in zip(self.names, row):
+                face, _, key = name.rpartition(".")
+                if name == "sec.critical_count":
+                    value = int(value)
+                (record.setdefault(face, {}) if face else record)[key] = value
+            yield record
+
+
+def read_binary(path: os.PathLike[str] | str, *, use_numpy: Optional[bool] = None) -> Any:
+    """Load a whole binary file: a NumPy structured array when available, else a list of dicts."""
+    from .batch import _resolve_numpy
+
+    binary = BinaryFile(path)
+    if _resolve_numpy(use_numpy) is not None:
+        return binary.to_numpy()
+    try:
+        return list(binary)
+    finally:
+        binary.close()
@@ -0,0 +1,288 @@
+"""Local score history in SQLite, indexed for regression queries.
+
+    python -m score_function score-function.yml metrics.json --history scores.db --repo org/app --commit "$SHA"
+    python -m score_function history scores.db last --repo org/app -n 20
+    python -m score_function history scores.db flip --repo org/app
+    python -m score_function history scores.db regressions --threshold 5 --since 2024-06-01
+
+One row per scored result: repo, commit, timestamp, profile, ``final``,
+``geo``, ``gate_ok`` and the six faces. Each row also records whether
+``gate_ok`` differs from the repo's previous row, and each repo points at its
+latest row, so "last N", "last gate flip" and "faces dropped since a baseline"
+are index lookups rather than scans. Rows are expected to be appended in
+chronological order per repo.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import FACE_ORDER, load_json
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    latest_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    repo_id INTEGER NOT NULL REFERENCES repos (id),
+    commit_sha TEXT,
+    ts REAL NOT NULL,
+    profile TEXT,
+    final REAL NOT NULL,
+    geo REAL NOT NULL,
+    gate_ok INTEGER NOT NULL,
+    gate_flipped INTEGER NOT NULL,
+    {", ".join(f"face_{face} REAL NOT NULL" for face in FACE_ORDER)}
+);
+CREATE INDEX IF NOT EXISTS scores_repo_ts ON scores (repo_id, ts);
+CREATE INDEX IF NOT EXISTS scores_repo_commit ON scores (repo_id, commit_sha);
+CREATE INDEX IF NOT EXISTS scores_flips ON scores (repo_id, ts) WHERE gate_flipped = 1;
+"""
+
+_COLUMNS = "s.id, r.name, s.commit_sha, s.ts, s.profile, s.final, s.geo, s.gate_ok, s.gate_flipped, " + ", ".join(
+    f"s.face_{face}" for face in FACE_ORDER
+)
+
+
+def parse_timestamp(value: str | float | int | None) -> float:
+    """Unix seconds from a number, an ISO 8601 string (UTC if naive) or None (now)."""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise SystemExit(f"Invalid timestamp: {value}") from exc
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _row(row: tuple) -> Dict[str, Any]:
+    return {
+        "repo": row[1],
+        "commit": row[2],
+        "timestamp": _iso(row[3]),
+        "profile": row[4],
+        "final": row[5],
+        "geo": row[6],
+        "gate_ok": bool(row[7]),
+        "gate_flipped": bool(row[8]),
+        "faces": dict(zip(FACE_ORDER, row[9:])),
+    }
+
+
+class HistoryStore:
+    """Append-mostly store of scored results (a SQLite file)."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.db = sqlite3.connect(str(self.path), timeout=10.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.executescript(_SCHEMA)
+        self._repo_ids: Dict[str, int] = {}
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _repo_id(self, repo: str) -> int:
+        repo_id = self._repo_ids.get(repo)
+        if repo_id is None:
+            self.db.execute("INSERT OR IGNORE INTO repos (name) VALUES (?)", (repo,))
+            repo_id = self.db.execute("SELECT id FROM repos WHERE name = ?", (repo,)).fetchone()[0]
+            self._repo_ids[repo] = repo_id
+        return repo_id
+
+    def append(
+        self,
+        result: Dict[str, Any],
+        *,
+        repo: str,
+        commit: Optional[str] = None,
+        timestamp: str | float | None = None,
+    ) -> None:
+        """Store one ``score_function`` result."""
+        self.append_many([(result, repo, commit, timestamp)])
+
+    def append_many(self, rows: Iterable[tuple]) -> int:
+        """Store ``(result, repo, commit, timestamp)`` tuples in one transaction."""
+        insert = (
+            "INSERT INTO scores (repo_id, commit_sha, ts, profile, final, geo, gate_ok, gate_flipped, "
+            + ", ".join(f"face_{face}" for face in FACE_ORDER)
+            + ") VALUES ("
+            + ", ".join("?" * (8 + len(FACE_ORDER)))
+            + ")"
+        )
+        count = 0
+        with self.db:
+            latest_gate: Dict[int, Optional[int]] = {}
+            for result, repo, commit, timestamp in rows:
+                repo_id = self._repo_id(repo)
+                if repo_id not in latest_gate:
+                    previous = self.db.execute(
+                        "SELECT s.gate_ok FROM repos r JOIN scores s ON s.id = r.latest_id WHERE r.id = ?", (repo_id,)
+                    ).fetchone()
+                    latest_gate[repo_id] = None if previous is None else previous[0]
+                gate_ok = int(bool(result["gate_ok"]))
+                flipped = int(latest_gate[repo_id] is not None and latest_gate[repo_id] != gate_ok)
+                cursor = self.db.execute(
+                    insert,
+                    (
+                        repo_id,
+                        commit,
+                        parse_timestamp(timestamp),
+                        result.get("profile"),
+                        result["final"],
+                        result["geo"],
+                        gate_ok,
+                        flipped,
+                        *(result["faces"][face] for face in FACE_ORDER),
+                    ),
+                )
+                self.db.execute("UPDATE repos SET latest_id = ? WHERE id = ?", (cursor.lastrowid, repo_id))
+                latest_gate[repo_id] = gate_ok
+                count += 1
+        return count
+
+    # -- queries -------------------------------------------------------------
+
+    def repos(self) -> List[str]:
+        return [name for (name,) in self.db.execute("SELECT name FROM repos ORDER BY name")]
+
+    def last(self, repo: str, n: int = 10) -> List[Dict[str, Any]]:
+        """The ``n`` most recent results for ``repo``, newest first."""
+        rows = self.db.execute(
+            f"SELECT {_COLUMNS} FROM scores s JOIN repos r ON r.id = s.repo_id "
+            "WHERE r.name = ? ORDER BY s.ts DESC LIMIT ?",
+            (repo, n),
+        )
+        return [_row(row) for row in rows]
+
+    def last_flip(self, repo: str) -> Optional[Dict[str, Any]]:
+        """The most recent result whose ``gate_ok`` differs from the one before it."""
+        row = self.db.execute(
+            f"SELECT {_COLUMNS} FROM scores s JOIN repos r ON r.id = s.repo_id "
+            "WHERE r.name = ? AND s.gate_flipped = 1 ORDER BY s.ts DESC LIMIT 1",
+            (repo,),
+        ).fetchone()
+        return None if row is None else _row(row)
+
+    def _baseline(self, repo_id: int, commit: Optional[str], since: Optional[float]) -> Optional[tuple]:
+        if commit is not None:
+            query, args = "s.repo_id = ? AND s.commit_sha = ? ORDER BY s.ts DESC", (repo_id, commit)
+        elif since is not None:
+            query, args = "s.repo_id = ? AND s.ts <= ? ORDER BY s.ts DESC", (repo_id, since)
+        else:  # the repo's first row
+            query, args = "s.repo_id = ? ORDER BY s.ts ASC", (repo_id,)
+        return self.db.execute(
+            f"SELECT {_COLUMNS} FROM scores s JOIN repos r ON r.id = s.repo_id WHERE {query} LIMIT 1", args
+        ).fetchone()
+
+    def regressions(
+        self,
+        threshold: float,
+        *,
+        repo: Optional[str] = None,
+        baseline_commit: Optional[str] = None,
+        since: str | float | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Repos whose latest faces dropped more than ``threshold`` points.
+
+        The baseline is the row for ``baseline_commit``, else the last row at or
+        before ``since``, else the repo's first row. Only repos with at least
+        one dropped face are returned.
+        """
+        since_ts = None if since is None else parse_timestamp(since)
+        repos = self.db.execute(
+            f"SELECT r.id, {_COLUMNS} FROM repos r JOIN scores s ON s.id = r.latest_id"
+            + (" WHERE r.name = ?" if repo is not None else ""),
+            (repo,) if repo is not None else (),
+        ).fetchall()
+        found = []
+        for repo_id, *latest in repos:
+            baseline = self._baseline(repo_id, baseline_commit, since_ts)
+            if baseline is None or baseline[0] == latest[0]:
+                continue
+            before, after = _row(baseline), _row(tuple(latest))
+            dropped = {
+                face: round(before["faces"][face] - after["faces"][face], 4)
+                for face in FACE_ORDER
+                if before["faces"][face] - after["faces"][face] > threshold
+            }
+            if dropped:
+                found.append({"repo": after["repo"], "baseline": before, "latest": after, "dropped": dropped})
+        return found
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="score_function history", description="Query the local score history")
+    parser.add_argument("db", help="History SQLite file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Store a result JSON produced by score_function")
+    add.add_argument("result", help="Result JSON file ('-' for stdin)")
+    add.add_argument("--repo", required=True)
+    add.add_argument("--commit")
+    add.add_argument("--timestamp", help="ISO 8601 or Unix seconds (default: now)")
+
+    last = commands.add_parser("last", help="Most recent results for a repo")
+    last.add_argument("--repo", required=True)
+    last.add_argument("-n", type=int, default=10)
+
+    flip = commands.add_parser("flip", help="When gate_ok last changed for a repo")
+    flip.add_argument("--repo", required=True)
+
+    regressions = commands.add_parser("regressions", help="Faces that dropped since a baseline")
+    regressions.add_argument("--threshold", type=float, default=5.0, help="Minimum drop in points (default 5)")
+    regressions.add_argument("--repo", help="Only this repo (default: all)")
+    baseline = regressions.add_mutually_exclusive_group()
+    baseline.add_argument("--baseline-commit", help="Compare against the row for this commit")
+    baseline.add_argument("--since", help="Compare against the last row at or before this time")
+
+    commands.add_parser("repos", help="List repos")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    with HistoryStore(args.db) as store:
+        if args.command == "add":
+            result = json.load(sys.stdin) if args.result == "-" else load_json(Path(args.result))
+            store.append(result, repo=args.repo, commit=args.commit, timestamp=args.timestamp)
+            return 0
+        if args.command == "last":
+            output: Any = store.last(args.repo, args.n)
+        elif args.command == "flip":
+            output = store.last_flip(args.repo)
+        elif args.command == "regressions":
+            output = store.regressions(
+                args.threshold, repo=args.repo, baseline_commit=args.baseline_commit, since=args.since
+            )
+        else:
+            output = store.repos()
+    json.dump(output, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
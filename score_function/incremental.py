@@ -0,0 +1,116 @@
+"""Stateful re-scoring that only recomputes the faces touched by an update.
+
+    scorer = IncrementalScorer(config, metrics, epsilon=0.5)
+    event = scorer.update({"sec": {"CVSS_sum": 0.4, "critical_count": 1}})
+    if event is not None and event.gate_flipped:
+        notify(event)
+
+Per-face scores and the floored ``S'/100`` factors of the geometric mean are
+cached, so an update re-runs only the changed faces' formulas and then
+refreshes ``geo``, ``final`` and ``gate_ok`` from the six cached factors.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import FACE_ORDER, CompiledConfig, MetricsError, _compiled_face, _ensure_face, clip, compile_config
+
+
+class ScoreEvent(NamedTuple):
+    """Emitted when ``gate_ok`` flips or ``final`` moves by more than epsilon."""
+
+    final: float
+    previous_final: float
+    gate_ok: bool
+    gate_flipped: bool
+    changed_faces: Tuple[str, ...]
+
+
+class IncrementalScorer:
+    """Keeps one metric set scored and applies partial updates in O(1).
+
+    ``epsilon`` is measured against the ``final`` of the last emitted event (or
+    the initial score), so slow drift still triggers an event once it adds up.
+    ``on_event`` is called with every emitted :class:`ScoreEvent`.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any] | CompiledConfig,
+        metrics: Dict[str, Any],
+        *,
+        epsilon: float = 0.0,
+        on_event: Optional[Callable[[ScoreEvent], None]] = None,
+    ) -> None:
+        self.plan = compile_config(config)
+        self.epsilon = epsilon
+        self.on_event = on_event
+        self.metrics: Dict[str, Dict[str, Any]] = {face: dict(_ensure_face(metrics, face)) for face in FACE_ORDER}
+        self.sigma = float(metrics.get("uncertainty_sigma", 0.0))
+        self.faces: Dict[str, float] = {}
+        self._factors: List[float] = [0.0] * len(FACE_ORDER)
+        self._index = {face: i for i, face in enumerate(FACE_ORDER)}
+        for face in FACE_ORDER:
+            self._set_face(face, _compiled_face(self.plan, face, self.metrics[face]))
+        self._refresh()
+        self._emitted_final = self.final
+        self._emitted_gate = self.gate_ok
+
+    def _set_face(self, face: str, score: float) -> None:
+        self.faces[face] = score
+        multiplier = self.plan.profile_weights[self._index[face]]
+        self._factors[self._index[face]] = max(self.plan.floor_each, score * multiplier) / 100.0
+
+    def _refresh(self) -> None:
+        self.geo = 100.0 * math.prod(self._factors) ** (1.0 / len(FACE_ORDER))
+        self.final = self.geo * (1.0 - 0.1 * clip(self.sigma))
+        self.gate_ok = min(self.faces.values()) >= self.plan.min_each and self.geo >= self.plan.min_geo
+
+    def update(self, delta: Dict[str, Any]) -> Optional[ScoreEvent]:
+        """Merge ``delta`` (e.g. ``{"sec": {...}}``) and re-score affected faces.
+
+        Face entries are merged key by key into the stored metrics. The update is
+        applied atomically: if any face fails to score, the state is unchanged.
+        """
+        rescored: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        for face, values in delta.items():
+            if face == "uncertainty_sigma":
+                continue
+            if face not in self._index:
+                raise MetricsError(f"Unknown face '{face}' in update")
+            merged = {**self.metrics[face], **values}
+            rescored[face] = (merged, _compiled_face(self.plan, face, merged))
+        sigma = float(delta.get("uncertainty_sigma", self.sigma))
+
+        for face, (merged, score) in rescored.items():
+            self.metrics[face] = merged
+            self._set_face(face, score)
+        self.sigma = sigma
+        self._refresh()
+        return self._maybe_emit(tuple(face for face in FACE_ORDER if face in rescored))
+
+    def _maybe_emit(self, changed_faces: Tuple[str, ...]) -> Optional[ScoreEvent]:
+        flipped = self.gate_ok != self._emitted_gate
+        if not flipped and abs(self.final - self._emitted_final) <= self.epsilon:
+            return None
+        event = ScoreEvent(self.final, self._emitted_final, self.gate_ok, flipped, changed_faces)
+        self._emitted_final = self.final
+        self._emitted_gate = self.gate_ok
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+    def result(self) -> Dict[str, Any]:
+        """Current score in the same shape as :func:`score_function.score_function`."""
+        return {
+            "faces": {face: round(self.faces[face], 4) for face in FACE_ORDER},
+            "weighted_faces": {
+                face: round(self.faces[face] * multiplier, 4)
+                for face, multiplier in zip(FACE_ORDER, self.plan.profile_weights)
+            },
+            "geo": round(self.geo, 4),
+            "final": round(self.final, 4),
+            "gate_ok": bool(self.gate_ok),
+            "profile": self.plan.profile,
+        }
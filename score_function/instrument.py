@@ -0,0 +1,174 @@
+"""Opt-in timing and counters for the scoring hot path.
+
+    from score_function.instrument import instrumented
+
+    with instrumented() as inst:
+        score_function(config, metrics)
+    print(inst.snapshot())
+
+While no :class:`Instrumentation` is enabled every hook in ``score_function``
+is a single ``is not None`` check on a module global, so the default path pays
+nothing measurable. Enabled, ``load_config``, ``load_json``, ``score_function``,
+``main`` and each face of ``compute_faces`` (``compute_faces.<face>``) report
+wall time, and these counters are kept:
+
+* ``records_scored`` -- ``score_function`` calls that returned a result.
+* ``clips_clamped`` -- metric or sigma values outside ``[0, 1]`` (or NaN)
+  that a clip actually changed.
+* ``critical_overrides`` -- records whose ``sec.critical_count >= 1`` scaled
+  the security face by ``CRITICAL_FACTOR``.
+
+Hooks registered with :meth:`Instrumentation.add_hook` receive
+``(name, seconds)`` for every timed call, e.g. to feed a metrics exporter.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import score_function as _core
+
+from . import FACE_ORDER, CompiledConfig, _compiled_face, _ensure_face, compile_config
+
+Hook = Callable[[str, float], None]
+
+_PSTATS_SUFFIXES = (".prof", ".pstats")
+
+
+class Instrumentation:
+    """Aggregated timings (count/total/min/max per name) and counters."""
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {"records_scored": 0, "clips_clamped": 0, "critical_overrides": 0}
+        self.hooks: List[Hook] = []
+        self._plan: Optional[Tuple[Any, CompiledConfig]] = None
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def record(self, name: str, seconds: float) -> None:
+        stats = self.timings.get(name)
+        if stats is None:
+            self.timings[name] = [1, seconds, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds < stats[2]:
+                stats[2] = seconds
+            if seconds > stats[3]:
+                stats[3] = seconds
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def time_call(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    # -- hot path ------------------------------------------------------------
+
+    def _compiled(self, config: Dict[str, Any] | CompiledConfig) -> CompiledConfig:
+        if isinstance(config, CompiledConfig):
+            return config
+        # Dict configs are compiled once per object; the reference keeps the id valid.
+        if self._plan is None or self._plan[0] is not config:
+            self._plan = (config, compile_config(config))
+        return self._plan[1]
+
+    def compute_faces(self, config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, float]:
+        plan = self._compiled(config)
+        clock = time.perf_counter
+        faces: Dict[str, float] = {}
+        for face in FACE_ORDER:
+            face_metrics = _ensure_face(metrics, face)
+            start = clock()
+            faces[face] = _compiled_face(plan, face, face_metrics)
+            self.record(f"compute_faces.{face}", clock() - start)
+            clamped = 0
+            for metric, _, _ in plan.face_terms[face]:
+                value = float(face_metrics[metric])
+                if not 0.0 <= value <= 1.0:  # NaN is clamped (to 1.0) too
+                    clamped += 1
+            if clamped:
+                self.count("clips_clamped", clamped)
+        if int(metrics["sec"].get("critical_count", 0)) >= 1:
+            self.count("critical_overrides")
+        return faces
+
+    def score_function(
+        self, impl: Callable[..., Dict[str, Any]], config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        result = self.time_call("score_function", impl, config, metrics)
+        sigma = float(metrics.get("uncertainty_sigma", 0.0))
+        if not 0.0 <= sigma <= 1.0:
+            self.count("clips_clamped")
+        self.count("records_scored")
+        return result
+
+    # -- reporting -----------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "timings": {
+                name: {"count": count, "total_s": total, "mean_s": total / count, "min_s": low, "max_s": high}
+                for name, (count, total, low, high) in sorted(self.timings.items())
+            },
+            "counters": dict(self.counters),
+        }
+
+    def dump(self, path: Path | str) -> None:
+        Path(path).write_text(json.dumps(self.snapshot(), indent=2) + "\n")
+
+
+def enable(instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+    """Install ``instrumentation`` (or a fresh one) as the active registry."""
+    active = instrumentation or Instrumentation()
+    _core._INSTRUMENTATION = active
+    return active
+
+
+def disable() -> None:
+    _core._INSTRUMENTATION = None
+
+
+@contextlib.contextmanager
+def instrumented(instrumentation: Optional[Instrumentation] = None) -> Iterator[Instrumentation]:
+    previous = _core._INSTRUMENTATION
+    active = enable(instrumentation)
+    try:
+        yield active
+    finally:
+        _core._INSTRUMENTATION = previous
+
+
+@contextlib.contextmanager
+def profile_to(path: Path | str) -> Iterator[None]:
+    """Back ``--profile-out``: cProfile stats for ``*.prof``/``*.pstats``, else JSON timings."""
+    path = Path(path)
+    if path.suffix in _PSTATS_SUFFIXES:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(str(path))
+        return
+    with instrumented() as active:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            active.record("main", time.perf_counter() - start)
+            active.dump(path)
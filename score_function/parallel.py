@@ -0,0 +1,242 @@
+"""Multi-core scoring over a process pool with chunked, compact dispatch.
+
+The parent only hands out chunks and collects the answers: ``--stream`` sends
+raw input lines (bytes or str), and workers decode, score with the batch engine
+and return the chunk's output already encoded as JSON lines, together with the
+line numbers and messages of records they could not score. :func:`score_many`
+packs metric dicts in the parent and exchanges only float64 buffers with the
+workers. The config reaches each worker once through the pool initializer.
+Results keep input order.
+
+:func:`pack_record` lays a record out as one float64 row in
+:data:`score_function.METRIC_COLUMNS` order; :func:`score_payload` scores a
+buffer of such rows and :func:`unpack_results` rebuilds the result dicts.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing
+from array import array
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import FACE_ORDER, FACE_TERMS, METRIC_COLUMNS, CompiledConfig, MetricsError, _ensure_face, _get, compile_config
+from .batch import _resolve_numpy, iter_rows, score_function_batch
+from .stream import PASSTHROUGH_KEYS
+
+DEFAULT_CHUNKSIZE = 2048
+
+# Packed result row: faces, weighted faces, geo, final, gate_ok (as 0.0/1.0).
+RESULT_WIDTH = 2 * len(FACE_ORDER) + 3
+
+_ROW_FIELDS = [(face, metric) for face in FACE_ORDER for metric, _, _ in FACE_TERMS[face]]
+_CRITICAL_INDEX = METRIC_COLUMNS.index("sec.critical_count")
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_WORKER_PLAN: Optional[CompiledConfig] = None
+
+
+def pack_record(record: Dict[str, Any]) -> List[float]:
+    """Return ``record`` as one row of floats in ``METRIC_COLUMNS`` order."""
+    faces = {face: _ensure_face(record, face) for face in FACE_ORDER}
+    row = [_get(faces[face], metric) for face, metric in _ROW_FIELDS]
+    row.insert(_CRITICAL_INDEX, float(int(faces["sec"].get("critical_count", 0))))
+    row.append(float(record.get("uncertainty_sigma", 0.0)))
+    return row
+
+
+def pack_records(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Pack metric dicts into one row-major float64 payload."""
+    rows = array("d")
+    for record in records:
+        rows.extend(pack_record(record))
+    return rows.tobytes()
+
+
+def _columns(payload: bytes | array) -> Dict[str, Any]:
+    width = len(METRIC_COLUMNS)
+    np = _resolve_numpy(None)
+    if np is not None:
+        matrix = np.frombuffer(payload, dtype=np.float64).reshape(-1, width)
+        return {name: matrix[:, i] for i, name in enumerate(METRIC_COLUMNS)}
+    if isinstance(payload, array):
+        rows = payload
+    else:
+        rows = array("d")
+        rows.frombytes(payload)
+    return {name: rows[i::width] for i, name in enumerate(METRIC_COLUMNS)}
+
+
+def _score_rows(plan: CompiledConfig, rows: array) -> List[Dict[str, Any]]:
+    """Result dicts (as ``score_function`` returns them) for packed ``rows``."""
+    if not rows:
+        return []
+    np = _resolve_numpy(None)
+    return list(iter_rows(score_function_batch(plan, _columns(rows), use_numpy=np is not None)))
+
+
+def score_payload(plan: CompiledConfig, payload: bytes) -> bytes:
+    """Score a packed chunk and return packed result rows."""
+    np = _resolve_numpy(None)
+    batch = score_function_batch(plan, _columns(payload), use_numpy=np is not None)
+    columns = [
+        *(batch["faces"][face] for face in FACE_ORDER),
+        *(batch["weighted_faces"][face] for face in FACE_ORDER),
+        batch["geo"],
+        batch["final"],
+        batch["gate_ok"],
+    ]
+    if np is not None:
+        return np.column_stack(columns).astype(np.float64, copy=False).tobytes()
+    out = array("d")
+    for row in zip(*columns):
+        out.extend(row)
+    return out.tobytes()
+
+
+def unpack_results(payload: bytes, profile: str) -> Iterator[Dict[str, Any]]:
+    """Yield result dicts (rounded like ``score_function``) from packed rows."""
+    values = array("d")
+    values.frombytes(payload)
+    n_faces = len(FACE_ORDER)
+    for start in range(0, len(values), RESULT_WIDTH):
+        row = values[start:start + RESULT_WIDTH]
+        yield {
+            "faces": {face: round(row[i], 4) for i, face in enumerate(FACE_ORDER)},
+            "weighted_faces": {face: round(row[n_faces + i], 4) for i, face in enumerate(FACE_ORDER)},
+            "geo": round(row[2 * n_faces], 4),
+            "final": round(row[2 * n_faces + 1], 4),
+            "gate_ok": row[2 * n_faces + 2] != 0.0,
+            "profile": profile,
+        }
+
+
+def score_text(
+    plan: CompiledConfig, lines: Sequence[str | bytes], first_lineno: int, encode: bool = True
+) -> Tuple[Any, int, List[Tuple[int, str]]]:
+    """Decode and score a chunk of JSONL ``lines`` numbered from ``first_lineno``.
+
+    Returns ``(output, scored, errors)``: ``output`` is the chunk's JSON lines
+    as one string (or the result dicts when ``encode`` is false) and ``errors``
+    lists ``(line number, message)`` for lines that could not be scored. Blank
+    lines are skipped.
+    """
+    decode = json.loads
+    rows = array("d")
+    tags: List[Dict[str, Any]] = []
+    errors: List[Tuple[int, str]] = []
+    for lineno, line in enumerate(lines, first_lineno):
+        if not line.strip():
+            continue
+        try:
+            record = decode(line)
+            row = pack_record(record)
+        except (MetricsError, ValueError, TypeError, OverflowError) as exc:
+            errors.append((lineno, str(exc) or exc.__class__.__name__))
+            continue
+        rows.extend(row)
+        tags.append({key: record[key] for key in PASSTHROUGH_KEYS if key in record})
+    results = _score_rows(plan, rows)
+    for result, tag in zip(results, tags):
+        if tag:
+            result.update(tag)
+    if not encode:
+        return results, len(results), errors
+    text = "\n".join(map(_ENCODER.encode, results))
+    return (text + "\n" if results else ""), len(results), errors
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    global _WORKER_PLAN
+    _WORKER_PLAN = compile_config(config)
+
+
+def _call_in_worker(func: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, Optional[BaseException]]:
+    assert _WORKER_PLAN is not None, "worker used before initialisation"
+    try:
+        return func(_WORKER_PLAN, *args), None
+    except MetricsError as exc:
+        # SystemExit subclasses would kill the pool worker; hand them to the parent instead.
+        return None, exc
+
+
+def map_chunks(
+    config: Dict[str, Any] | CompiledConfig,
+    func: Callable[..., Any],
+    tasks: Iterable[Tuple[Any, ...]],
+    workers: int = 1,
+) -> Iterator[Any]:
+    """Yield ``func(plan, *args)`` for each ``args`` in ``tasks``, in order.
+
+    With ``workers > 1`` the calls run in a process pool (``func`` must be a
+    module-level function). At most ``2 * workers`` tasks are in flight, so
+    ``tasks`` is consumed lazily and memory stays bounded for unbounded inputs.
+    """
+    plan = compile_config(config)
+    if workers <= 1:
+        for args in tasks:
+            yield func(plan, *args)
+        return
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(plan.raw,)) as pool:
+        pending: Deque[Any] = deque()
+
+        def collect() -> Any:
+            value, error = pending.popleft().get()
+            if error is not None:
+                raise error
+            return value
+
+        for args in tasks:
+            pending.append(pool.apply_async(_call_in_worker, (func, args)))
+            if len(pending) >= 2 * workers:
+                yield collect()
+        while pending:
+            yield collect()
+
+
+def map_payloads(
+    config: Dict[str, Any] | CompiledConfig, payloads: Iterable[bytes], workers: int = 1
+) -> Iterator[bytes]:
+    """Score packed chunks (see :func:`pack_records`) across ``workers`` processes, preserving order."""
+    return map_chunks(config, score_payload, ((payload,) for payload in payloads), workers)
+
+
+def _chunked(items: Iterable[Any], chunksize: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def map_lines(
+    config: Dict[str, Any] | CompiledConfig,
+    lines: Iterable[str | bytes],
+    workers: int = 1,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    encode: bool = True,
+) -> Iterator[Tuple[Any, int, List[Tuple[int, str]]]]:
+    """Yield :func:`score_text` output for consecutive ``chunksize``-line chunks of ``lines``."""
+    tasks = ((chunk, 1 + i * chunksize, encode) for i, chunk in enumerate(_chunked(lines, chunksize)))
+    return map_chunks(config, score_text, tasks, workers)
+
+
+def score_many(
+    config: Dict[str, Any] | CompiledConfig,
+    records: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Yield ``score_function`` results for ``records`` in input order.
+
+    With ``workers > 1`` records are scored in a process pool, ``chunksize``
+    records per task: each chunk is sent as one :func:`pack_records` payload
+    and comes back as packed result rows. Invalid records raise
+    :class:`~score_function.MetricsError` in the caller, while packing.
+    """
+    plan = compile_config(config)
+    payloads = (pack_records(chunk) for chunk in _chunked(records, chunksize))
+    for payload in map_payloads(plan, payloads, workers):
+        yield from unpack_results(payload, plan.profile)
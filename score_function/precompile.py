@@ -0,0 +1,44 @@
+"""Precompile a YAML config to JSON: ``python -m score_function compile``.
+
+    python -m score_function compile score-function.yml -o score-function.json
+    python -m score_function score-function.json metrics.json
+
+The JSON file holds the parsed config (validated by compiling it once), so
+loading it needs only :mod:`json` -- PyYAML is never imported and the YAML
+parser never runs, which is the cheapest CLI start.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Iterable
+
+from . import compile_config, load_config
+
+
+def precompile(source: str, output: str) -> str:
+    """Write ``source`` as JSON to ``output`` and return the config fingerprint."""
+    config = load_config(source)
+    plan = compile_config(config)
+    tmp = f"{output}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(config, handle, separators=(",", ":"))
+        handle.write("\n")
+    os.replace(tmp, output)
+    return plan.fingerprint
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="score_function compile", description="Precompile a config to JSON")
+    parser.add_argument("config", help="Path to score-function.yml")
+    parser.add_argument("-o", "--output", help="Output path (default: the config path with a .json suffix)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    output = args.output or os.path.splitext(args.config)[0] + ".json"
+    if os.path.abspath(output) == os.path.abspath(args.config):
+        raise SystemExit(f"Refusing to overwrite {args.config}; pass --output")
+    fingerprint = precompile(args.config, output)
+    print(f"[score-function] wrote {output} (fingerprint {fingerprint})", file=sys.stderr)
+    return 0
@@ -0,0 +1,419 @@
+"""Replay a stored metrics corpus against candidate configs.
+
+    python -m score_function replay score-function.yml corpus.sfm candidate.yml
+    python -m score_function replay score-function.yml corpus.jsonl sweep.jsonl --examples 5 > replay.json
+
+The first config is the baseline. Candidates are config files, or JSONL files
+whose lines are overrides deep-merged into the baseline (``{"name": "k16",
+"k_steep": 16}``); every candidate is validated like a loaded config. The
+corpus (a binary metrics file from ``convert`` or ``collect_metrics.py --format
+binary``, or JSON/JSONL) is loaded once; binary files are memory-mapped.
+
+Records are scored ``chunk_rows`` at a time. With NumPy each chunk is scored
+under all configs at once: columns are clipped once per chunk, face terms are
+broadcast over a ``configs x records`` array, and penalties are evaluated once
+per distinct ``(tau, k)``; ``--workers`` threads score chunks concurrently.
+Scores match :func:`~score_function.batch.score_function_batch` exactly.
+Without NumPy each config goes through the stdlib batch engine.
+
+The report gives, per config, the gate pass rate, records whose gate flipped
+relative to the baseline (counts and the first ``--examples`` record numbers,
+0-based) and the distribution of ``final`` (mean and percentiles from a
+0.01-wide histogram) together with per-record deltas to the baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from . import (
+    CRITICAL_FACTOR,
+    FACE_ORDER,
+    CompiledConfig,
+    _profile_weights,
+    compile_config,
+    load_config,
+    validate_config,
+)
+from .batch import _clip_unit, _column_length, _resolve_numpy, columns_from_records, score_profiles_batch
+from .bulk import _read_records
+from .formats import BinaryFile, sniff
+from .montecarlo import Histogram
+
+DEFAULT_CHUNK_ROWS = 4_096
+DEFAULT_EXAMPLES = 10
+PERCENTILES = (5.0, 25.0, 50.0, 75.0, 95.0)
+HISTOGRAM_BINS = 10_000  # final in [0, 100] at 0.01 resolution
+
+
+class Candidate:
+    """A named, compiled config and the profile it is scored under."""
+
+    def __init__(self, name: str, plan: CompiledConfig, profile: Optional[str] = None) -> None:
+        self.name = name
+        self.plan = plan
+        self.profile = profile or plan.profile
+        self.multipliers = _profile_weights(plan, self.profile)
+
+
+def _merge(base: Dict[str, Any], override: Mapping[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_candidates(
+    baseline: Dict[str, Any], paths: Sequence[str], *, profile: Optional[str] = None
+) -> List[Candidate]:
+    """Candidates from config files and JSONL override files, in argument order."""
+    candidates = []
+    for path in paths:
+        if not path.endswith(".jsonl"):
+            candidates.append(Candidate(path, compile_config(load_config(Path(path))), profile))
+            continue
+        try:
+            handle = open(path, encoding="utf-8")
+        except FileNotFoundError as exc:
+            raise SystemExit(f"Missing candidates file: {path}") from exc
+        with handle:
+            for lineno, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    override = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise SystemExit(f"{path}:{lineno}: invalid JSON: {exc}") from exc
+                name = str(override.pop("name", f"{path}:{lineno}"))
+                config = _merge(baseline, override)
+                validate_config(config, f"{path}:{lineno}")
+                candidates.append(Candidate(name, compile_config(config), profile))
+    return candidates
+
+
+class Corpus:
+    """Metric columns of a corpus, loaded once (binary files stay memory-mapped)."""
+
+    def __init__(self, path: str, *, use_numpy: Optional[bool] = None) -> None:
+        self.np = _resolve_numpy(use_numpy)
+        self._binary: Optional[BinaryFile] = None
+        if path != "-" and sniff(path) == "metrics":
+            self._binary = BinaryFile(path)
+            self.columns = self._binary.columns(0, len(self._binary), np=self.np)
+        elif path != "-" and sniff(path) is not None:
+            raise SystemExit(f"{path} is a binary results file, not metrics")
+        else:
+            try:
+                reader = sys.stdin if path == "-" else open(path, encoding="utf-8", buffering=1 << 20)
+            except FileNotFoundError as exc:
+                raise SystemExit(f"Missing metrics file: {path}") from exc
+            try:
+                records = (record for _, record in _read_records(path, reader))
+                self.columns = columns_from_records(records, use_numpy=self.np is not None)
+            finally:
+                if reader is not sys.stdin:
+                    reader.close()
+        self.size = _column_length(self.columns)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def chunks(self, chunk_rows: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for start in range(0, self.size, chunk_rows):
+            yield start, {name: column[start:start + chunk_rows] for name, column in self.columns.items()}
+
+    def close(self) -> None:
+        self.columns = {}
+        if self._binary is not None:
+            self._binary.close()
+
+
+class _Kernel:
+    """Scores a chunk under every candidate at once (``configs x records`` arrays).
+
+    Each face is computed once per distinct combination of its term weights
+    and penalty ``(tau, k)`` across candidates and then gathered per config, so
+    a sweep over ``k_steep`` or gate thresholds does not repeat the linear
+    terms, and a sweep over weights does not repeat the penalties.
+    """
+
+    def __init__(self, np: Any, candidates: Sequence[Candidate]) -> None:
+        self.np = np
+        plans = [candidate.plan for candidate in candidates]
+        column = lambda values: np.array(values, dtype=np.float64)[:, np.newaxis]  # noqa: E731
+        self.faces = []
+        for face in FACE_ORDER:
+            weights = np.array([[weight for _, weight, _ in plan.face_terms[face]] for plan in plans])
+            weights, keys = np.unique(weights, axis=0, return_inverse=True)
+            terms = [
+                (f"{face}.{metric}", inverted, weights[:, i:i + 1])
+                for i, (metric, _, inverted) in enumerate(plans[0].face_terms[face])
+            ]
+            penalties = []
+            columns = [keys.reshape(-1)]
+            for i, (metric, scale, _, _, inverted) in enumerate(plans[0].penalties[face]):
+                params = np.array([plan.penalties[face][i][2:4] for plan in plans], dtype=np.float64)
+                params, inverse = np.unique(params, axis=0, return_inverse=True)
+                penalties.append((f"{face}.{metric}", inverted, scale, params[:, 0:1], -params[:, 1:2]))
+                columns.append(inverse.reshape(-1))
+            combos, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+            gather = None if len(combos) == len(plans) and (inverse.reshape(-1) == np.arange(len(plans))).all() \
+                else inverse.reshape(-1)
+            self.faces.append((face, terms, penalties, combos.T, gather))
+        self.multipliers = [
+            column([candidate.multipliers[i] for candidate in candidates]) for i in range(len(FACE_ORDER))
+        ]
+        self.floor_each = column([plan.floor_each for plan in plans])
+        self.min_each = column([plan.min_each for plan in plans])
+        self.min_geo = column([plan.min_geo for plan in plans])
+
+    def __call__(self, columns: Mapping[str, Any]) -> Tuple[Any, Any]:
+        """``(final, gate_ok)`` arrays of shape ``configs x records``."""
+        np = self.np
+        clipped: Dict[Tuple[str, bool], Any] = {}
+
+        def value(name: str, inverted: bool) -> Any:
+            key = (name, inverted)
+            if key not in clipped:
+                x = clipped.get((name, False))
+                if x is None:
+                    x = clipped[(name, False)] = _clip_unit(np, np.asarray(columns[name], dtype=np.float64))
+                clipped[key] = 1.0 - x if inverted else x
+            return clipped[key]
+
+        # Same operations, in the same order, as batch._batch_faces/_combine, broadcast over configs.
+        faces = []
+        for face, terms, penalties, combos, gather in self.faces:
+            total = None
+            for name, inverted, weights in terms:
+                term = weights * value(name, inverted)[np.newaxis, :]
+                if total is None:
+                    total = term
+                else:
+                    total += term
+            score = (100.0 * total)[combos[0]]
+            pen = None
+            for i, (name, inverted, scale, tau, minus_k) in enumerate(penalties, 1):
+                # 1.0 - scale * (1.0 / (1.0 + exp(-k * (x - tau)))), in place.
+                factor = value(name, inverted)[np.newaxis, :] - tau
+                factor *= minus_k
+                np.exp(factor, out=factor)
+                factor += 1.0
+                np.divide(1.0, factor, out=factor)
+                factor *= scale
+                np.subtract(1.0, factor, out=factor)
+                pen = factor[combos[i]] if pen is None else pen * factor[combos[i]]
+            if pen is not None:
+                score = score * pen
+            if face == "sec" and "sec.critical_count" in columns:
+                critical = np.asarray(columns["sec.critical_count"], dtype=np.float64)[np.newaxis, :] >= 1.0
+                score = np.where(critical, score * CRITICAL_FACTOR, score)
+            faces.append(score if gather is None else score[gather])
+
+        prod = None
+        min_face = None
+        for score, multipliers in zip(faces, self.multipliers):
+            adjusted = multipliers * score
+            np.maximum(self.floor_each, adjusted, out=adjusted)
+            adjusted /= 100.0
+            if prod is None:
+                prod = adjusted
+            else:
+                prod *= adjusted
+            min_face = score if min_face is None else np.minimum(min_face, score, out=min_face)
+        geo = 100.0 * prod ** (1.0 / len(FACE_ORDER))
+        n = geo.shape[1]
+        sigma = columns.get("uncertainty_sigma")
+        sigma = np.zeros(n) if sigma is None else np.asarray(sigma, dtype=np.float64)
+        final = geo * (1.0 - 0.1 * _clip_unit(np, sigma))[np.newaxis, :]
+        return final, (min_face >= self.min_each) & (geo >= self.min_geo)
+
+
+class _Totals:
+    """Running per-config statistics; the baseline is config 0."""
+
+    def __init__(self, configs: int, examples: int) -> None:
+        self.configs = configs
+        self.examples = examples
+        self.records = 0
+        self.passes = [0] * configs
+        self.pass_to_fail = [0] * configs
+        self.fail_to_pass = [0] * configs
+        self.flipped: List[Dict[str, List[int]]] = [{"pass_to_fail": [], "fail_to_pass": []} for _ in range(configs)]
+        self.final_sum = [0.0] * configs
+        self.delta_sum = [0.0] * configs
+        self.abs_delta_sum = [0.0] * configs
+        self.max_abs_delta = [0.0] * configs
+        self.histograms = [Histogram(0.0, 100.0, HISTOGRAM_BINS) for _ in range(configs)]
+
+    @staticmethod
+    def _add(totals: List[Any], values: Iterable[Any]) -> None:
+        for i, value in enumerate(values):
+            totals[i] += value
+
+    def add_numpy(self, np: Any, start: int, final: Any, gate: Any) -> None:
+        self.records += final.shape[1]
+        base = gate[0]
+        self._add(self.passes, gate.sum(axis=1).tolist())
+        for key, mask, counts in (
+            ("pass_to_fail", base & ~gate, self.pass_to_fail),
+            ("fail_to_pass", ~base & gate, self.fail_to_pass),
+        ):
+            flips = mask.sum(axis=1).tolist()
+            self._add(counts, flips)
+            for c, count in enumerate(flips):
+                kept = self.flipped[c][key]
+                if count and len(kept) < self.examples:
+                    kept.extend((np.flatnonzero(mask[c])[: self.examples - len(kept)] + start).tolist())
+        delta = final - final[0]
+        self._add(self.final_sum, final.sum(axis=1).tolist())
+        self._add(self.delta_sum, delta.sum(axis=1).tolist())
+        np.abs(delta, out=delta)
+        self._add(self.abs_delta_sum, delta.sum(axis=1).tolist())
+        self.max_abs_delta = [max(a, b) for a, b in zip(self.max_abs_delta, delta.max(axis=1).tolist())]
+        if self.histograms[0].np is None:
+            self.histograms = [Histogram(0.0, 100.0, HISTOGRAM_BINS, np=np) for _ in range(self.configs)]
+        # One bincount for all configs, offset per config, then split by row.
+        bins = np.clip((final / self.histograms[0].width).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+        bins += (np.arange(self.configs) * HISTOGRAM_BINS)[:, np.newaxis]
+        counts = np.bincount(bins.reshape(-1), minlength=self.configs * HISTOGRAM_BINS)
+        for histogram, row in zip(self.histograms, counts.reshape(self.configs, HISTOGRAM_BINS)):
+            histogram.add_counts(row)
+
+    def add_columns(self, start: int, finals: Sequence[Sequence[float]], gates: Sequence[Sequence[int]]) -> None:
+        self.records += len(finals[0])
+        base_final, base_gate = finals[0], gates[0]
+        for c, (final, gate) in enumerate(zip(finals, gates)):
+            flipped = self.flipped[c]
+            for i, (value, ok, base_value, base_ok) in enumerate(zip(final, gate, base_final, base_gate)):
+                self.passes[c] += ok
+                if ok != base_ok:
+                    key = "pass_to_fail" if base_ok else "fail_to_pass"
+                    if key == "pass_to_fail":
+                        self.pass_to_fail[c] += 1
+                    else:
+                        self.fail_to_pass[c] += 1
+                    if len(flipped[key]) < self.examples:
+                        flipped[key].append(start + i)
+                delta = value - base_value
+                self.final_sum[c] += value
+                self.delta_sum[c] += delta
+                self.abs_delta_sum[c] += abs(delta)
+                self.max_abs_delta[c] = max(self.max_abs_delta[c], abs(delta))
+            self.histograms[c].add(final)
+
+    def report(self, candidates: Sequence[Candidate]) -> Dict[str, Any]:
+        n = self.records
+        mean = lambda total: round(total / n, 4) if n else None  # noqa: E731
+        quantiles = [[histogram.percentile(q) for q in PERCENTILES] for histogram in self.histograms]
+        percentiles = [
+            {f"p{q:g}": round(value, 4) if n else None for q, value in zip(PERCENTILES, values)}
+            for values in quantiles
+        ]
+        rows = []
+        for c, candidate in enumerate(candidates):
+            row: Dict[str, Any] = {
+                "name": candidate.name,
+                "fingerprint": candidate.plan.fingerprint,
+                "profile": candidate.profile,
+                "pass_rate": mean(self.passes[c]),
+                "passes": self.passes[c],
+                "final": {"mean": mean(self.final_sum[c]), **percentiles[c]},
+            }
+            if c:
+                row["pass_rate_delta"] = mean(self.passes[c] - self.passes[0])
+                row["flipped"] = {
+                    "pass_to_fail": self.pass_to_fail[c],
+                    "fail_to_pass": self.fail_to_pass[c],
+                    "examples": self.flipped[c],
+                }
+                row["delta"] = {
+                    "mean": mean(self.delta_sum[c]),
+                    "mean_abs": mean(self.abs_delta_sum[c]),
+                    "max_abs": round(self.max_abs_delta[c], 4),
+                    **{
+                        key: round(value - percentiles[0][key], 4) if n else None
+                        for key, value in percentiles[c].items()
+                    },
+                }
+            rows.append(row)
+        return {"records": n, "baseline": rows[0], "candidates": rows[1:]}
+
+
+def replay(
+    corpus: Corpus,
+    candidates: Sequence[Candidate],
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: int = 1,
+    examples: int = DEFAULT_EXAMPLES,
+) -> Dict[str, Any]:
+    """Score ``corpus`` under every candidate (``candidates[0]`` is the baseline)."""
+    if not candidates:
+        raise SystemExit("replay needs at least a baseline config")
+    totals = _Totals(len(candidates), examples)
+    np = corpus.np
+    if np is not None:
+        kernel = _Kernel(np, candidates)
+        chunks = corpus.chunks(chunk_rows)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # NumPy releases the GIL inside the array operations, so chunks score in parallel.
+                # At most 2 * workers chunks are in flight, which bounds the results held in memory.
+                pending: Deque[Tuple[int, Future[Tuple[Any, Any]]]] = deque()
+                for start, columns in chunks:
+                    pending.append((start, pool.submit(kernel, columns)))
+                    if len(pending) >= 2 * workers:
+                        done, future = pending.popleft()
+                        totals.add_numpy(np, done, *future.result())
+                while pending:
+                    done, future = pending.popleft()
+                    totals.add_numpy(np, done, *future.result())
+        else:
+            for start, columns in chunks:
+                final, gate = kernel(columns)
+                totals.add_numpy(np, start, final, gate)
+    else:
+        for start, columns in corpus.chunks(chunk_rows):
+            results = [
+                score_profiles_batch(candidate.plan, columns, [candidate.profile], use_numpy=False)["profiles"][
+                    candidate.profile
+                ]
+                for candidate in candidates
+            ]
+            totals.add_columns(start, [r["final"] for r in results], [r["gate_ok"] for r in results])
+    return totals.report(candidates)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="score_function replay", description="Evaluate candidate configs over a stored metrics corpus"
+    )
+    parser.add_argument("config", help="Baseline score-function.yml (or JSON)")
+    parser.add_argument("metrics", help="Binary metrics file, metrics.json (object or array), metrics.jsonl or '-'")
+    parser.add_argument("candidates", nargs="+", help="Candidate configs, or JSONL files of overrides to the baseline")
+    parser.add_argument("--profile", help="Score every config under this profile instead of its own")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Records scored per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Threads scoring chunks concurrently (NumPy only)")
+    parser.add_argument("--examples", type=int, default=DEFAULT_EXAMPLES, help="Flipped record numbers to list")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    baseline = load_config(Path(args.config))
+    candidates = [Candidate(args.config, compile_config(baseline), args.profile)]
+    candidates += load_candidates(baseline, args.candidates, profile=args.profile)
+    corpus = Corpus(args.metrics)
+    try:
+        report = replay(corpus, candidates, chunk_rows=args.chunk_rows, workers=args.workers, examples=args.examples)
+    finally:
+        corpus.close()
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
@@ -0,0 +1,416 @@
+"""Roll package-level results up a hierarchy (package -> service -> org).
+
+    python -m score_function score-function.yml repos.jsonl --stream > results.jsonl
+    python -m score_function rollup results.jsonl --key id --depth 2 > rollup.jsonl
+    python -m score_function rollup shard-1.jsonl --partial -o part-1.json    # on each worker
+    python -m score_function rollup --merge part-1.json part-2.json --config score-function.yml
+
+Each result is added to every level of its hierarchy key: with one ``--key``
+field its value is split on ``--separator`` (``"acme/payments/api"`` updates
+``acme``, ``acme/payments`` and ``acme/payments/api``, up to ``--depth``
+levels); with several fields (``--key org,service``) each field is a level.
+Every result also lands in the root group ``*``; results without the key only
+land there.
+
+Per group and per field (``faces.<face>``, ``geo``, ``final``) a
+:class:`Aggregate` keeps count, sum, min, max, the sum of logs of positive
+values (for geometric means) and a :class:`Sketch` of relative-error buckets
+for quantiles, so memory is O(groups) whatever the number of results. All of it
+merges exactly (quantiles within the sketch's relative error), so partial
+roll-ups from shards or workers (``--partial``) combine with ``--merge``.
+
+With ``--config`` the gate is also applied to each group: every face's minimum
+against ``min_each`` and the geometric mean of ``geo`` against ``min_geo``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from . import FACE_ORDER, compile_config, load_config
+
+FIELDS = tuple(f"faces.{face}" for face in FACE_ORDER) + ("geo", "final")
+ROOT = "*"
+DEFAULT_ALPHA = 0.01
+DEFAULT_QUANTILES = (50.0, 90.0, 99.0)
+STATE_VERSION = 1
+
+
+class Sketch:
+    """Quantile sketch with relative accuracy ``alpha`` (DDSketch-style log buckets).
+
+    A positive value ``x`` is counted in bucket ``ceil(log(x) / log(gamma))``
+    with ``gamma = (1 + alpha) / (1 - alpha)``; quantiles are returned within a
+    relative error of ``alpha``. Values at or below ``min_value`` share one zero
+    bucket. Scores lie in [0, 100], so a sketch holds a few hundred buckets at
+    most and merging adds counts.
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, min_value: float = 1e-6) -> None:
+        if not 0.0 < alpha < 1.0:
+            raise ValueError("alpha must be in (0, 1)")
+        self.alpha = alpha
+        self.min_value = min_value
+        self.gamma = (1.0 + alpha) / (1.0 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= self.min_value:
+            self.zero += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "Sketch") -> None:
+        if (other.alpha, other.min_value) != (self.alpha, self.min_value):
+            raise ValueError("cannot merge sketches with different accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile ``q`` in [0, 1] (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2.0 * self.gamma ** index / (self.gamma + 1.0)
+        return 2.0 * self.gamma ** max(self.bins) / (self.gamma + 1.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"zero": self.zero, "bins": {str(index): count for index, count in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], alpha: float = DEFAULT_ALPHA) -> "Sketch":
+        sketch = cls(alpha)
+        sketch.zero = int(data["zero"])
+        sketch.bins = {int(index): int(count) for index, count in data["bins"].items()}
+        sketch.count = sketch.zero + sum(sketch.bins.values())
+        return sketch
+
+
+class Aggregate:
+    """Mergeable summary of one field: count, sum, min, max, log-sum and a :class:`Sketch`."""
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.log_total = 0.0  # sum of log(x) over positive x
+        self.zeros = 0  # values <= 0, which make the geometric mean 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = Sketch(alpha)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > 0.0:
+            self.log_total += math.log(value)
+        else:
+            self.zeros += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sketch.add(value)
+
+    def merge(self, other: "Aggregate") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.log_total += other.log_total
+        self.zeros += other.zeros
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def geomean(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return 0.0 if self.zeros else math.exp(self.log_total / self.count)
+
+    def summary(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "geomean": round(self.geomean or 0.0, 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+        }
+        for q in quantiles:
+            summary[f"p{q:g}"] = round(self.sketch.quantile(q / 100.0) or 0.0, 4)
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "log_sum": self.log_total,
+            "zeros": self.zeros,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], alpha: float = DEFAULT_ALPHA) -> "Aggregate":
+        aggregate = cls(alpha)
+        aggregate.count = int(data["count"])
+        aggregate.total = float(data["sum"])
+        aggregate.log_total = float(data["log_sum"])
+        aggregate.zeros = int(data["zeros"])
+        if aggregate.count:
+            aggregate.min = float(data["min"])
+            aggregate.max = float(data["max"])
+        aggregate.sketch = Sketch.from_dict(data["sketch"], alpha)
+        return aggregate
+
+
+class Group:
+    """Aggregates of one hierarchy node."""
+
+    def __init__(self, level: int, alpha: float = DEFAULT_ALPHA) -> None:
+        self.level = level
+        self.count = 0
+        self.passes = 0
+        self.fields = {name: Aggregate(alpha) for name in FIELDS}
+
+    def add(self, values: Sequence[float], gate_ok: bool) -> None:
+        self.count += 1
+        self.passes += gate_ok
+        for aggregate, value in zip(self.fields.values(), values):
+            aggregate.add(value)
+
+    def merge(self, other: "Group") -> None:
+        self.count += other.count
+        self.passes += other.passes
+        for name, aggregate in self.fields.items():
+            aggregate.merge(other.fields[name])
+
+
+def _lookup(record: Mapping[str, Any], key: str) -> Any:
+    value: Any = record
+    for part in key.split("."):
+        if not isinstance(value, Mapping) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+class Rollup:
+    """Streaming roll-up of score results by a hierarchy key."""
+
+    def __init__(
+        self,
+        key: Sequence[str] = ("id",),
+        *,
+        separator: str = "/",
+        depth: Optional[int] = None,
+        profile: Optional[str] = None,
+        alpha: float = DEFAULT_ALPHA,
+    ) -> None:
+        self.key = tuple(key)
+        self.separator = separator
+        self.depth = depth
+        self.profile = profile
+        self.alpha = alpha
+        self.groups: Dict[str, Group] = {}
+
+    def levels(self, record: Mapping[str, Any]) -> List[str]:
+        """Group names for ``record``: the root, then each prefix of its key."""
+        if len(self.key) == 1:
+            value = _lookup(record, self.key[0])
+            parts = [part for part in str(value).split(self.separator) if part] if value is not None else []
+        else:
+            parts = []
+            for field in self.key:
+                value = _lookup(record, field)
+                if value is None:
+                    break
+                parts.append(str(value))
+        if self.depth is not None:
+            parts = parts[: self.depth]
+        return [ROOT] + [self.separator.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+    def _scores(self, result: Mapping[str, Any]) -> Tuple[List[float], bool]:
+        faces = result["faces"]
+        scored = result
+        if "profiles" in result:
+            if self.profile is None or self.profile not in result["profiles"]:
+                names = ", ".join(result["profiles"])
+                raise SystemExit(f"Results hold several profiles ({names}); choose one with --profile")
+            scored = result["profiles"][self.profile]
+        values = [float(faces[face]) for face in FACE_ORDER]
+        values += [float(scored["geo"]), float(scored["final"])]
+        return values, bool(scored["gate_ok"])
+
+    def add(self, result: Mapping[str, Any]) -> None:
+        values, gate_ok = self._scores(result)
+        groups = self.groups
+        for level, name in enumerate(self.levels(result)):
+            group = groups.get(name)
+            if group is None:
+                group = groups[name] = Group(level, self.alpha)
+            group.add(values, gate_ok)
+
+    def add_all(self, results: Iterable[Mapping[str, Any]]) -> "Rollup":
+        for result in results:
+            self.add(result)
+        return self
+
+    def merge(self, other: "Rollup") -> "Rollup":
+        settings = ("key", "separator", "depth", "profile", "alpha")
+        if any(getattr(other, name) != getattr(self, name) for name in settings):
+            raise SystemExit("Cannot merge roll-ups with different keys, depth, profile or sketch accuracy")
+        for name, group in other.groups.items():
+            if name not in self.groups:
+                self.groups[name] = Group(group.level, self.alpha)
+            self.groups[name].merge(group)
+        return self
+
+    def report(
+        self, *, quantiles: Sequence[float] = DEFAULT_QUANTILES, config: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """One summary per group: the root first, then groups in name order."""
+        plan = compile_config(config) if config is not None else None
+        for name in sorted(self.groups, key=lambda name: (name != ROOT, name)):
+            group = self.groups[name]
+            row: Dict[str, Any] = {
+                "group": name,
+                "level": group.level,
+                "count": group.count,
+                "gate_ok_rate": round(group.passes / group.count, 4) if group.count else None,
+                "fields": {field: aggregate.summary(quantiles) for field, aggregate in group.fields.items()},
+            }
+            if plan is not None and group.count:
+                min_face = min(group.fields[f"faces.{face}"].min for face in FACE_ORDER)
+                row["gate_ok"] = min_face >= plan.min_each and (group.fields["geo"].geomean or 0.0) >= plan.min_geo
+            yield row
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "key": list(self.key),
+            "separator": self.separator,
+            "depth": self.depth,
+            "profile": self.profile,
+            "alpha": self.alpha,
+            "groups": {
+                name: {
+                    "level": group.level,
+                    "count": group.count,
+                    "passes": group.passes,
+                    "fields": {field: aggregate.to_dict() for field, aggregate in group.fields.items()},
+                }
+                for name, group in self.groups.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Rollup":
+        if data.get("version") != STATE_VERSION:
+            raise SystemExit(f"Unsupported roll-up state version: {data.get('version')!r}")
+        rollup = cls(
+            data["key"], separator=data["separator"], depth=data["depth"], profile=data["profile"], alpha=data["alpha"]
+        )
+        for name, entry in data["groups"].items():
+            group = Group(int(entry["level"]), rollup.alpha)
+            group.count = int(entry["count"])
+            group.passes = int(entry["passes"])
+            group.fields = {field: Aggregate.from_dict(entry["fields"][field], rollup.alpha) for field in FIELDS}
+            rollup.groups[name] = group
+        return rollup
+
+
+def _read_results(paths: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    from .bulk import _read_records
+
+    for path in paths:
+        try:
+            reader = sys.stdin if path == "-" else open(path, encoding="utf-8", buffering=1 << 20)
+        except FileNotFoundError as exc:
+            raise SystemExit(f"Missing results file: {path}") from exc
+        try:
+            for number, record in _read_records(path, reader):
+                if not isinstance(record, dict) or "faces" not in record:
+                    raise SystemExit(f"{path}:{number}: not a score result")
+                yield record
+        finally:
+            if reader is not sys.stdin:
+                reader.close()
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="score_function rollup", description="Roll score results up a package -> service -> org hierarchy"
+    )
+    parser.add_argument("results", nargs="*", help="Result files (JSON or JSONL, '-' for stdin)")
+    parser.add_argument("--key", default="id", help="Hierarchy field, or comma-separated fields one per level")
+    parser.add_argument("--separator", default="/", help="Level separator within a single key field (default '/')")
+    parser.add_argument("--depth", type=int, help="Keep at most this many levels below the root")
+    parser.add_argument("--profile", help="Profile to roll up when results hold several")
+    parser.add_argument("--quantiles", default="50,90,99", help="Comma-separated percentiles to report")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="Relative accuracy of the quantile sketch")
+    parser.add_argument("--config", help="Apply this config's gate to each group")
+    parser.add_argument("--merge", nargs="+", default=[], help="Partial roll-ups (from --partial) to combine")
+    parser.add_argument("--partial", action="store_true", help="Write the mergeable roll-up state instead of a report")
+    parser.add_argument("-o", "--output", help="Write here instead of stdout")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    if not args.results and not args.merge:
+        parser.error("give result files and/or --merge partial roll-ups")
+
+    partials = []
+    for path in args.merge:
+        try:
+            with open(path, encoding="utf-8") as handle:
+                partials.append(Rollup.from_dict(json.load(handle)))
+        except FileNotFoundError as exc:
+            raise SystemExit(f"Missing partial roll-up: {path}") from exc
+    if args.results:
+        rollup = Rollup(
+            [field.strip() for field in args.key.split(",") if field.strip()],
+            separator=args.separator,
+            depth=args.depth,
+            profile=args.profile,
+            alpha=args.alpha,
+        ).add_all(_read_results(args.results))
+    else:
+        rollup = partials.pop(0)
+    for partial in partials:
+        rollup.merge(partial)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.partial:
+            json.dump(rollup.to_dict(), out, separators=(",", ":"))
+            out.write("\n")
+        else:
+            config = load_config(Path(args.config)) if args.config else None
+            quantiles = tuple(float(q) for q in args.quantiles.split(","))
+            for row in rollup.report(quantiles=quantiles, config=config):
+                out.write(json.dumps(row, separators=(",", ":")))
+                out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
@@ -0,0 +1,323 @@
+"""Analytic sensitivities of the score and a "what does it take to pass" solver.
+
+    python -m score_function whatif score-function.yml metrics.json
+
+Every face is a weighted sum of clipped metrics times logistic penalties, and
+``geo`` is a floored geometric mean of the weighted faces, so the partial
+derivatives of ``geo`` and ``final`` with respect to each metric have a closed
+form. :func:`gradients` evaluates them in a single pass; derivatives are zero
+where a clip (metric outside ``[0, 1]``) or the ``floor_each`` floor is active;
+values exactly at 0 or 1 get the derivative from inside the range.
+``sec.critical_count`` is discrete and has no derivative; :func:`solve_gate`
+reports it as a separate candidate instead.
+
+:func:`gradients_batch` computes the same derivatives column-wise over many
+records (NumPy when available).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from . import (
+    CRITICAL_FACTOR,
+    FACE_ORDER,
+    FACE_TERMS,
+    CompiledConfig,
+    _ensure_face,
+    _get,
+    clip,
+    compile_config,
+    compute_faces,
+    load_config,
+    load_json,
+)
+from .batch import _clip_unit, _resolve_numpy
+
+# Columns with a derivative: every weighted metric plus uncertainty_sigma.
+GRADIENT_COLUMNS = tuple(f"{face}.{metric}" for face in FACE_ORDER for metric, _, _ in FACE_TERMS[face]) + (
+    "uncertainty_sigma",
+)
+
+GREEDY_STEP = 0.01
+_BISECT_ITERATIONS = 50
+
+
+class _Scalar:
+    """The handful of array functions the shared formulas need, for floats."""
+
+    exp = staticmethod(math.exp)
+    maximum = staticmethod(max)
+
+    @staticmethod
+    def clip(x: float) -> float:
+        return clip(x)
+
+    @staticmethod
+    def where(cond: bool, a: float, b: float) -> float:
+        return a if cond else b
+
+
+class _Numpy:
+    def __init__(self, np: Any) -> None:
+        self.exp = np.exp
+        self.maximum = np.maximum
+        self.where = np.where
+        self._np = np
+
+    def clip(self, x: Any) -> Any:
+        return _clip_unit(self._np, x)
+
+
+def _analyse(xp: Any, plan: CompiledConfig, value: Callable[[str], Any], critical: Any, sigma: Any) -> Dict[str, Any]:
+    """Scores and derivatives, for floats or whole columns alike."""
+    faces: Dict[str, Any] = {}
+    d_faces: Dict[str, Any] = {}
+    for face, terms in plan.terms:
+        clipped: Dict[str, Any] = {}
+        inside: Dict[str, Any] = {}
+        linear: Any = 0.0
+        for metric, weight, inverted in terms:
+            x = value(f"{face}.{metric}")
+            clipped[metric] = c = xp.clip(x)
+            inside[metric] = (x >= 0.0) & (x <= 1.0)
+            linear = linear + weight * ((1.0 - c) if inverted else c)
+        linear = 100.0 * linear
+        pen: Any = 1.0
+        factors: List[Tuple[str, Any, Any]] = []  # (metric, factor, d factor / d clipped metric)
+        for metric, scale, tau, k, inverted in plan.penalties[face]:
+            c = clipped[metric]
+            s = 1.0 / (1.0 + xp.exp(-k * (((1.0 - c) if inverted else c) - tau)))
+            factor = 1.0 - scale * s
+            factors.append((metric, factor, (scale * k * s * (1.0 - s)) * (1.0 if inverted else -1.0)))
+            pen = pen * factor
+        crit = xp.where(critical >= 1.0, CRITICAL_FACTOR, 1.0) if face == "sec" else 1.0
+        faces[face] = linear * pen * crit
+        for metric, weight, inverted in terms:
+            d = 100.0 * weight * (-1.0 if inverted else 1.0) * pen
+            for penalised, factor, d_factor in factors:
+                if penalised == metric:
+                    d = d + linear * (pen / factor) * d_factor
+            d_faces[f"{face}.{metric}"] = d * crit * inside[metric]
+
+    n_faces = len(FACE_ORDER)
+    prod: Any = 1.0
+    adjusted = {}
+    for face, multiplier in zip(FACE_ORDER, plan.profile_weights):
+        adjusted[face] = xp.maximum(plan.floor_each, faces[face] * multiplier) / 100.0
+        prod = prod * adjusted[face]
+    geo = 100.0 * prod ** (1.0 / n_faces)
+    damping = 1.0 - 0.1 * xp.clip(sigma)
+    d_geo: Dict[str, Any] = {}
+    for face, multiplier in zip(FACE_ORDER, plan.profile_weights):
+        active = faces[face] * multiplier > plan.floor_each
+        d_geo_d_face = active * geo * multiplier / (100.0 * n_faces * adjusted[face])
+        for metric, _, _ in plan.face_terms[face]:
+            name = f"{face}.{metric}"
+            d_geo[name] = d_geo_d_face * d_faces[name]
+    d_final = {name: d * damping for name, d in d_geo.items()}
+    d_geo["uncertainty_sigma"] = 0.0 * geo
+    d_final["uncertainty_sigma"] = -0.1 * geo * ((sigma >= 0.0) & (sigma <= 1.0))
+    return {"faces": faces, "geo": geo, "final": geo * damping, "d_faces": d_faces, "d_geo": d_geo, "d_final": d_final}
+
+
+def gradients(config: Dict[str, Any] | CompiledConfig, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Unrounded scores plus partial derivatives for one metrics record.
+
+    Returns ``faces``, ``geo``, ``final`` and ``gate_ok`` like
+    :func:`score_function.score_function` (unrounded), ``d_faces`` (each face
+    score with respect to its own metrics) and ``d_geo`` / ``d_final`` keyed by
+    :data:`GRADIENT_COLUMNS` (``"code.SA"``, ..., ``"uncertainty_sigma"``).
+    """
+    plan = compile_config(config)
+    face_metrics = {face: _ensure_face(metrics, face) for face in FACE_ORDER}
+
+    def value(name: str) -> float:
+        face, metric = name.split(".", 1)
+        return _get(face_metrics[face], metric)
+
+    critical = float(int(face_metrics["sec"].get("critical_count", 0)))
+    result = _analyse(_Scalar, plan, value, critical, float(metrics.get("uncertainty_sigma", 0.0)))
+    result["gate_ok"] = min(result["faces"].values()) >= plan.min_each and result["geo"] >= plan.min_geo
+    return result
+
+
+def gradients_batch(
+    config: Dict[str, Any] | CompiledConfig,
+    columns: Mapping[str, Sequence[float]],
+    *,
+    use_numpy: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Column-wise :func:`gradients` over ``columns`` keyed by ``METRIC_COLUMNS``.
+
+    With NumPy every entry is a float64 column; without it each entry is a list
+    built by evaluating the records one by one.
+    """
+    plan = compile_config(config)
+    n = len(next(iter(columns.values()))) if columns else 0
+    np = _resolve_numpy(use_numpy)
+    if np is not None:
+        def value(name: str) -> Any:
+            if name not in columns:
+                raise SystemExit(f"Missing metric column '{name}'")
+            return np.asarray(columns[name], dtype=np.float64)
+
+        zeros = np.zeros(n)
+        critical = value("sec.critical_count") if "sec.critical_count" in columns else zeros
+        sigma = value("uncertainty_sigma") if "uncertainty_sigma" in columns else zeros
+        result = _analyse(_Numpy(np), plan, value, critical, sigma)
+        min_face = np.minimum.reduce([result["faces"][face] for face in FACE_ORDER])
+        result["gate_ok"] = (min_face >= plan.min_each) & (result["geo"] >= plan.min_geo)
+        return result
+
+    rows = [_row(columns, i) for i in range(n)]
+    per_row = [gradients(plan, row) for row in rows]
+    batch: Dict[str, Any] = {key: [r[key] for r in per_row] for key in ("geo", "final", "gate_ok")}
+    for key in ("faces", "d_faces", "d_geo", "d_final"):
+        names = per_row[0][key] if per_row else {}
+        batch[key] = {name: [r[key][name] for r in per_row] for name in names}
+    return batch
+
+
+def _row(columns: Mapping[str, Sequence[float]], i: int) -> Dict[str, Any]:
+    record: Dict[str, Any] = {face: {} for face in FACE_ORDER}
+    for name, column in columns.items():
+        if name == "uncertainty_sigma":
+            record[name] = column[i]
+        else:
+            face, metric = name.split(".", 1)
+            record[face][metric] = column[i]
+    return record
+
+
+# -- gate solver -------------------------------------------------------------------
+
+
+def _improving_direction(plan: CompiledConfig, name: str) -> float:
+    face, metric = name.split(".", 1)
+    inverted = next(inv for m, _, inv in plan.face_terms[face] if m == metric)
+    return -1.0 if inverted else 1.0
+
+
+def _gate_ok(plan: CompiledConfig, metrics: Dict[str, Any]) -> bool:
+    faces = compute_faces(plan, metrics)
+    geo = 100.0 * math.prod(
+        max(plan.floor_each, faces[face] * m) / 100.0 for face, m in zip(FACE_ORDER, plan.profile_weights)
+    ) ** (1.0 / len(FACE_ORDER))
+    return min(faces.values()) >= plan.min_each and geo >= plan.min_geo
+
+
+def _with(metrics: Dict[str, Any], changes: Mapping[str, float]) -> Dict[str, Any]:
+    updated = dict(metrics)
+    for name, new in changes.items():
+        face, metric = name.split(".", 1)
+        updated[face] = {**updated[face], metric: new}
+    return updated
+
+
+def solve_gate(
+    config: Dict[str, Any] | CompiledConfig,
+    metrics: Dict[str, Any],
+    *,
+    allowed: Optional[Iterable[str]] = None,
+    step: float = GREEDY_STEP,
+) -> Dict[str, Any]:
+    """Smallest changes that make ``gate_ok`` true.
+
+    ``single`` lists, smallest change first, every metric that passes the gate
+    on its own (found by bisection; each face is monotone in each metric).
+    ``plan`` is a greedy multi-metric plan: repeatedly move the metric with the
+    largest gradient of the gate shortfall by ``step`` until the gate passes,
+    or ``None`` when the allowed metrics cannot reach it. Metrics are only
+    moved within ``[0, 1]``; ``allowed`` restricts which ``face.metric`` names
+    may change.
+    """
+    plan = compile_config(config)
+    names = [name for name in GRADIENT_COLUMNS[:-1] if allowed is None or name in set(allowed)]
+    face_metrics = {face: dict(_ensure_face(metrics, face)) for face in FACE_ORDER}
+    base = {**metrics, **face_metrics}
+    current = {name: clip(_get(face_metrics[name.split(".")[0]], name.split(".", 1)[1])) for name in names}
+    result: Dict[str, Any] = {"gate_ok": _gate_ok(plan, base), "single": [], "plan": {}}
+    if result["gate_ok"]:
+        return result
+
+    for name in names:
+        direction = _improving_direction(plan, name)
+        start, bound = current[name], (1.0 if direction > 0 else 0.0)
+        if start == bound or not _gate_ok(plan, _with(base, {name: bound})):
+            continue
+        failing, passing = start, bound
+        for _ in range(_BISECT_ITERATIONS):
+            middle = (failing + passing) / 2.0
+            if _gate_ok(plan, _with(base, {name: middle})):
+                passing = middle
+            else:
+                failing = middle
+        result["single"].append({"metric": name, "from": start, "to": passing, "delta": passing - start})
+    if int(face_metrics["sec"].get("critical_count", 0)) >= 1:
+        cleared = _with(base, {"sec.critical_count": 0})
+        if _gate_ok(plan, cleared):
+            count = face_metrics["sec"]["critical_count"]
+            result["single"].append({"metric": "sec.critical_count", "from": count, "to": 0, "delta": -count})
+    result["single"].sort(key=lambda candidate: abs(candidate["delta"]))
+    result["plan"] = _greedy_plan(plan, base, names, current, step)
+    return result
+
+
+def _greedy_plan(
+    plan: CompiledConfig, base: Dict[str, Any], names: List[str], current: Dict[str, float], step: float
+) -> Optional[Dict[str, float]]:
+    values = dict(current)
+    moved: Dict[str, float] = {}
+    while True:
+        metrics = _with(base, moved)
+        if _gate_ok(plan, metrics):
+            return moved
+        analysis = gradients(plan, metrics)
+        faces, geo = analysis["faces"], analysis["geo"]
+        best, best_gain = None, 0.0
+        for name in names:
+            direction = _improving_direction(plan, name)
+            if (direction > 0 and values[name] >= 1.0) or (direction < 0 and values[name] <= 0.0):
+                continue
+            face = name.split(".", 1)[0]
+            gain = analysis["d_geo"][name] * direction if geo < plan.min_geo else 0.0
+            if faces[face] < plan.min_each:
+                gain += analysis["d_faces"][name] * direction
+            if gain > best_gain:
+                best, best_gain = name, gain
+        if best is None:
+            return None
+        direction = _improving_direction(plan, best)
+        values[best] = min(1.0, max(0.0, values[best] + direction * step))
+        moved[best] = values[best]
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="score_function whatif", description="Score sensitivities and the changes needed to pass the gate"
+    )
+    parser.add_argument("config", help="Path to score-function.yml (or JSON)")
+    parser.add_argument("metrics", help="Path to metrics.json")
+    parser.add_argument("--only", help="Comma-separated face.metric names the solver may change")
+    parser.add_argument("--step", type=float, default=GREEDY_STEP, help="Greedy plan step size (default 0.01)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    plan = compile_config(load_config(Path(args.config)))
+    metrics = load_json(Path(args.metrics))
+    analysis = gradients(plan, metrics)
+    allowed = args.only.split(",") if args.only else None
+    report = {
+        "geo": round(analysis["geo"], 4),
+        "final": round(analysis["final"], 4),
+        "d_final": {name: round(d, 6) for name, d in analysis["d_final"].items()},
+        "d_geo": {name: round(d, 6) for name, d in analysis["d_geo"].items()},
+        **solve_gate(plan, metrics, allowed=allowed, step=args.step),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
@@ -0,0 +1,269 @@
+"""Long-running scoring server over HTTP/1.1 (TCP or Unix socket).
+
+    python -m score_function serve --config score-function.yml --listen tcp:0.0.0.0:8080
+    python -m score_function serve --config score-function.yml --listen unix:/run/sf.sock
+
+The compiled config stays in memory and is reloaded when the file changes.
+Endpoints:
+
+* ``POST /score`` -- body is one metrics object (returns one result) or a JSON
+  array of them (returns an array of results in the same order).
+* ``GET /healthz`` -- profile and config reload status.
+
+Connections are kept alive by default (HTTP/1.1) and pipelined requests are
+answered in order.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from . import CompiledConfig, MetricsError, compile_config, load_config, score_function
+from .cache import DEFAULT_MAX_ENTRIES, ScoreCache
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def log(message: str) -> None:
+    print(f"[score-function] {message}", file=sys.stderr)
+
+
+class RawJSON(str):
+    """A response body that is already JSON-encoded (e.g. a cached result)."""
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ScoringServer:
+    """Keeps a compiled config hot and answers scoring requests."""
+
+    def __init__(
+        self,
+        config_path: Path,
+        *,
+        reload_interval: float = 1.0,
+        cache_dir: Optional[str] = None,
+        result_cache: Optional[ScoreCache] = None,
+    ) -> None:
+        self.config_path = config_path
+        self.reload_interval = reload_interval
+        self.cache_dir = cache_dir
+        self.plan: CompiledConfig = compile_config(load_config(config_path, cache_dir=cache_dir))
+        self.config_mtime_ns = config_path.stat().st_mtime_ns
+        self.reloads = 0
+        self.requests = 0
+        # Keyed by config fingerprint, so reloads never serve stale results.
+        self.result_cache = result_cache
+
+    # -- config --------------------------------------------------------------
+
+    def reload_if_changed(self) -> bool:
+        """Recompile the config when its mtime changed; keep the old one on errors."""
+        try:
+            mtime_ns = self.config_path.stat().st_mtime_ns
+        except OSError as exc:
+            log(f"config not readable, keeping previous: {exc}")
+            return False
+        if mtime_ns == self.config_mtime_ns:
+            return False
+        try:
+            plan = compile_config(load_config(self.config_path, cache_dir=self.cache_dir))
+        except (SystemExit, Exception) as exc:  # load errors surface as SystemExit
+            log(f"config reload failed, keeping previous: {exc}")
+            self.config_mtime_ns = mtime_ns
+            return False
+        self.plan = plan
+        self.config_mtime_ns = mtime_ns
+        self.reloads += 1
+        log(f"reloaded {self.config_path}")
+        return True
+
+    async def watch_config(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.reload_if_changed()
+
+    # -- requests ------------------------------------------------------------
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        path = target.split("?", 1)[0]
+        if path == "/healthz":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            return 200, {
+                "status": "ok",
+                "profile": self.plan.profile,
+                "config": str(self.config_path),
+                "reloads": self.reloads,
+                "requests": self.requests,
+                "result_cache": None if self.result_cache is None else self.result_cache.stats,
+            }
+        if path != "/score":
+            raise HTTPError(404, f"unknown path {path}")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            payload = json.loads(body)
+        except ValueError as exc:
+            raise HTTPError(400, f"invalid JSON: {exc}") from exc
+        plan = self.plan
+        cache = self.result_cache
+        try:
+            if cache is not None:
+                if isinstance(payload, list):
+                    return 200, RawJSON("[" + ",".join(cache.score_json(plan, metrics) for metrics in payload) + "]")
+                return 200, RawJSON(cache.score_json(plan, payload))
+            if isinstance(payload, list):
+                return 200, [score_function(plan, metrics) for metrics in payload]
+            return 200, score_function(plan, payload)
+        except (MetricsError, TypeError, ValueError, OverflowError) as exc:
+            raise HTTPError(400, str(exc) or exc.__class__.__name__) from exc
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                keep_alive = _keep_alive(version, headers)
+                self.requests += 1
+                try:
+                    status, result = self.dispatch(method, target, body)
+                except HTTPError as exc:
+                    status, result = exc.status, {"error": str(exc)}
+                except Exception as exc:  # keep the connection serving after a bug in one request
+                    log(f"{method} {target} failed: {exc.__class__.__name__}: {exc}")
+                    status, result = 500, {"error": "internal error"}
+                writer.write(_response(status, result, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as exc:
+            writer.write(_response(exc.status, {"error": str(exc)}, False))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:  # pragma: no cover - peer went away
+                pass
+
+    @staticmethod
+    async def _read_request(
+        reader: asyncio.StreamReader,
+    ) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as exc:
+            if exc.partial.strip():
+                raise HTTPError(400, "truncated request") from exc
+            return None
+        except asyncio.LimitOverrunError as exc:
+            raise HTTPError(413, "headers too large") from exc
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError as exc:
+            raise HTTPError(400, "malformed request line") from exc
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        body = b""
+        if method in ("POST", "PUT"):
+            if "content-length" not in headers:
+                raise HTTPError(411, "Content-Length required")
+            try:
+                length = int(headers["content-length"])
+            except ValueError as exc:
+                raise HTTPError(400, "invalid Content-Length") from exc
+            if length > MAX_BODY_BYTES:
+                raise HTTPError(413, "body too large")
+            body = await reader.readexactly(length)
+        return method, target, version, headers, body
+
+    async def serve(self, listen: str) -> None:
+        kind, _, address = listen.partition(":")
+        if kind == "unix":
+            server = await asyncio.start_unix_server(self.handle, path=address, limit=MAX_HEADER_BYTES)
+        elif kind == "tcp":
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self.handle, host or None, int(port), limit=MAX_HEADER_BYTES)
+        else:
+            raise SystemExit(f"Unsupported --listen value: {listen} (use unix:PATH or tcp:HOST:PORT)")
+        watcher = asyncio.create_task(self.watch_config())
+        log(f"listening on {listen} (profile={self.plan.profile})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = (payload if isinstance(payload, RawJSON) else _ENCODER.encode(payload)).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="score_function serve", description="Run the Score Function server")
+    parser.add_argument("--config", default="score-function.yml", help="Path to score-function.yml (or JSON)")
+    parser.add_argument("--listen", default="tcp:127.0.0.1:8080", help="unix:PATH or tcp:HOST:PORT")
+    parser.add_argument("--reload-interval", type=float, default=1.0, help="Seconds between config mtime checks")
+    parser.add_argument("--config-cache", help="Cache parsed configs in this directory")
+    parser.add_argument("--result-cache-entries", type=int, default=0, help="Keep up to N results in an LRU cache")
+    parser.add_argument("--result-cache-ttl", type=float, help="Seconds before cached results expire")
+    parser.add_argument("--result-cache", help="Share cached results through this SQLite file")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    result_cache = None
+    if args.result_cache_entries > 0 or args.result_cache:
+        result_cache = ScoreCache(
+            max_entries=args.result_cache_entries or DEFAULT_MAX_ENTRIES,
+            ttl=args.result_cache_ttl,
+            path=args.result_cache,
+        )
+    server = ScoringServer(
+        Path(args.config), reload_interval=args.reload_interval, cache_dir=args.config_cache, result_cache=result_cache
+    )
+    try:
+        asyncio.run(server.serve(args.listen))
+    except KeyboardInterrupt:  # pragma: no cover - interactive shutdown
+        pass
+    return 0
@@ -0,0 +1,167 @@
+"""Streaming JSONL scoring with constant memory.
+
+Each input line is one metrics record (``metrics.json`` shape). Results are
+written as compact JSON lines (or another :mod:`score_function.formats` format)
+in input order; records that cannot be parsed or scored are reported to an
+error channel instead of aborting the run.
+"""
+from __future__ import annotations
+
+import json
+import sys
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from . import CompiledConfig, MetricsError, resolve_profiles, score_function, score_profiles
+
+# Top-level keys copied from each input record onto its result line.
+PASSTHROUGH_KEYS = ("id", "path")
+
+# Result lines buffered before each write to the output stream.
+FLUSH_EVERY = 1024
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+
+def _serial_results(
+    config: Dict[str, Any] | CompiledConfig,
+    lines: Iterable[str],
+    on_error: Callable[[int, str], None],
+    profiles: Optional[Tuple[str, ...]] = None,
+) -> Iterator[Dict[str, Any]]:
+    decode = json.loads
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = decode(line)
+            result = score_function(config, record) if profiles is None else score_profiles(config, record, profiles)
+        except (MetricsError, ValueError, TypeError, OverflowError) as exc:
+            on_error(lineno, str(exc) or exc.__class__.__name__)
+            continue
+        for key in PASSTHROUGH_KEYS:
+            if key in record:
+                result[key] = record[key]
+        yield result
+
+
+def _chunk_results(
+    chunks: Iterable[Tuple[Any, int, Any]], on_error: Callable[[int, str], None]
+) -> Iterator[Dict[str, Any]]:
+    for results, _, errors in chunks:
+        for lineno, message in errors:
+            on_error(lineno, message)
+        yield from results
+
+
+def score_lines(
+    config: Dict[str, Any] | CompiledConfig,
+    lines: Iterable[str],
+    out: IO[Any],
+    on_error: Callable[[int, str], None],
+    *,
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    profiles: Optional[Tuple[str, ...]] = None,
+    fmt: str = "jsonl",
+) -> Tuple[int, int]:
+    """Score JSONL ``lines`` into ``out`` and return ``(scored, failed)``.
+
+    ``on_error`` receives the 1-based line number and a message for every
+    malformed or unscorable line. Blank lines are skipped. With ``workers > 1``
+    chunks of lines are decoded, scored and encoded in a process pool (see
+    :mod:`score_function.parallel`); ``lines`` may then also be ``bytes``.
+    With ``profiles`` each line gets a :func:`score_function.score_profiles`
+    result instead (serial only). ``fmt`` selects the output format; ``binary``
+    needs ``out`` to be a byte stream.
+    """
+    if profiles is not None and workers > 1:
+        raise SystemExit("profiles cannot be combined with workers > 1")
+    failed = 0
+
+    def report(lineno: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        on_error(lineno, message)
+
+    if workers > 1:
+        from .parallel import DEFAULT_CHUNKSIZE, map_lines
+
+        chunks = map_lines(config, lines, workers, chunksize or DEFAULT_CHUNKSIZE, encode=fmt == "jsonl")
+        if fmt == "jsonl":
+            # Workers return encoded output; the parent only copies it through.
+            scored = 0
+            for text, count, chunk_errors in chunks:
+                for lineno, message in chunk_errors:
+                    report(lineno, message)
+                out.write(text)
+                scored += count
+            out.flush()
+            return scored, failed
+        results = _chunk_results(chunks, report)
+    else:
+        results = _serial_results(config, lines, report, profiles)
+
+    if fmt != "jsonl":
+        from .formats import write_results
+
+        names = (profiles or resolve_profiles(config, None)) if fmt == "binary" else ()
+        return write_results(fmt, out, results, profiles=names), failed
+
+    encode = _ENCODER.encode
+    pending: list[str] = []
+    scored = 0
+    for result in results:
+        pending.append(encode(result))
+        scored += 1
+        if len(pending) >= FLUSH_EVERY:
+            out.write("\n".join(pending))
+            out.write("\n")
+            pending.clear()
+    if pending:
+        out.write("\n".join(pending))
+        out.write("\n")
+    out.flush()
+    return scored, failed
+
+
+def run_stream(
+    config: Dict[str, Any] | CompiledConfig,
+    source: str,
+    errors_path: Optional[str] = None,
+    *,
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    profiles: Optional[Tuple[str, ...]] = None,
+    fmt: str = "jsonl",
+) -> int:
+    """CLI driver for ``--stream``; returns 1 when any line failed."""
+    # Workers decode the lines themselves, so the parent hands them raw bytes.
+    binary = workers > 1
+    try:
+        if source == "-":
+            reader = sys.stdin.buffer if binary else sys.stdin
+        elif binary:
+            reader = open(source, "rb", buffering=1 << 20)
+        else:
+            reader = open(source, encoding="utf-8", buffering=1 << 20)
+    except FileNotFoundError as exc:
+        raise SystemExit(f"Missing metrics file: {source}") from exc
+    errors = open(errors_path, "w", encoding="utf-8") if errors_path else sys.stderr
+
+    def report(lineno: int, message: str) -> None:
+        errors.write(_ENCODER.encode({"line": lineno, "error": message}))
+        errors.write("\n")
+
+    try:
+        out = sys.stdout.buffer if fmt == "binary" else sys.stdout
+        _, failed = score_lines(
+            config, reader, out, report, workers=workers, chunksize=chunksize, profiles=profiles, fmt=fmt
+        )
+    finally:
+        if reader not in (sys.stdin, sys.stdin.buffer):
+            reader.close()
+        if errors is not sys.stderr:
+            errors.close()
+        else:
+            errors.flush()
+    return 1 if failed else 0
@@ -0,0 +1,62 @@
+import copy
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import FACE_ORDER, compute_faces, load_config, score_function  # noqa: E402
+from score_function.batch import columns_from_records, iter_rows, score_function_batch  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _random_records(count, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        record = copy.deepcopy(SAMPLE)
+        for face in FACE_ORDER:
+            for key in record[face]:
+                if key != "critical_count":
+                    record[face][key] = rng.uniform(-0.2, 1.2)
+        record["sec"]["critical_count"] = rng.choice([0, 0, 0, 1, 3])
+        record["uncertainty_sigma"] = rng.random()
+        records.append(record)
+    return records
+
+
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_batch_matches_reference(use_numpy):
+    records = _random_records(200)
+    records[0]["code"]["SA"] = float("nan")
+    records[1]["dep"]["CFR"] = float("nan")
+    records[2]["uncertainty_sigma"] = float("nan")
+    batch = score_function_batch(CONFIG, columns_from_records(records, use_numpy=use_numpy), use_numpy=use_numpy)
+    for i, record in enumerate(records):
+        faces = compute_faces(CONFIG, record)
+        for face in FACE_ORDER:
+            assert abs(float(batch["faces"][face][i]) - faces[face]) <= 1e-9
+    for row, record in zip(iter_rows(batch), records):
+        assert row == score_function(CONFIG, record)
+
+
+def test_batch_optional_columns_default_to_zero():
+    columns = columns_from_records([SAMPLE], use_numpy=False)
+    del columns["sec.critical_count"]
+    del columns["uncertainty_sigma"]
+    batch = score_function_batch(CONFIG, columns, use_numpy=False)
+    expected = dict(SAMPLE, uncertainty_sigma=0.0)
+    assert next(iter(iter_rows(batch))) == score_function(CONFIG, expected)
+
+
+def test_batch_missing_column():
+    columns = columns_from_records([SAMPLE], use_numpy=False)
+    del columns["code.PF"]
+    with pytest.raises(SystemExit, match="code.PF"):
+        score_function_batch(CONFIG, columns, use_numpy=False)
@@ -0,0 +1,51 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import main  # noqa: E402
+from score_function.bench import DEFAULT_CONFIG, build_cases, compare, run_benchmarks  # noqa: E402
+
+
+def test_run_benchmarks_reports_stats():
+    report = run_benchmarks(quick=True, pattern=r"^(compute_faces|summarize_semgrep\[100\])$")
+    assert set(report["results"]) == {"compute_faces", "summarize_semgrep[100]"}
+    stats = report["results"]["compute_faces"]
+    assert stats["ops_per_sec"] > 0
+    assert stats["p50_s"] <= stats["p99_s"]
+    assert stats["peak_bytes"] >= 0
+    assert report["score_function_version"] != "unknown"
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"a": {"ops_per_sec": 100.0, "peak_bytes": 10_000}, "gone": {"ops_per_sec": 1.0}}}
+    current = {"results": {"a": {"ops_per_sec": 70.0, "peak_bytes": 20_000}}}
+    assert len(compare(current, baseline, 0.25)) == 2
+    assert compare(current, baseline, 1.5) == []
+    untraced = {"results": {"a": {"ops_per_sec": 100.0, "peak_bytes": None}}}
+    assert compare(untraced, baseline, 0.25) == []
+
+
+def test_filter_skips_unselected_setup(tmp_path):
+    cases = build_cases(DEFAULT_CONFIG, seed=1, quick=True, workdir=tmp_path, pattern=r"^summarize_syft\[100\]$")
+    assert [name for name, *_ in cases] == ["summarize_syft[100]"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bench_subcommand_compare(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    assert main(["bench", "--quick", "--filter", "^compute_faces$", "--output", str(output)]) == 0
+    baseline = json.loads(output.read_text())
+    baseline["results"]["compute_faces"]["ops_per_sec"] *= 100
+    (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+    assert main(["bench", "--quick", "--filter", "^compute_faces$", "--compare", str(tmp_path / "baseline.json")]) == 1
+    assert "regression: compute_faces" in capsys.readouterr().err
+
+
+def test_cold_start_reported_per_version():
+    report = run_benchmarks(quick=True, pattern=r"^cli_cold_start")
+    cold = report["cold_start"]
+    assert cold["score_function_version"] == report["score_function_version"]
+    assert cold["cli_cold_start.precompiled"] > 0 and cold["cli_cold_start"] > 0
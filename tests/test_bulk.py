@@ -0,0 +1,88 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import load_config, main, score_function, score_profiles  # noqa: E402
+from score_function.batch import iter_rows  # noqa: E402
+from score_function.bulk import convert, score_binary  # noqa: E402
+from score_function.formats import BinaryFile  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _records(n):
+    records = []
+    for i in range(n):
+        record = json.loads(json.dumps(SAMPLE))
+        record["test"]["MT"] = (i % 10) / 10
+        record["sec"]["critical_count"] = i % 3 == 0
+        record["uncertainty_sigma"] = (i % 7) / 10
+        records.append(record)
+    return records
+
+
+@pytest.fixture()
+def metrics_file(tmp_path):
+    records = _records(25)
+    source = tmp_path / "metrics.jsonl"
+    source.write_text("".join(json.dumps(record) + "\n" for record in records))
+    output = tmp_path / "metrics.sfm"
+    assert convert(str(source), str(output)) == 25
+    return records, output
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_score_binary_matches_score_function(metrics_file, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    records, path = metrics_file
+    batches = score_binary(CONFIG, path, chunk_rows=7, use_numpy=use_numpy)
+    results = [row for batch in batches for row in iter_rows(batch)]
+    expected = [score_function(CONFIG, record) for record in records]
+    assert [row["gate_ok"] for row in results] == [row["gate_ok"] for row in expected]
+    for row, reference in zip(results, expected):
+        assert row["final"] == pytest.approx(reference["final"], abs=1e-4)
+        assert row["faces"] == pytest.approx(reference["faces"], abs=1e-4)
+
+
+def test_convert_reports_the_bad_record(tmp_path):
+    broken = json.loads(json.dumps(SAMPLE))
+    del broken["code"]["PF"]
+    source = tmp_path / "metrics.json"
+    source.write_text(json.dumps([SAMPLE, broken]))
+    with pytest.raises(SystemExit, match=r"metrics.json:2: Missing metric 'PF'"):
+        convert(str(source), str(tmp_path / "out.sfm"))
+    assert not (tmp_path / "out.sfm").exists()
+
+    source = tmp_path / "metrics.jsonl"
+    overflow = json.dumps(SAMPLE).replace('"critical_count": 0', '"critical_count": 1e400')
+    source.write_text(json.dumps(SAMPLE) + "\n" + overflow + "\n")
+    with pytest.raises(SystemExit, match=r"metrics.jsonl:2: cannot convert float infinity"):
+        convert(str(source), str(tmp_path / "out.sfm"))
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "binary"])
+def test_main_stream_binary_input(metrics_file, tmp_path, fmt, capsysbinary):
+    records, path = metrics_file
+    assert main(["score-function.yml", str(path), "--stream", "--format", fmt, "--profiles", "all"]) == 0
+    out = capsysbinary.readouterr().out
+    expected = [score_profiles(CONFIG, record, "all") for record in records]
+    if fmt == "jsonl":
+        results = [json.loads(line) for line in io.BytesIO(out)]
+        assert [row["profiles"].keys() for row in results] == [row["profiles"].keys() for row in expected]
+        assert results[3]["profiles"]["sre"]["final"] == pytest.approx(expected[3]["profiles"]["sre"]["final"])
+        return
+    (tmp_path / "results.sfr").write_bytes(out)
+    with BinaryFile(tmp_path / "results.sfr") as binary:
+        decoded = list(binary)
+    flat = [(name, fields) for row in expected for name, fields in row["profiles"].items()]
+    assert [row["profile"] for row in decoded] == [name for name, _ in flat]
+    assert [row["gate_ok"] for row in decoded] == [fields["gate_ok"] for _, fields in flat]
+    assert decoded[-1]["geo"] == pytest.approx(flat[-1][1]["geo"], abs=1e-4)
@@ -0,0 +1,97 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import MetricsError, compile_config, load_config, score_function  # noqa: E402
+from score_function.cache import ScoreCache  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _variant(value):
+    metrics = json.loads(json.dumps(SAMPLE))
+    metrics["code"]["SA"] = value
+    return metrics
+
+
+def test_hits_misses_and_quantization():
+    plan = compile_config(CONFIG)
+    cache = ScoreCache(quantum=1e-3)
+    assert cache.score(plan, SAMPLE) == score_function(plan, SAMPLE)
+    assert cache.score(CONFIG, SAMPLE) == score_function(CONFIG, SAMPLE)
+    nudged = _variant(SAMPLE["code"]["SA"] + 1e-5)
+    assert cache.score(plan, nudged) == score_function(plan, SAMPLE)
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 2
+    sre = compile_config({**CONFIG, "profile": "speed"})
+    assert cache.key(sre, SAMPLE) != cache.key(plan, SAMPLE)
+    with pytest.raises(MetricsError):
+        cache.score(plan, {"spec": {}})
+    for value in (float("nan"), float("inf"), -float("inf"), 1e308):
+        assert cache.score(plan, _variant(value)) == score_function(plan, _variant(value))
+    assert cache.key(plan, _variant(float("inf"))) != cache.key(plan, _variant(-float("inf")))
+
+
+def test_lru_ttl_and_byte_limits(monkeypatch):
+    plan = compile_config(CONFIG)
+    cache = ScoreCache(max_entries=2, ttl=10.0)
+    clock = [1000.0]
+    monkeypatch.setattr("score_function.cache.time.time", lambda: clock[0])
+    for value in (0.1, 0.2, 0.1, 0.3):
+        cache.score(plan, _variant(value))
+    assert len(cache) == 2 and cache.stats["evictions"] == 1
+    cache.score(plan, _variant(0.1))
+    assert cache.stats["hits"] == 2
+    clock[0] += 11.0
+    cache.score(plan, _variant(0.1))
+    assert cache.stats["expirations"] == 1
+
+    tiny = ScoreCache(max_bytes=1)
+    tiny.score(plan, _variant(0.1))
+    tiny.score(plan, _variant(0.2))
+    assert len(tiny) == 1 and tiny.stats["evictions"] == 1
+
+
+def test_shared_sqlite_backend(tmp_path):
+    path = tmp_path / "results.sqlite"
+    first = ScoreCache(path=path)
+    expected = first.score(CONFIG, SAMPLE)
+    first.close()
+    second = ScoreCache(path=path)
+    assert second.score(CONFIG, SAMPLE) == expected
+    assert second.stats == {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "shared_hits": 1}
+    second.close()
+
+
+def test_shared_file_pruned_across_short_lived_processes(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = tmp_path / "results.sqlite"
+    clock = [1000.0]
+    monkeypatch.setattr("score_function.cache.time.time", lambda: clock[0])
+    monkeypatch.setattr("score_function.cache._PRUNE_EVERY", 4)
+
+    def rows():
+        with sqlite3.connect(str(path)) as db:
+            return db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    for i in range(10):  # one insert per "CLI run", as with --result-cache
+        clock[0] += 1.0
+        cache = ScoreCache(path=path, max_entries=3)
+        cache.score(CONFIG, _variant(i / 10))
+        cache.close()
+    before = rows()
+    assert before <= 4
+
+    cache = ScoreCache(path=path, ttl=5.0)
+    cache.score(CONFIG, _variant(0.99))
+    cache.close()
+    clock[0] += 6.0
+    assert rows() == before + 1
+    ScoreCache(path=path, max_entries=100, ttl=5.0).close()
+    assert rows() == before
@@ -0,0 +1,102 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+np = pytest.importorskip("numpy")
+
+from score_function import (  # noqa: E402
+    METRIC_COLUMNS,
+    WEIGHT_SUM_TOLERANCE,
+    _load_simple_yaml,
+    compile_config,
+    load_config,
+    main,
+    score_function,
+)
+from score_function.batch import score_function_batch  # noqa: E402
+from score_function.calibrate import Model, _Data, calibrate  # noqa: E402
+from score_function.parallel import pack_record  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.array(pack_record(SAMPLE))
+    data = np.clip(base + rng.normal(0.0, 0.08, (n, len(METRIC_COLUMNS))), 0.0, 1.0)
+    columns = {name: data[:, i].copy() for i, name in enumerate(METRIC_COLUMNS)}
+    columns["sec.critical_count"] = (rng.random(n) < 0.05).astype(float)
+    columns["uncertainty_sigma"] = rng.random(n) * 0.3
+    return columns
+
+
+def _labels(columns, seed=1):
+    truth = json.loads(json.dumps(CONFIG))
+    truth["weights"]["test"] = {"CV": 0.1, "MT": 0.6, "FL_inv": 0.1, "SK_inv": 0.1, "ST": 0.1}
+    final = np.asarray(score_function_batch(truth, columns)["final"]) / 100.0
+    p = 1.0 / (1.0 + np.exp(-(30.0 - 40.0 * final)))
+    return (np.random.default_rng(seed).random(len(final)) < p).astype(float)
+
+
+def test_scores_and_gradient_match():
+    plan = compile_config(CONFIG)
+    columns = _columns(500)
+    data = _Data(np, plan, columns, _labels(columns))
+    model = Model(np, plan)
+    score, _ = model.scores(model.initial, data)
+    assert np.allclose(score * 100.0, score_function_batch(plan, columns)["final"], rtol=0, atol=1e-9)
+
+    params = model.initial + np.random.default_rng(2).normal(0.0, 0.1, len(model.initial))
+    params[model.b_index] = -20.0
+    _, grad = model.loss(params, data, 1e-3)
+    numeric = np.zeros_like(params)
+    for i in range(len(params)):
+        step = np.zeros_like(params)
+        step[i] = 1e-6
+        numeric[i] = (model.loss(params + step, data, 1e-3)[0] - model.loss(params - step, data, 1e-3)[0]) / 2e-6
+    assert np.abs(grad - numeric).max() < 1e-6 * max(1.0, np.abs(numeric).max())
+
+
+def test_calibrate_moves_towards_outcomes():
+    columns = _columns(20_000)
+    fitted, diagnostics = calibrate(CONFIG, columns, _labels(columns), steps=300, l2=0.0)
+    weights = fitted["weights"]["test"]
+    assert weights["MT"] > CONFIG["weights"]["test"]["MT"] + 0.1
+    assert abs(sum(weights.values()) - 1.0) <= WEIGHT_SUM_TOLERANCE
+    assert diagnostics["link"]["b"] < 0
+    before, after = diagnostics["before"]["holdout"], diagnostics["after"]["holdout"]
+    assert after["log_loss"] < before["log_loss"] and after["records"] == 4_000
+
+    config = json.loads(json.dumps(CONFIG))
+    config["weights"]["sec"].update(VV=0.54, SE=0.0)
+    config["thresholds"]["code"]["cc_tau"] = 0.12345
+    config["thresholds"]["pr"]["risk_tau"] = 1.0
+    frozen, _ = calibrate(config, columns, _labels(columns), fit=["k"], steps=20)
+    assert frozen["weights"] == config["weights"] and frozen["thresholds"] == config["thresholds"]
+    taus_only, _ = calibrate(config, columns, _labels(columns), fit=["taus"], steps=20)
+    assert taus_only["weights"] == config["weights"] and taus_only["k_steep"] == config["k_steep"]
+
+
+def test_calibrate_cli_writes_loadable_yaml(tmp_path, capsys):
+    records = tmp_path / "labeled.jsonl"
+    with records.open("w") as handle:
+        for i in range(200):
+            record = json.loads(json.dumps(SAMPLE))
+            record["test"]["MT"] = i / 200
+            handle.write(json.dumps(dict(record, incident=i < 40)) + "\n")
+    output = tmp_path / "fitted.yml"
+    assert main(["calibrate", "score-function.yml", str(records), "--label", "incident", "-o", str(output),
+                 "--steps", "30"]) == 0
+    diagnostics = json.loads(capsys.readouterr().out)
+    assert diagnostics["before"]["train"]["records"] == 160
+
+    fitted = load_config(output)
+    assert _load_simple_yaml(output.read_text()) == fitted
+    assert set(fitted) == set(CONFIG) and fitted["external_weights"] == CONFIG["external_weights"]
+    score_function(fitted, SAMPLE)
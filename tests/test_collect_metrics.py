@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "tools"))
+
+import collect_metrics  # noqa: E402
+from collect_metrics import StreamedReport, iter_json_array, load_reports  # noqa: E402
+
+ESLINT = [
+    {"filePath": "a.js", "errorCount": 2, "fatalErrorCount": 0, "warningCount": 1,
+     "messages": [{"ruleId": "complexity"}, {"ruleId": "no-unused-vars", "message": "x \"quoted\" \\ y"}]},
+    {"filePath": "b.js", "errorCount": 0, "warningCount": 3, "messages": []},
+    "not-a-dict",
+]
+SYFT = {
+    "source": {"target": {"nested": [1, 2, {"s": "]}"}]}},
+    "matches": [
+        {"vulnerability": {"severity": "Critical", "cvss": [{"metrics": [{"score": 9.8}]}]}, "status": "affected"},
+        {"vulnerability": {"severity": "Low"}, "status": "fixed"},
+    ],
+    "descriptor": {"name": "grype"},
+}
+SEMGREP = {"errors": [], "results": [{"extra": {"severity": "ERROR"}}, {"extra": {"severity": "WARNING"}}, {}]}
+
+
+@pytest.fixture(autouse=True)
+def tiny_chunks(monkeypatch):
+    monkeypatch.setattr(collect_metrics, "_READ_CHUNK", 7)
+
+
+@pytest.mark.parametrize(
+    "name, report, key",
+    [("eslint", ESLINT, None), ("syft", SYFT, "matches"), ("semgrep", SEMGREP, "results")],
+)
+def test_streamed_summary_matches_parsed(tmp_path, name, report, key):
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps(report, indent=1))
+    summarize = getattr(collect_metrics, f"summarize_{name}")
+    assert summarize(StreamedReport(path, key)) == summarize(report)
+
+
+def test_iter_json_array_missing_key_and_bad_json(tmp_path, monkeypatch):
+    path = tmp_path / "report.json"
+    path.write_text(json.dumps({"other": [1, 2]}))
+    assert list(iter_json_array(path, "matches")) == []
+    path.write_text('[{"a": 1}, {"b": ')
+    with pytest.raises(SystemExit, match="Invalid JSON"):
+        list(iter_json_array(path))
+    monkeypatch.setattr(collect_metrics, "_MAX_LOOKAHEAD", 64)
+    path.write_text('[{"a": 1}, {"b": [' + "1, " * 1000)
+    with pytest.raises(SystemExit, match="no complete value within 64"):
+        list(iter_json_array(path))
+
+
+def test_load_reports_streams_large_reports(tmp_path):
+    (tmp_path / "eslint.json").write_text(json.dumps(ESLINT))
+    (tmp_path / "coverage-summary.json").write_text(json.dumps({"total": {"lines": {"pct": 80}}}))
+    sources = {
+        "eslint": (tmp_path / "eslint.json", "ESLint", False),
+        "jest": (tmp_path / "coverage-summary.json", "Jest", False),
+        "syft": (tmp_path / "syft.json", "Syft", False),
+        "spec": None,
+    }
+    reports = load_reports(sources, threshold=10)
+    assert isinstance(reports["eslint"], collect_metrics.CachedSummary)
+    assert reports["eslint"].summary == collect_metrics.summarize_eslint(ESLINT)
+    assert reports["jest"] == {"total": {"lines": {"pct": 80}}}
+    assert reports["syft"] is None and reports["spec"] is None
+
+
+def test_summary_cache_skips_unchanged_reports(tmp_path, monkeypatch):
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "eslint.json").write_text(json.dumps(ESLINT))
+    (reports / "syft.json").write_text(json.dumps(SYFT))
+    sources = {
+        "eslint": (reports / "eslint.json", "ESLint", False),
+        "syft": (reports / "syft.json", "Syft", False),
+        "spec": None,
+    }
+    cache = collect_metrics.SummaryCache(tmp_path / "cache")
+    first = collect_metrics.build_metrics(load_reports(sources, cache=cache))
+    assert cache.stats == {"miss": 2}
+
+    def fail(*args, **kwargs):
+        raise AssertionError("report parsed despite a cache hit")
+
+    monkeypatch.setattr(collect_metrics, "load_report", fail)
+    cache = collect_metrics.SummaryCache(tmp_path / "cache")
+    assert collect_metrics.build_metrics(load_reports(sources, cache=cache)) == first
+    assert cache.stats == {"hit": 2}
+
+    os.utime(reports / "eslint.json", ns=(1, 1))
+    cache = collect_metrics.SummaryCache(tmp_path / "cache")
+    assert collect_metrics.build_metrics(load_reports(sources, cache=cache)) == first
+    assert cache.stats == {"hit": 1, "rehash_hit": 1}
+
+    monkeypatch.undo()
+    (reports / "syft.json").write_text(json.dumps(dict(SYFT, matches=SYFT["matches"][:1])))
+    cache = collect_metrics.SummaryCache(tmp_path / "cache")
+    changed = collect_metrics.build_metrics(load_reports(sources, cache=cache))
+    assert cache.stats == {"hit": 1, "miss": 1}
+    assert changed["sec"]["dep_vulns"] < first["sec"]["dep_vulns"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fleet_mode_tags_paths_and_reports_failures(tmp_path, capsys, workers):
+    for name in ("a", "b", "c"):
+        reports = tmp_path / "packages" / name / "reports"
+        reports.mkdir(parents=True)
+        (reports / "eslint.json").write_text(json.dumps(ESLINT) if name != "b" else "[{broken")
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# extra\n{tmp_path / 'packages' / 'a' / 'reports'}\n")
+    errors = tmp_path / "errors.jsonl"
+    code = collect_metrics.main([
+        "--reports-glob", str(tmp_path / "packages" / "*" / "reports"),
+        "--manifest", str(manifest),
+        "--workers", str(workers),
+        "--errors", str(errors),
+    ])
+    assert code == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [Path(line["path"]).parent.name for line in lines] == ["a", "c"]
+    single = collect_metrics.build_metrics(load_reports(collect_metrics.report_sources(
+        Path(lines[0]["path"]), required=False)))
+    assert {key: value for key, value in lines[0].items() if key != "path"} == single
+    (failure,) = [json.loads(line) for line in errors.read_text().splitlines()]
+    assert Path(failure["path"]).parent.name == "b" and "Invalid JSON" in failure["error"]
+
+
+def test_fleet_mode_rejects_single_report_paths(capsys):
+    with pytest.raises(SystemExit):
+        collect_metrics.parse_args(["--reports-glob", "x/*", "--eslint", "e.json"])
+    assert "--eslint names a single report" in capsys.readouterr().err
+
+
+def test_json_output_shape(tmp_path, capsys):
+    reports = tmp_path / "packages" / "a" / "reports"
+    reports.mkdir(parents=True)
+    (reports / "eslint.json").write_text(json.dumps(ESLINT))
+    assert collect_metrics.main(["--reports-dir", str(reports)]) == 0
+    single = json.loads(capsys.readouterr().out)
+    assert isinstance(single, dict) and "path" not in single
+    assert collect_metrics.main(["--reports-glob", str(reports), "--format", "json", "--workers", "1"]) == 0
+    fleet = json.loads(capsys.readouterr().out)
+    assert isinstance(fleet, list) and len(fleet) == 1 and fleet[0]["code"] == single["code"]
+
+
+@pytest.mark.parametrize("content", ["[1, 2]", '{"version": 1}', '{"version": 1, "size": 3', "null"])
+def test_summary_cache_ignores_foreign_entries(tmp_path, content):
+    (tmp_path / "eslint.json").write_text(json.dumps(ESLINT))
+    sources = {"eslint": (tmp_path / "eslint.json", "ESLint", False)}
+    cache = collect_metrics.SummaryCache(tmp_path / "cache")
+    cache._entry("eslint", tmp_path / "eslint.json").write_text(content)
+    reports = load_reports(sources, cache=cache)
+    assert reports["eslint"].summary == collect_metrics.summarize_eslint(ESLINT)
+    assert cache.stats == {"miss": 1}
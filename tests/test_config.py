@@ -0,0 +1,97 @@
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import score_function  # noqa: E402
+from score_function import _load_simple_yaml, _parse_flow, load_config  # noqa: E402
+
+CONFIG_TEXT = Path("score-function.yml").read_text()
+
+
+def test_simple_yaml_matches_pyyaml():
+    yaml = pytest.importorskip("yaml")
+    assert _load_simple_yaml(CONFIG_TEXT) == yaml.safe_load(CONFIG_TEXT)
+
+
+def test_flow_parser_handles_nesting_and_quotes():
+    assert _parse_flow("{a: {b: [1, 'x, y', true]}, c: ~, \"d\": 2.5}") == {
+        "a": {"b": [1, "x, y", True]},
+        "c": None,
+        "d": 2.5,
+    }
+    with pytest.raises(SystemExit, match="Unsupported flow value"):
+        _parse_flow("{a: 1")
+
+
+def test_config_cache_skips_parsing(tmp_path, monkeypatch):
+    path = tmp_path / "score-function.yml"
+    path.write_text(CONFIG_TEXT)
+    cache = tmp_path / "cache"
+    first = load_config(path, cache_dir=cache)
+    assert len(list(cache.iterdir())) == 1
+
+    def fail(text):
+        raise AssertionError("config was re-parsed")
+
+    monkeypatch.setattr(score_function, "_parse_config_text", fail)
+    assert load_config(path, cache_dir=cache) == first
+
+
+def test_config_cache_invalidated_on_change(tmp_path, monkeypatch):
+    config = _load_simple_yaml(CONFIG_TEXT)
+    path = tmp_path / "score-function.json"
+    path.write_text(json.dumps(config))
+    monkeypatch.setenv(score_function.CONFIG_CACHE_ENV, str(tmp_path / "cache"))
+    assert load_config(path)["profile"] == "sre"
+    path.write_text(json.dumps(dict(config, profile="speed")))
+    os.utime(path, ns=(1, 1))
+    assert load_config(path)["profile"] == "speed"
+
+
+def test_truncated_json_config_exits_cleanly(tmp_path):
+    path = tmp_path / "score-function.json"
+    path.write_text('{"profile": "sre", "weights": {')
+    with pytest.raises(SystemExit, match=re.escape(f"Invalid JSON config {path}: ")):
+        load_config(path)
+
+
+def test_validation_lists_every_problem(tmp_path):
+    config = _load_simple_yaml(CONFIG_TEXT)
+    del config["weights"]["code"]["PF"]
+    config["weights"]["spec"]["RC"] = 0.35
+    config["weights"]["test"]["CV_typo"] = 0.1
+    config["thresholds"]["dep"]["cfr_tau"] = 1.5
+    config["gate"]["min_geo"] = "80"
+    config["external_weights"]["speed"]["sec"] = 0
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps(config))
+    with pytest.raises(score_function.ConfigError) as excinfo:
+        load_config(path)
+    assert dict(excinfo.value.errors) == {
+        "gate.min_geo": "expected a number, got '80'",
+        "weights.spec": "weights sum to 1.05, expected 1",
+        "weights.code.PF": "missing",
+        "weights.test.CV_typo": "unknown key",
+        "thresholds.dep.cfr_tau": "1.5 is outside [0, 1]",
+        "external_weights.speed.sec": "0 must be > 0",
+    }
+    assert str(path) in str(excinfo.value)
+
+
+def test_compiled_config_is_immutable():
+    config = _load_simple_yaml(CONFIG_TEXT)
+    plan = score_function.compile_config(config)
+    config["weights"]["code"]["PF"] = 0.5
+    assert plan.raw["weights"]["code"]["PF"] == 0.10
+    with pytest.raises(AttributeError):
+        plan.min_geo = 0.0
+    with pytest.raises(TypeError):
+        plan.external_weights["sre"] = (1.0,) * 6
+    assert len(plan.fingerprint) == 32
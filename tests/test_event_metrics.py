@@ -0,0 +1,98 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "tools"))
+
+import event_metrics  # noqa: E402
+from event_metrics import EventAggregator, RollingWindow, event_counts  # noqa: E402
+
+DAY = 86400.0
+
+
+def test_rolling_window_matches_recount():
+    rng = random.Random(7)
+    window = RollingWindow(10 * DAY, 10)
+    kept = []
+    ts = 0.0
+    for _ in range(2000):
+        ts += rng.expovariate(1 / 3600.0)
+        late = ts - rng.random() * 2 * DAY
+        event = {"type": rng.choice(["pr_merged", "ci", "deploy", "incident"]), "ok": rng.random() < 0.8,
+                 "reviewed": rng.random() < 0.5, "restore_minutes": 30.0}
+        if window.add(late, event_counts(event)):
+            kept.append((late, event))
+        horizon = (window.head - window.buckets + 1) * window.width
+        expected = {name: 0.0 for name in event_metrics.COUNTERS}
+        for when, seen in kept:
+            if when >= horizon:
+                for name, value in event_counts(seen).items():
+                    expected[name] += value
+        for name, value in expected.items():
+            assert abs(window.total(name) - value) < 1e-6, name
+        kept = [(when, seen) for when, seen in kept if when >= horizon]
+
+
+def test_aggregator_metrics_and_expiry():
+    aggregator = EventAggregator(7 * DAY, 7, target_merges=4)
+    aggregator.consume_all([
+        {"type": "pr_merged", "ts": "2024-01-01T00:00:00Z", "reviewed": True, "risk": 0.2},
+        {"type": "pr_merged", "ts": "2024-01-02T00:00:00Z", "reviewed": False, "risk": 0.6},
+        {"type": "pr_reverted", "ts": "2024-01-02T01:00:00Z"},
+        {"type": "ci", "ts": "2024-01-02T02:00:00Z", "ok": True},
+        {"type": "deploy", "ts": "2024-01-03T00:00:00Z", "ok": True},
+        {"type": "deploy", "ts": "2024-01-03T06:00:00Z", "ok": False, "perf_regression": True},
+        {"type": "rollback", "ts": "2024-01-03T07:00:00Z"},
+        {"type": "incident", "ts": "2024-01-03T08:00:00Z", "restore_minutes": 144},
+        {"type": "unknown", "ts": 0},
+    ])
+    metrics = aggregator.metrics()
+    assert metrics["pr"] == {"RR": 0.5, "risk": 0.4, "DV": 0.5, "RB": 0.5, "CI": 1.0}
+    dep = metrics["dep"]
+    assert list(dep) == ["SR", "CFR", "MT", "RBK", "PRG", "EB"]
+    assert dep["SR"] == 0.5 and dep["CFR"] == 0.5 and dep["RBK"] == 0.5 and dep["PRG"] == 0.5
+    assert abs(dep["MT"] - 0.1) < 1e-9 and 0 < dep["EB"] <= 1
+    assert aggregator.ignored == 1
+
+    later = event_metrics.parse_timestamp("2024-01-20T00:00:00Z")
+    assert aggregator.metrics(later) == {"pr": {}, "dep": {}}
+
+
+def test_cli_writes_collect_metrics_overrides(tmp_path, capsys):
+    events = tmp_path / "events.jsonl"
+    events.write_text("\n".join([
+        json.dumps({"type": "ci", "ts": 1000, "ok": True}),
+        "not json",
+        json.dumps({"type": "ci", "ts": 2000, "ok": False}),
+        json.dumps({"type": "deploy", "ts": 90000, "ok": True}),
+        json.dumps({"type": "incident", "ts": 90001, "restore_minutes": None}),
+        json.dumps({"type": "ci", "ts": float("nan"), "ok": False}),
+    ]) + "\n")
+    pr_out = tmp_path / "pr.json"
+    assert event_metrics.main([str(events), "--window", "7d", "--pr-out", str(pr_out)]) == 0
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)["pr"] == {"CI": 0.5}
+    assert json.loads(pr_out.read_text()) == {"CI": 0.5}
+    assert "line 2: skipped" in captured.err
+    assert "line 5: skipped (invalid restore_minutes: None)" in captured.err
+    assert "line 6: skipped (invalid timestamp: nan)" in captured.err
+
+    assert event_metrics.main([str(events), "--emit-every", "1d"]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[0]["ts"] == "1970-01-02T00:00:00Z" and lines[0]["pr"] == {"CI": 0.5} and lines[0]["dep"] == {}
+    assert lines[-1]["dep"]["SR"] == 1.0
+
+
+def test_cli_rejects_bad_now(tmp_path, capsys):
+    events = tmp_path / "events.jsonl"
+    events.write_text(json.dumps({"type": "ci", "ts": 1000, "ok": True}) + "\n")
+    for now in ("yesterday", "nan"):
+        with pytest.raises(SystemExit) as excinfo:
+            event_metrics.main([str(events), "--now", now])
+        assert excinfo.value.code == 2
+        assert "--now:" in capsys.readouterr().err
+    assert event_metrics.main([str(events), "--now", "1970-01-01T01:00:00Z"]) == 0
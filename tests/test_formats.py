@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "tools"))
+
+import collect_metrics  # noqa: E402
+from score_function import METRIC_COLUMNS, load_config, main, score_function, score_profiles  # noqa: E402
+from score_function.formats import RESULT_RECORD, BinaryFile, write_results  # noqa: E402
+from score_function.stream import score_lines  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _results(n=5):
+    records = []
+    for i in range(n):
+        record = json.loads(json.dumps(SAMPLE))
+        record["test"]["MT"] = i / n
+        records.append(score_function(CONFIG, record))
+    return records
+
+
+def test_binary_round_trip_stdlib_and_numpy(tmp_path):
+    results = _results()
+    path = tmp_path / "results.sfr"
+    with path.open("wb") as handle:
+        assert write_results("binary", handle, results, profiles=(CONFIG["profile"],)) == 5
+
+    with BinaryFile(path) as binary:
+        assert binary.kind == "results" and binary.names == (CONFIG["profile"],) and len(binary) == 5
+        assert binary.offset % 8 == 0 and binary.offset + 5 * RESULT_RECORD.size == path.stat().st_size
+        assert list(binary) == results
+
+    np = pytest.importorskip("numpy")
+    binary = BinaryFile(path)
+    table = binary.to_numpy()
+    assert table.dtype.itemsize == RESULT_RECORD.size
+    assert np.shares_memory(table, np.frombuffer(binary.buffer, dtype=np.uint8))
+    assert table["final"].tolist() == [result["final"] for result in results]
+    assert table["gate_ok"].tolist() == [int(result["gate_ok"]) for result in results]
+
+
+def test_csv_and_binary_rows_per_profile(tmp_path):
+    result = score_profiles(CONFIG, dict(SAMPLE), "all")
+    profiles = tuple(result["profiles"])
+    out = io.StringIO()
+    write_results("csv", out, [dict(result, id="r1")])
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [row["profile"] for row in rows] == list(profiles)
+    assert {row["id"] for row in rows} == {"r1"}
+    assert float(rows[0]["final"]) == result["profiles"][profiles[0]]["final"]
+
+    path = tmp_path / "profiles.sfr"
+    with path.open("wb") as handle:
+        write_results("binary", handle, [result], profiles=profiles)
+    with BinaryFile(path) as binary:
+        decoded = list(binary)
+    assert [row["profile"] for row in decoded] == list(profiles)
+    assert decoded[-1]["geo"] == result["profiles"][profiles[-1]]["geo"]
+
+
+def test_score_lines_formats():
+    lines = [json.dumps(dict(SAMPLE, id=i)) for i in range(3)]
+    out = io.StringIO()
+    assert score_lines(CONFIG, lines, out, lambda *_: None, fmt="json") == (3, 0)
+    assert [row["id"] for row in json.loads(out.getvalue())] == [0, 1, 2]
+
+    empty = io.StringIO()
+    score_lines(CONFIG, [], empty, lambda *_: None, fmt="json")
+    assert json.loads(empty.getvalue()) == []
+
+    raw = io.BytesIO()
+    assert score_lines(CONFIG, lines, raw, lambda *_: None, fmt="binary") == (3, 0)
+
+
+def test_main_format_csv(tmp_path, capsys):
+    metrics = tmp_path / "metrics.json"
+    metrics.write_text(json.dumps(SAMPLE))
+    assert main(["score-function.yml", str(metrics), "--format", "csv"]) == 0
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert len(rows) == 1 and float(rows[0]["final"]) == score_function(CONFIG, SAMPLE)["final"]
+
+
+def test_collect_metrics_formats(tmp_path):
+    records = [SAMPLE, SAMPLE]
+    out = io.StringIO()
+    collect_metrics.write_metrics(records, "csv", out)
+    header, *rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert tuple(header) == METRIC_COLUMNS and len(rows) == 2
+
+    path = tmp_path / "metrics.sfm"
+    with path.open("wb") as handle:
+        assert collect_metrics.write_metrics(records, "binary", handle) == 2
+    with BinaryFile(path) as binary:
+        assert binary.kind == "metrics" and binary.names == METRIC_COLUMNS
+        decoded = list(binary)
+    assert decoded[0] == SAMPLE
+    assert score_function(CONFIG, decoded[1]) == score_function(CONFIG, SAMPLE)
+
+    extra = json.loads(json.dumps(SAMPLE))
+    extra["spec"]["a_metric_name_that_is_too_long"] = 1.0
+    with pytest.raises(SystemExit, match="too long"):
+        collect_metrics.write_metrics([extra], "binary", io.BytesIO())
@@ -0,0 +1,54 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import score_function as core  # noqa: E402
+from score_function import load_config, score_function  # noqa: E402
+from score_function.history import HistoryStore, main as history_main  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _result(mt):
+    metrics = json.loads(json.dumps(SAMPLE))
+    metrics["test"]["MT"] = mt
+    return score_function(CONFIG, metrics)
+
+
+def test_last_flip_and_regressions(tmp_path):
+    with HistoryStore(tmp_path / "scores.db") as store:
+        store.append_many(
+            [
+                (_result(0.67), "org/app", "a1", "2024-06-01T00:00:00Z"),
+                (_result(0.30), "org/app", "a2", "2024-06-02T00:00:00Z"),
+                (_result(0.35), "org/app", "a3", "2024-06-03T00:00:00Z"),
+                (_result(0.67), "org/lib", "b1", "2024-06-01T00:00:00Z"),
+            ]
+        )
+        assert [row["commit"] for row in store.last("org/app", 2)] == ["a3", "a2"]
+        flip = store.last_flip("org/app")
+        assert flip["commit"] == "a2" and not flip["gate_ok"]
+        assert store.last_flip("org/lib") is None
+
+        found = store.regressions(5.0)
+        assert [item["repo"] for item in found] == ["org/app"]
+        assert list(found[0]["dropped"]) == ["test"] and found[0]["baseline"]["commit"] == "a1"
+        assert store.regressions(5.0, baseline_commit="a2") == []
+        assert store.regressions(5.0, since="2024-06-01T12:00:00") != []
+        assert store.repos() == ["org/app", "org/lib"]
+
+
+def test_cli_writes_and_queries_history(tmp_path, capsys):
+    db = str(tmp_path / "scores.db")
+    args = ["score-function.yml", "examples/metrics.sample.json", "--history", db, "--repo", "org/app"]
+    assert core.main([*args, "--commit", "c1", "--timestamp", "1700000000"]) == 0
+    assert core.main(["history", db, "last", "--repo", "org/app"]) == 0
+    output = capsys.readouterr().out
+    rows = json.loads(output[output.index("["):])
+    assert rows[0]["commit"] == "c1" and rows[0]["timestamp"] == "2023-11-14T22:13:20Z"
+    assert history_main([db, "flip", "--repo", "org/app"]) == 0
+    assert json.loads(capsys.readouterr().out) is None
@@ -0,0 +1,50 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import MetricsError, load_config, score_function  # noqa: E402
+from score_function.incremental import IncrementalScorer  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def test_updates_match_full_rescore():
+    scorer = IncrementalScorer(CONFIG, SAMPLE)
+    assert scorer.result() == score_function(CONFIG, SAMPLE)
+    expected = json.loads(json.dumps(SAMPLE))
+    for delta in ({"sec": {"CVSS_sum": 0.5}}, {"code": {"SA": 0.3}, "uncertainty_sigma": 0.4}):
+        scorer.update(delta)
+        for face, values in delta.items():
+            if face == "uncertainty_sigma":
+                expected[face] = values
+            else:
+                expected[face].update(values)
+        assert scorer.result() == score_function(CONFIG, expected)
+
+
+def test_events_on_gate_flip_and_epsilon():
+    events = []
+    scorer = IncrementalScorer(CONFIG, SAMPLE, epsilon=1.0, on_event=events.append)
+    assert scorer.update({"pr": {"DV": 0.61}}) is None
+    flipped = scorer.update({"sec": {"critical_count": 1}})
+    assert flipped is not None and flipped.gate_flipped and not flipped.gate_ok
+    assert flipped.changed_faces == ("sec",)
+    recovered = scorer.update({"sec": {"critical_count": 0}})
+    assert recovered.gate_flipped and recovered.gate_ok
+    assert events == [flipped, recovered]
+
+
+def test_failed_update_leaves_state_untouched():
+    scorer = IncrementalScorer(CONFIG, SAMPLE)
+    before = scorer.result()
+    with pytest.raises(MetricsError):
+        scorer.update({"code": {"SA": 0.1}, "dep": {"SR": "n/a"}})
+    with pytest.raises(MetricsError, match="Unknown face"):
+        scorer.update({"ops": {}})
+    assert scorer.result() == before
@@ -0,0 +1,62 @@
+import json
+import pstats
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import score_function as core  # noqa: E402
+from score_function import FACE_ORDER, compile_config, load_config, score_function  # noqa: E402
+from score_function.instrument import Instrumentation, instrumented  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def test_instrumented_results_match_and_counters():
+    out_of_range = json.loads(json.dumps(SAMPLE))
+    out_of_range["code"]["SA"] = 1.7
+    out_of_range["test"]["MT"] = float("nan")
+    out_of_range["sec"]["critical_count"] = 2
+    out_of_range["uncertainty_sigma"] = -0.2
+    seen = []
+    with instrumented() as inst:
+        inst.add_hook(lambda name, seconds: seen.append(name))
+        for config in (CONFIG, compile_config(CONFIG)):
+            for metrics in (SAMPLE, out_of_range):
+                assert score_function(config, metrics) == _uninstrumented(config, metrics)
+    assert core._INSTRUMENTATION is None
+    snapshot = inst.snapshot()
+    assert snapshot["counters"] == {"records_scored": 4, "clips_clamped": 6, "critical_overrides": 2}
+    assert snapshot["timings"]["score_function"]["count"] == 4
+    assert all(snapshot["timings"][f"compute_faces.{face}"]["count"] == 4 for face in FACE_ORDER)
+    assert "compute_faces.sec" in seen
+
+
+def _uninstrumented(config, metrics):
+    previous, core._INSTRUMENTATION = core._INSTRUMENTATION, None
+    try:
+        return score_function(config, metrics)
+    finally:
+        core._INSTRUMENTATION = previous
+
+
+def test_profile_out_json_and_pstats(tmp_path, capsys):
+    timings = tmp_path / "timings.json"
+    assert core.main(["score-function.yml", "examples/metrics.sample.json", "--profile-out", str(timings)]) == 0
+    report = json.loads(timings.read_text())
+    for name in ("main", "load_config", "load_json", "score_function", "serialize", "compute_faces.dep"):
+        assert report["timings"][name]["count"] == 1
+    assert report["counters"]["records_scored"] == 1
+    assert core._INSTRUMENTATION is None
+
+    stats = tmp_path / "run.prof"
+    assert core.main(["score-function.yml", "examples/metrics.sample.json", "--profile-out", str(stats)]) == 0
+    assert any(func[2] == "score_function" for func in pstats.Stats(str(stats)).stats)
+    capsys.readouterr()
+
+
+def test_disabled_by_default():
+    assert core._INSTRUMENTATION is None
+    assert isinstance(Instrumentation().snapshot()["counters"], dict)
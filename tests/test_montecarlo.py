@@ -0,0 +1,57 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import load_config, score_function  # noqa: E402
+from score_function.montecarlo import Histogram, simulate, simulate_many  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_simulate_is_reproducible_and_centred(use_numpy):
+    first = simulate(CONFIG, SAMPLE, samples=2000, seed=3, use_numpy=use_numpy)
+    assert first == simulate(CONFIG, SAMPLE, samples=2000, seed=3, use_numpy=use_numpy)
+    assert first != simulate(CONFIG, SAMPLE, samples=2000, seed=4, use_numpy=use_numpy)
+    assert first["samples"] == 2000 and 0.0 <= first["gate_probability"] <= 1.0
+    p5, p50, p95 = first["percentiles"].values()
+    assert p5 < p50 < p95
+    assert abs(p50 - score_function(CONFIG, SAMPLE)["final"]) < 2.0
+    tight = simulate(CONFIG, SAMPLE, samples=2000, seed=3, concentration=1e6, use_numpy=use_numpy)
+    assert tight["percentiles"]["p95"] - tight["percentiles"]["p5"] < 0.1
+
+
+def test_early_stopping_and_workers():
+    stopped = simulate(CONFIG, SAMPLE, samples=50_000, block_size=500, tolerance=0.05)
+    assert stopped["converged"] and stopped["samples"] < 50_000
+    records = [SAMPLE, copy.deepcopy(SAMPLE)]
+    records[1]["test"]["MT"] = 0.3
+    serial = list(simulate_many(CONFIG, records, samples=500, seed=9))
+    assert list(simulate_many(CONFIG, records, samples=500, seed=9, workers=2)) == serial
+    assert serial[1]["gate_probability"] < serial[0]["gate_probability"]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_histogram_percentiles_and_merge(use_numpy):
+    np = pytest.importorskip("numpy") if use_numpy else None
+    left, right = Histogram(0.0, 10.0, 1000, np=np), Histogram(0.0, 10.0, 1000, np=np)
+    left.add([i / 100.0 for i in range(500)])
+    right.add([5.0 + i / 100.0 for i in range(500)])
+    left.merge(right)
+    assert left.total == 1000
+    assert left.percentile(50) == pytest.approx(5.0, abs=0.02)
+    with pytest.raises(ValueError):
+        left.merge(Histogram(0.0, 1.0, 10))
+
+    reference = Histogram(0.0, 10.0, 1000)
+    reference.add([i / 100.0 for i in range(500)] + [5.0 + i / 100.0 for i in range(500)] + [3.33] * 7)
+    left.add([3.33] * 7)
+    qs = (0, 5, 50, 99.9, 100)
+    assert [left.percentile(q) for q in qs] == [reference.percentile(q) for q in qs]
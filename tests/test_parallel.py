@@ -0,0 +1,89 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import MetricsError, compile_config, load_config, score_function  # noqa: E402
+from score_function import parallel  # noqa: E402
+from score_function.parallel import score_many  # noqa: E402
+from score_function.stream import score_lines  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _records(count):
+    records = []
+    for i in range(count):
+        record = json.loads(json.dumps(SAMPLE))
+        record["code"]["SA"] = (i % 17) / 16
+        record["sec"]["critical_count"] = i % 5 == 0
+        record["uncertainty_sigma"] = (i % 7) / 6
+        records.append(record)
+    return records
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_many_preserves_order(workers):
+    records = _records(50)
+    results = list(score_many(CONFIG, records, workers=workers, chunksize=8))
+    assert results == [score_function(CONFIG, record) for record in records]
+
+
+def test_score_many_sends_packed_payloads(monkeypatch):
+    payloads = []
+
+    def spy(plan, payload):
+        payloads.append(payload)
+        return score_payload(plan, payload)
+
+    score_payload = parallel.score_payload
+    monkeypatch.setattr(parallel, "score_payload", spy)
+    records = _records(10)
+    assert list(score_many(CONFIG, records, chunksize=4)) == [score_function(CONFIG, r) for r in records]
+    assert [type(payload) for payload in payloads] == [bytes] * 3
+    assert payloads[0] == parallel.pack_records(records[:4])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_score_many_rejects_invalid_record(workers):
+    broken = json.loads(json.dumps(SAMPLE))
+    del broken["dep"]
+    with pytest.raises(MetricsError, match="dep"):
+        list(score_many(compile_config(CONFIG), [SAMPLE, broken], workers=workers, chunksize=1))
+
+
+def test_parallel_stream_matches_serial():
+    lines = [json.dumps(dict(record, id=i)) for i, record in enumerate(_records(30))]
+    lines.insert(5, "oops")
+    lines.insert(9, "")
+    lines.insert(12, json.dumps(SAMPLE).replace('"critical_count": 0', '"critical_count": 1e400'))
+    serial, parallel, raw = io.StringIO(), io.StringIO(), io.StringIO()
+    errors = []
+    assert score_lines(CONFIG, lines, serial, lambda *err: errors.append(err)) == (30, 2)
+    assert score_lines(CONFIG, lines, parallel, lambda *err: errors.append(err), workers=2, chunksize=4) == (30, 2)
+    encoded = [line.encode() + b"\n" for line in lines]
+    assert score_lines(CONFIG, encoded, raw, lambda *err: errors.append(err), workers=2, chunksize=7) == (30, 2)
+    assert serial.getvalue() == parallel.getvalue() == raw.getvalue()
+    assert [lineno for lineno, _ in errors] == [6, 13] * 3
+
+
+def test_parallel_stream_csv():
+    lines = [json.dumps(dict(record, id=i)) for i, record in enumerate(_records(10))]
+    serial, parallel = io.StringIO(), io.StringIO()
+    score_lines(CONFIG, lines, serial, print, fmt="csv")
+    score_lines(CONFIG, lines, parallel, print, workers=2, chunksize=3, fmt="csv")
+    assert serial.getvalue() == parallel.getvalue()
+
+
+def test_score_many_without_numpy(monkeypatch):
+    import score_function.batch as batch
+
+    monkeypatch.setattr(batch, "_numpy", lambda: None)
+    records = _records(20)
+    assert list(score_many(CONFIG, records, chunksize=6)) == [score_function(CONFIG, r) for r in records]
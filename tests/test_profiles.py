@@ -0,0 +1,77 @@
+import copy
+import io
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import score_function as score_function_module  # noqa: E402
+from score_function import FACE_ORDER, load_config, resolve_profiles, score_function, score_profiles  # noqa: E402
+from score_function.batch import columns_from_records, iter_profile_rows, score_profiles_batch  # noqa: E402
+from score_function.stream import score_lines  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _random_records(count, seed=11):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        record = copy.deepcopy(SAMPLE)
+        for face in FACE_ORDER:
+            for key in record[face]:
+                if key != "critical_count":
+                    record[face][key] = rng.uniform(-0.2, 1.2)
+        record["sec"]["critical_count"] = rng.choice([0, 0, 1])
+        record["uncertainty_sigma"] = rng.random()
+        records.append(record)
+    return records
+
+
+def _expected(record, profiles=("sre", "speed")):
+    expected = {"profiles": {}}
+    for name in profiles:
+        result = score_function({**CONFIG, "profile": name}, record)
+        expected["faces"] = result.pop("faces")
+        del result["profile"]
+        expected["profiles"][name] = result
+    return expected
+
+
+def test_score_profiles_matches_per_profile_runs(monkeypatch):
+    plan = score_function_module.compile_config(CONFIG)
+    assert score_profiles(plan, SAMPLE) == _expected(SAMPLE)
+    assert resolve_profiles(plan, "all") == resolve_profiles(CONFIG, "all")
+
+    def fail(config):
+        raise AssertionError("dict config compiled for a single record")
+
+    monkeypatch.setattr(score_function_module, "compile_config", fail)
+    assert score_profiles(CONFIG, SAMPLE) == _expected(SAMPLE)
+    assert score_profiles(CONFIG, SAMPLE, "speed") == _expected(SAMPLE, ("speed",))
+    assert resolve_profiles(CONFIG, None) == ("sre",)
+    assert resolve_profiles(CONFIG, "speed,all") == ("speed", "sre")
+    with pytest.raises(SystemExit, match="Unknown profile 'nope'"):
+        resolve_profiles(CONFIG, ["nope"])
+
+
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_profiles_batch_matches_reference(use_numpy):
+    records = _random_records(100)
+    batch = score_profiles_batch(CONFIG, columns_from_records(records, use_numpy=use_numpy), use_numpy=use_numpy)
+    assert list(batch["profiles"]) == ["sre", "speed"]
+    for row, record in zip(iter_profile_rows(batch), records):
+        assert row == _expected(record)
+
+
+def test_stream_profiles():
+    out = io.StringIO()
+    scored, failed = score_lines(CONFIG, [json.dumps(SAMPLE)], out, lambda *_: None, profiles=("sre", "speed"))
+    assert (scored, failed) == (1, 0)
+    assert json.loads(out.getvalue()) == _expected(SAMPLE)
@@ -0,0 +1,96 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import ConfigError, compile_config, load_config, main, score_profiles  # noqa: E402
+from score_function.bulk import convert  # noqa: E402
+from score_function.replay import Candidate, Corpus, load_candidates, replay  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _corpus(tmp_path, n=40):
+    path = tmp_path / "corpus.jsonl"
+    with path.open("w") as handle:
+        for i in range(n):
+            record = json.loads(json.dumps(SAMPLE))
+            record["test"]["MT"] = i / n
+            record["dep"]["CFR"] = (i % 7) / 7
+            record["sec"]["critical_count"] = int(i % 11 == 0)
+            record["uncertainty_sigma"] = (i % 5) / 10
+            handle.write(json.dumps(record) + "\n")
+    return path
+
+
+def _sweep(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    lines = [
+        {"name": "strict", "gate": {"min_geo": 85}},
+        {"name": "k10", "k_steep": 10},
+        {"name": "taus", "thresholds": {"dep": {"cfr_tau": 0.3}}},
+        {"name": "speed+k10", "k_steep": 10, "profile": "speed"},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_replay_matches_score_profiles(tmp_path, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    corpus_path = _corpus(tmp_path)
+    records = [json.loads(line) for line in corpus_path.read_text().splitlines()]
+    candidates = [Candidate("base", compile_config(CONFIG))] + load_candidates(CONFIG, [str(_sweep(tmp_path))])
+
+    corpus = Corpus(str(corpus_path), use_numpy=use_numpy)
+    report = replay(corpus, candidates, chunk_rows=16, examples=3)
+    rows = [report["baseline"], *report["candidates"]]
+    assert report["records"] == len(records)
+    assert [row["name"] for row in rows] == ["base", "strict", "k10", "taus", "speed+k10"]
+
+    expected = []
+    for candidate in candidates:
+        results = [score_profiles(candidate.plan.raw, record, candidate.profile)["profiles"][candidate.profile]
+                   for record in records]
+        expected.append(results)
+    base = [result["gate_ok"] for result in expected[0]]
+    for row, results in zip(rows, expected):
+        gates = [result["gate_ok"] for result in results]
+        assert row["passes"] == sum(gates)
+        assert abs(row["final"]["mean"] - sum(result["final"] for result in results) / len(results)) < 1e-3
+        if row is rows[0]:
+            continue
+        flips = [i for i, (a, b) in enumerate(zip(base, gates)) if a and not b]
+        assert row["flipped"]["pass_to_fail"] == len(flips)
+        assert row["flipped"]["examples"]["pass_to_fail"] == flips[:3]
+    assert rows[1]["flipped"]["pass_to_fail"] > 0 and rows[1]["flipped"]["fail_to_pass"] == 0
+    assert rows[4]["profile"] == "speed"
+    if use_numpy:
+        # More chunks than the 2 * workers in-flight window.
+        assert replay(corpus, candidates, chunk_rows=3, workers=2, examples=3) == replay(
+            corpus, candidates, chunk_rows=3, examples=3)
+
+
+def test_replay_cli_binary_corpus(tmp_path, capsys):
+    corpus = tmp_path / "corpus.sfm"
+    convert(str(_corpus(tmp_path)), str(corpus))
+    assert main(["replay", "score-function.yml", str(corpus), str(_sweep(tmp_path)), "--workers", "2"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["records"] == 40 and len(report["candidates"]) == 4
+    strict = report["candidates"][0]
+    assert strict["passes"] + strict["flipped"]["pass_to_fail"] == report["baseline"]["passes"]
+    assert strict["delta"]["max_abs"] == 0.0
+
+
+def test_replay_rejects_invalid_candidate(tmp_path):
+    sweep = tmp_path / "bad.jsonl"
+    sweep.write_text(json.dumps({"weights": {"spec": {"RC": 0.9}}}) + "\n")
+    with pytest.raises(ConfigError) as excinfo:
+        load_candidates(CONFIG, [str(sweep)])
+    assert f"{sweep}:1" in str(excinfo.value) and "weights sum to" in str(excinfo.value)
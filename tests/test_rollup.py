@@ -0,0 +1,93 @@
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import load_config, main, score_function, score_profiles  # noqa: E402
+from score_function.rollup import Rollup, Sketch  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+IDS = ["acme/payments/api", "acme/payments/worker", "acme/search/api", "globex/core/lib"]
+
+
+def _results(n=40):
+    results = []
+    for i in range(n):
+        record = json.loads(json.dumps(SAMPLE))
+        record["test"]["MT"] = (i % 10) / 10
+        results.append(dict(score_function(CONFIG, record), id=IDS[i % len(IDS)]))
+    return results
+
+
+def test_sketch_relative_accuracy_and_merge():
+    rng = random.Random(3)
+    values = [rng.uniform(0.0, 100.0) for _ in range(5000)] + [0.0] * 50
+    whole, left, right = Sketch(), Sketch(), Sketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+    assert left.to_dict() == whole.to_dict()
+    assert Sketch.from_dict(whole.to_dict()).quantile(0.5) == whole.quantile(0.5)
+    ordered = sorted(values)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(whole.quantile(q) - exact) <= 0.01 * exact + 1e-9
+    assert whole.quantile(0.001) == 0.0
+
+
+def test_rollup_groups_and_shard_merge():
+    results = _results()
+    rollup = Rollup().add_all(results)
+    rows = {row["group"]: row for row in rollup.report()}
+    assert list(rows) == ["*", "acme", "acme/payments", "acme/payments/api", "acme/payments/worker", "acme/search",
+                          "acme/search/api", "globex", "globex/core", "globex/core/lib"]
+    assert rows["*"]["count"] == 40 and rows["acme"]["count"] == 30 and rows["acme/payments"]["level"] == 2
+
+    finals = [result["final"] for result in results if result["id"].startswith("acme/payments/")]
+    summary = rows["acme/payments"]["fields"]["final"]
+    assert summary["mean"] == round(sum(finals) / len(finals), 4) and summary["min"] == min(finals)
+    assert summary["geomean"] == round(math.exp(sum(math.log(x) for x in finals) / len(finals)), 4)
+    assert rows["globex/core"]["gate_ok_rate"] == sum(r["gate_ok"] for r in results[3::4]) / 10
+
+    shards = [Rollup().add_all(results[i::3]) for i in range(3)]
+    merged = Rollup.from_dict(json.loads(json.dumps(shards[0].to_dict())))
+    for shard in shards[1:]:
+        merged.merge(Rollup.from_dict(shard.to_dict()))
+    assert list(merged.report()) == list(rollup.report())
+
+    shallow = {row["group"] for row in Rollup(depth=1).add_all(results).report()}
+    assert shallow == {"*", "acme", "globex"}
+
+
+def test_rollup_cli_partial_merge_and_gate(tmp_path, capsys):
+    results = _results()
+    for i in range(2):
+        path = tmp_path / f"shard-{i}.jsonl"
+        path.write_text("".join(json.dumps(result) + "\n" for result in results[i::2]))
+        assert main(["rollup", str(path), "--partial", "-o", str(tmp_path / f"part-{i}.json")]) == 0
+
+    assert main(["rollup", "--merge", str(tmp_path / "part-0.json"), str(tmp_path / "part-1.json"),
+                 "--config", "score-function.yml", "--quantiles", "50"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows[0]["group"] == "*" and rows[0]["count"] == 40
+    assert set(rows[0]["fields"]["geo"]) == {"count", "mean", "geomean", "min", "max", "p50"}
+    assert all(isinstance(row["gate_ok"], bool) for row in rows)
+
+    profiled = tmp_path / "profiles.jsonl"
+    profiled.write_text(json.dumps(dict(score_profiles(CONFIG, SAMPLE, "all"), id="a/b")) + "\n")
+    assert main(["rollup", str(profiled), "--profile", "speed"]) == 0
+    assert json.loads(capsys.readouterr().out.splitlines()[-1])["group"] == "a/b"
+
+    for profile in ("speed", "sre"):
+        assert main(["rollup", str(profiled), "--profile", profile, "--partial",
+                     "-o", str(tmp_path / f"{profile}.json")]) == 0
+    with pytest.raises(SystemExit, match="profile"):
+        main(["rollup", "--merge", str(tmp_path / "speed.json"), str(tmp_path / "sre.json")])
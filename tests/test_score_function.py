@@ -7,7 +7,7 @@ import pytest
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
 
-from score_function import score_function, load_config, load_json  # noqa: E402
+from score_function import compile_config, compute_faces, score_function, load_config, load_json  # noqa: E402
 
 CONFIG = load_config(Path("score-function.yml"))
 SAMPLE = load_json(Path("examples/metrics.sample.json"))
@@ -32,3 +32,18 @@ def test_penalty_floor_applied():
     result = score_function(CONFIG, low_metrics)
     assert result["faces"]["code"] < CONFIG["gate"]["min_each"]
     assert result["final"] < 80
+
+
+def test_compiled_config_matches_dict_config():
+    compiled = compile_config(CONFIG)
+    assert compute_faces(compiled, SAMPLE) == compute_faces(CONFIG, SAMPLE)
+    assert score_function(compiled, SAMPLE) == score_function(CONFIG, SAMPLE)
+    speed = compile_config(dict(CONFIG, profile="speed"))
+    assert score_function(speed, SAMPLE) == score_function(dict(CONFIG, profile="speed"), SAMPLE)
+
+
+def test_compile_config_reports_missing_key():
+    broken = json.loads(json.dumps(CONFIG))
+    del broken["weights"]["code"]["PF"]
+    with pytest.raises(SystemExit, match="weights.code.PF"):
+        compile_config(broken)
@@ -0,0 +1,74 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import compile_config, load_config, score_function  # noqa: E402
+from score_function.batch import columns_from_records  # noqa: E402
+from score_function.sensitivity import GRADIENT_COLUMNS, gradients, gradients_batch, solve_gate  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _nudged(metrics, name, h):
+    nudged = copy.deepcopy(metrics)
+    if name == "uncertainty_sigma":
+        nudged[name] = nudged.get(name, 0.0) + h
+    else:
+        face, metric = name.split(".", 1)
+        nudged[face][metric] += h
+    return nudged
+
+
+def test_gradients_match_finite_differences():
+    metrics = copy.deepcopy(SAMPLE)
+    metrics["code"]["SA"] = 1.3  # clipped: derivative must be zero
+    analysis = gradients(CONFIG, metrics)
+    reference = score_function(CONFIG, metrics)
+    assert round(analysis["final"], 4) == reference["final"]
+    assert analysis["d_final"]["code.SA"] == 0.0
+    h = 1e-6
+    for name in GRADIENT_COLUMNS:
+        up = gradients(CONFIG, _nudged(metrics, name, h))["final"]
+        down = gradients(CONFIG, _nudged(metrics, name, -h))["final"]
+        if name == "sec.SE":  # at 1.0: the derivative is the one from inside [0, 1]
+            up, h2 = analysis["final"], h
+        else:
+            h2 = 2 * h
+        assert analysis["d_final"][name] == pytest.approx((up - down) / h2, rel=1e-4, abs=1e-6)
+
+
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_gradients_batch_matches_single(use_numpy):
+    records = [SAMPLE, _nudged(SAMPLE, "test.CV", -0.4), _nudged(SAMPLE, "pr.risk", 0.3)]
+    batch = gradients_batch(CONFIG, columns_from_records(records, use_numpy=use_numpy), use_numpy=use_numpy)
+    for i, record in enumerate(records):
+        single = gradients(CONFIG, record)
+        assert float(batch["final"][i]) == pytest.approx(single["final"])
+        assert bool(batch["gate_ok"][i]) == single["gate_ok"]
+        for name in GRADIENT_COLUMNS:
+            assert float(batch["d_final"][name][i]) == pytest.approx(single["d_final"][name])
+
+
+def test_solve_gate_single_and_plan():
+    plan = compile_config(CONFIG)
+    failing = _nudged(SAMPLE, "test.MT", -0.3)
+    assert not score_function(plan, failing)["gate_ok"]
+    solution = solve_gate(plan, failing)
+    assert solution["single"][0]["metric"] == "test.MT"
+    fixed = copy.deepcopy(failing)
+    fixed["test"]["MT"] = solution["single"][0]["to"]
+    assert score_function(plan, fixed)["gate_ok"]
+    fixed = copy.deepcopy(failing)
+    for name, value in solution["plan"].items():
+        face, metric = name.split(".", 1)
+        fixed[face][metric] = value
+    assert score_function(plan, fixed)["gate_ok"]
+    assert solve_gate(plan, SAMPLE) == {"gate_ok": True, "single": [], "plan": {}}
+    assert solve_gate(plan, failing, allowed=["code.SA"])["plan"] is None
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import load_config, score_function  # noqa: E402
+from score_function.server import HTTPError, ScoringServer  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def _request(body: bytes, connection: str = "keep-alive") -> bytes:
+    return (
+        f"POST /score HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: {connection}\r\n\r\n"
+    ).encode() + body
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(next(line.split(b":")[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")))
+    return status, json.loads(await reader.readexactly(length))
+
+
+def test_keep_alive_and_pipelining():
+    server = ScoringServer(Path("score-function.yml"))
+
+    async def scenario():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        single = json.dumps(SAMPLE).encode()
+        batch = json.dumps([SAMPLE, SAMPLE]).encode()
+        writer.write(_request(single) + _request(b"{bad") + _request(batch, "close"))
+        await writer.drain()
+        responses = [await _read_response(reader) for _ in range(3)]
+        assert await reader.read() == b""
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+
+    (s1, r1), (s2, r2), (s3, r3) = asyncio.run(scenario())
+    expected = score_function(CONFIG, SAMPLE)
+    assert (s1, r1) == (200, expected)
+    assert s2 == 400 and "invalid JSON" in r2["error"]
+    assert (s3, r3) == (200, [expected, expected])
+
+
+def test_dispatch_errors_and_health():
+    server = ScoringServer(Path("score-function.yml"))
+    with pytest.raises(HTTPError) as info:
+        server.dispatch("POST", "/score", json.dumps({"spec": {}}).encode())
+    assert info.value.status == 400
+    with pytest.raises(HTTPError) as info:
+        server.dispatch("GET", "/nope", b"")
+    assert info.value.status == 404
+    overflow = json.dumps(SAMPLE).replace('"critical_count": 0', '"critical_count": 1e400').encode()
+    with pytest.raises(HTTPError) as info:
+        server.dispatch("POST", "/score", overflow)
+    assert info.value.status == 400
+    assert server.dispatch("GET", "/healthz", b"")[1]["profile"] == "sre"
+
+
+def test_unexpected_error_returns_500_and_keeps_connection(monkeypatch):
+    server = ScoringServer(Path("score-function.yml"))
+    dispatch = server.dispatch
+
+    def flaky(method, target, body):
+        if body == b"{}":
+            raise RuntimeError("boom")
+        return dispatch(method, target, body)
+
+    monkeypatch.setattr(server, "dispatch", flaky)
+
+    async def scenario():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(_request(b"{}") + _request(json.dumps(SAMPLE).encode(), "close"))
+        await writer.drain()
+        responses = [await _read_response(reader) for _ in range(2)]
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+
+    (s1, r1), (s2, r2) = asyncio.run(scenario())
+    assert (s1, r1) == (500, {"error": "internal error"})
+    assert (s2, r2) == (200, score_function(CONFIG, SAMPLE))
+
+
+def test_hot_reload(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(CONFIG))
+    server = ScoringServer(path)
+    assert server.reload_if_changed() is False
+    path.write_text(json.dumps(dict(CONFIG, profile="speed")))
+    os.utime(path, ns=(1, 1))
+    assert server.reload_if_changed() is True
+    assert server.plan.profile == "speed"
+    path.write_text("{broken")
+    os.utime(path, ns=(2, 2))
+    assert server.reload_if_changed() is False
+    assert server.plan.profile == "speed"
+
+
+def test_result_cache_serves_precomputed_json():
+    from score_function.cache import ScoreCache
+
+    server = ScoringServer(Path("score-function.yml"), result_cache=ScoreCache())
+    for _ in range(2):
+        status, body = server.dispatch("POST", "/score", json.dumps([SAMPLE, SAMPLE]).encode())
+        assert status == 200 and json.loads(body) == [score_function(CONFIG, SAMPLE)] * 2
+    assert server.dispatch("GET", "/healthz", b"")[1]["result_cache"]["hits"] == 3
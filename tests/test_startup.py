@@ -0,0 +1,51 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import load_config  # noqa: E402
+
+# Cumulative import time of the package for a plain CLI run, in microseconds.
+# Measured at ~10 ms; the budget leaves room for slow CI machines.
+IMPORT_BUDGET_US = 60_000
+
+# Modules the plain CLI path (config + metrics, no options) must not import.
+LAZY_MODULES = ("yaml", "argparse", "hashlib", "typing", "pathlib", "numpy", "sqlite3")
+
+
+def _imported(args):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "score_function", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def test_precompiled_cli_start_is_lean(tmp_path):
+    compiled = tmp_path / "score-function.json"
+    subprocess.run(
+        [sys.executable, "-m", "score_function", "compile", "score-function.yml", "-o", str(compiled)],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+    )
+    assert load_config(compiled) == load_config(Path("score-function.yml"))
+    timings = _imported([str(compiled), "examples/metrics.sample.json"])
+    assert timings["score_function"] < IMPORT_BUDGET_US
+    assert not [name for name in LAZY_MODULES if name in timings]
+
+
+def test_yaml_cli_start_skips_argparse(tmp_path):
+    timings = _imported(["score-function.yml", "examples/metrics.sample.json"])
+    assert "argparse" not in timings and "hashlib" not in timings
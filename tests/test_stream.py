@@ -0,0 +1,47 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from score_function import load_config, main, score_function  # noqa: E402
+from score_function.stream import score_lines  # noqa: E402
+
+CONFIG = load_config(Path("score-function.yml"))
+SAMPLE = json.loads(Path("examples/metrics.sample.json").read_text())
+
+
+def test_score_lines_reports_bad_lines_and_continues():
+    broken = json.loads(json.dumps(SAMPLE))
+    del broken["code"]["PF"]
+    overflow = json.dumps(SAMPLE).replace('"critical_count": 0', '"critical_count": 1e400')
+    lines = [
+        json.dumps(dict(SAMPLE, id="a")),
+        "{not json",
+        "",
+        json.dumps(broken),
+        overflow,
+        json.dumps(SAMPLE),
+    ]
+    out = io.StringIO()
+    errors = []
+    scored, failed = score_lines(CONFIG, lines, out, lambda lineno, message: errors.append((lineno, message)))
+    assert (scored, failed) == (2, 3)
+    assert [lineno for lineno, _ in errors] == [2, 4, 5]
+    assert "Missing metric 'PF'" in errors[1][1]
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert results[0]["id"] == "a"
+    assert results[1] == score_function(CONFIG, SAMPLE)
+
+
+def test_main_stream(tmp_path, capsys):
+    metrics = tmp_path / "metrics.jsonl"
+    metrics.write_text("\n".join(json.dumps(SAMPLE) for _ in range(3)) + "\n[]\n")
+    errors = tmp_path / "errors.jsonl"
+    assert main(["--stream", "--errors", str(errors), "score-function.yml", str(metrics)]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0])["final"] == score_function(CONFIG, SAMPLE)["final"]
+    assert json.loads(errors.read_text())["line"] == 4
@@ -3,11 +3,43 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import glob
+import hashlib
 import json
+import os
+import re
+import struct
 import sys
+import threading
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Reports at least this large are streamed instead of parsed in one go.
+DEFAULT_STREAM_THRESHOLD = 32 * 1024 * 1024
+
+# Array-shaped reports that can be streamed: name -> top-level key of the array
+# (None when the document itself is the array).
+STREAMABLE_REPORTS = {"eslint": None, "syft": "matches", "semgrep": "results"}
+
+# Bump when a summarize_* function changes so cached summaries are recomputed.
+SUMMARY_CACHE_VERSION = 1
+
+# Output formats; ``binary`` is the metrics file layout documented in
+# score_function/formats.py (magic SFM1), kept in sync by hand so this script
+# stays standalone.
+OUTPUT_FORMATS = ("json", "jsonl", "csv", "binary")
+_BINARY_HEADER = struct.Struct("<4sHHII")
+_BINARY_NAME_SIZE = 32
+
+_READ_CHUNK = 1 << 20
+# Characters buffered while waiting for one streamed value to complete; a
+# longer element (or malformed input) is reported instead of read to EOF.
+_MAX_LOOKAHEAD = 64 << 20
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'["\\]')
 
 
 def clip(value: float) -> float:
@@ -35,13 +67,67 @@ def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
     parser.add_argument("--pr", help="Optional PR operations metrics JSON override")
     parser.add_argument("--dep", help="Optional deploy metrics JSON override")
     parser.add_argument("--strict", action="store_true", help="Fail if a required report is missing")
-    return parser.parse_args(list(argv) if argv is not None else None)
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=DEFAULT_STREAM_THRESHOLD,
+        help="Stream ESLint/Syft/Semgrep reports of at least this many bytes (default: 32 MiB)",
+    )
+    parser.add_argument("--jobs", type=int, default=0, help="Threads used to load reports (default: one per report)")
+    parser.add_argument("--cache-dir", help="Reuse report summaries cached here while the reports are unchanged")
+    parser.add_argument("--verbose", action="store_true", help="Report per-report cache hits/misses on stderr")
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        help="Output format: json (default), jsonl (default with --reports-glob/--manifest), "
+        "csv (flat face.key columns) or binary (float64 records)",
+    )
+    fleet = parser.add_argument_group("fleet mode (one metrics record per report directory)")
+    fleet.add_argument(
+        "--reports-glob",
+        action="append",
+        help="Collect every directory matching this glob, e.g. 'packages/*/reports' (repeatable)",
+    )
+    fleet.add_argument("--manifest", help="Collect the report directories listed in this file ('-' = stdin)")
+    fleet.add_argument("--workers", type=int, default=0, help="Processes collecting directories (default: CPU count)")
+    fleet.add_argument("--errors", help="Write per-directory failures here as JSONL (default: stderr)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    if args.reports_glob or args.manifest:
+        overrides = [name for name in REPORT_FILES if getattr(args, name)]
+        overrides += [name for name in ("spec", "pr", "dep") if getattr(args, name)]
+        if overrides:
+            parser.error(f"--{overrides[0]} names a single report; it cannot be used with --reports-glob/--manifest")
+    return args
 
 
 def resolve(base: Path, override: Optional[str], default_name: str) -> Path:
     return Path(override) if override else (base / default_name)
 
 
+# Summarized reports: name -> (default file name in the reports directory, label).
+REPORT_FILES = {
+    "eslint": ("eslint.json", "ESLint"),
+    "jest": ("coverage-summary.json", "Jest"),
+    "pytest": ("pytest-report.json", "pytest"),
+    "stryker": ("stryker-report.json", "Stryker"),
+    "semgrep": ("semgrep.json", "Semgrep"),
+    "syft": ("syft.json", "Syft"),
+}
+
+
+def report_sources(base: Path, *, required: bool, overrides: Optional[Dict[str, Optional[str]]] = None
+                   ) -> Dict[str, Any]:
+    """``load_reports`` sources for a reports directory, with optional per-report paths."""
+    overrides = overrides or {}
+    sources: Dict[str, Any] = {
+        name: (resolve(base, overrides.get(name), filename), label, required)
+        for name, (filename, label) in REPORT_FILES.items()
+    }
+    for name, label in (("spec", "Spec"), ("pr", "PR"), ("dep", "Deploy")):
+        sources[name] = (Path(overrides[name]), label, False) if overrides.get(name) else None
+    return sources
+
+
 def load_json(path: Path, *, label: str, required: bool) -> Optional[Any]:
     try:
         return json.loads(path.read_text())
@@ -54,15 +140,193 @@ def load_json(path: Path, *, label: str, required: bool) -> Optional[Any]:
         raise SystemExit(f"Invalid JSON in {path}: {exc}") from exc
 
 
+class _JSONStream:
+    """Incremental reader over a JSON text file, one buffer chunk at a time."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.handle = path.open(encoding="utf-8")
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def close(self) -> None:
+        self.handle.close()
+
+    def error(self, message: str) -> SystemExit:
+        return SystemExit(f"Invalid JSON in {self.path}: {message}")
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.handle.read(_READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise self.error("unexpected end of document")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self.error(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                if len(self.buf) - self.pos > _MAX_LOOKAHEAD:
+                    raise self.error(f"no complete value within {_MAX_LOOKAHEAD} characters ({exc})") from exc
+                if self.fill():
+                    continue
+                raise self.error(str(exc)) from exc
+            if end == len(self.buf) and self.fill():
+                continue  # a number may continue in the next chunk
+            self.pos = end
+            return value
+
+    def skip(self) -> None:
+        """Skip the next JSON value without materialising it."""
+        if self.peek() not in "[{":
+            self.value()
+            return
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise self.error("unexpected end of document")
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if char == '"':
+                self._skip_string()
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _skip_string(self) -> None:
+        while True:
+            match = _STRING_END.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)  # nothing to keep: the string continues in the next chunk
+            if match is None or (match.group() == "\\" and match.end() >= len(self.buf)):
+                if not self.fill():
+                    raise self.error("unterminated string")
+                continue
+            if match.group() == "\\":
+                self.pos = match.end() + 1
+                continue
+            self.pos = match.end()
+            return
+
+    def items(self) -> Iterator[Any]:
+        """Yield the elements of the array starting at the current position."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise self.error(f"expected ',' or ']' at offset {self.pos - 1}")
+
+
+def iter_json_array(path: Path, key: Optional[str] = None) -> Iterator[Any]:
+    """Stream the elements of a JSON array without loading the whole document.
+
+    With ``key`` the document must be an object and the array is read from that
+    top-level key (other keys are skipped); a missing or non-array value yields
+    nothing.
+    """
+    stream = _JSONStream(path)
+    try:
+        if key is None:
+            if stream.peek() == "[":
+                yield from stream.items()
+            return
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            name = stream.value()
+            stream.expect(":")
+            if name == key:
+                if stream.peek() == "[":
+                    yield from stream.items()
+                return
+            stream.skip()
+            char = stream.peek()
+            stream.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise stream.error(f"expected ',' or '}}' at offset {stream.pos - 1}")
+    finally:
+        stream.close()
+
+
+class StreamedReport:
+    """Placeholder for a large array-shaped report that is read lazily."""
+
+    def __init__(self, path: Path, key: Optional[str]) -> None:
+        self.path = path
+        self.key = key
+
+    def items(self) -> Iterator[Any]:
+        return iter_json_array(self.path, self.key)
+
+
+def load_report(path: Path, *, label: str, required: bool, stream_key: Optional[str] = None,
+                stream: bool = False, threshold: int = DEFAULT_STREAM_THRESHOLD) -> Optional[Any]:
+    """Load a report, returning a :class:`StreamedReport` for large streamable ones."""
+    if stream:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = -1
+        if size >= threshold:
+            return StreamedReport(path, stream_key)
+    return load_json(path, label=label, required=required)
+
+
 def summarize_eslint(report: Optional[Any]) -> Dict[str, float]:
     summary = {"files": 0.0, "errors": 0.0, "warnings": 0.0, "complexity": 0.0}
-    if not isinstance(report, list):
+    if isinstance(report, StreamedReport):
+        items: Iterable[Any] = report.items()
+    elif isinstance(report, list):
+        items = report
+    else:
         return summary
-    files = len(report)
+    files = 0
     errors = 0
     warnings = 0
     complexity_hits = 0
-    for item in report:
+    for item in items:
+        files += 1
         if not isinstance(item, dict):
             continue
         errors += int(item.get("errorCount", 0) + item.get("fatalErrorCount", 0))
@@ -138,9 +402,9 @@ def summarize_stryker(report: Optional[Any]) -> Dict[str, float]:
 def summarize_semgrep(report: Optional[Any]) -> Dict[str, float]:
     counts = Counter()
     total = 0
-    if isinstance(report, dict):
-        results = report.get("results")
-        if isinstance(results, list):
+    if isinstance(report, (dict, StreamedReport)):
+        results = report.items() if isinstance(report, StreamedReport) else report.get("results")
+        if isinstance(report, StreamedReport) or isinstance(results, list):
             for item in results:
                 if not isinstance(item, dict):
                     continue
@@ -166,13 +430,14 @@ def summarize_semgrep(report: Optional[Any]) -> Dict[str, float]:
 
 
 def summarize_syft(report: Optional[Any]) -> Dict[str, float]:
-    if not isinstance(report, dict):
+    if not isinstance(report, (dict, StreamedReport)):
         return {"vulns": 0.0, "critical": 0.0, "avg_cvss": 0.0, "confirmed": 0.0}
-    matches = report.get("matches")
-    if not isinstance(matches, list):
+    matches = report.items() if isinstance(report, StreamedReport) else report.get("matches")
+    if not isinstance(report, StreamedReport) and not isinstance(matches, list):
         return {"vulns": 0.0, "critical": 0.0, "avg_cvss": 0.0, "confirmed": 0.0}
     severities = Counter()
-    cvss_scores = []
+    cvss_total = 0.0
+    cvss_count = 0
     confirmed = 0
     for match in matches:
         if not isinstance(match, dict):
@@ -189,13 +454,14 @@ def summarize_syft(report: Optional[Any]) -> Dict[str, float]:
                         for metric in metrics:
                             score = metric.get("score") if isinstance(metric, dict) else None
                             if isinstance(score, (int, float)):
-                                cvss_scores.append(float(score))
+                                cvss_total += float(score)
+                                cvss_count += 1
         severity = str(severity or match.get("severity", "info")).lower()
         severities[severity] += 1
         status = str(match.get("status", "")).lower()
         if status in {"affected", "vulnerable"}:
             confirmed += 1
-    avg_cvss = (sum(cvss_scores) / len(cvss_scores)) if cvss_scores else 0.0
+    avg_cvss = (cvss_total / cvss_count) if cvss_count else 0.0
     return {
         "vulns": float(sum(severities.values())),
         "critical": float(severities.get("critical", 0)),
@@ -204,6 +470,118 @@ def summarize_syft(report: Optional[Any]) -> Dict[str, float]:
     }
 
 
+SUMMARIZERS = {
+    "eslint": summarize_eslint,
+    "jest": summarize_jest,
+    "pytest": summarize_pytest,
+    "stryker": summarize_stryker,
+    "semgrep": summarize_semgrep,
+    "syft": summarize_syft,
+}
+
+
+class CachedSummary:
+    """A report already reduced to its ``summarize_*`` output (e.g. from :class:`SummaryCache`)."""
+
+    def __init__(self, summary: Dict[str, float]) -> None:
+        self.summary = summary
+
+
+def summarize(name: str, report: Optional[Any]) -> Dict[str, float]:
+    if isinstance(report, CachedSummary):
+        return report.summary
+    return SUMMARIZERS[name](report)
+
+
+class SummaryCache:
+    """On-disk cache of report summaries, one JSON entry per report name and path.
+
+    An entry is reused while the report's size and mtime are unchanged, without
+    reading the report. If only the mtime changed (e.g. a fresh checkout), the
+    content hash decides. Anything else is re-parsed and re-summarized.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.stats: Counter = Counter()
+        self.events: List[Tuple[str, str, Path]] = []
+        self._lock = threading.Lock()
+
+    def _entry(self, name: str, path: Path) -> Path:
+        digest = hashlib.blake2b(f"{name}:{path.resolve()}".encode("utf-8"), digest_size=16).hexdigest()
+        return self.directory / f"{name}-{digest}.json"
+
+    def _record(self, event: str, name: str, path: Path) -> None:
+        with self._lock:
+            self.stats[event] += 1
+            self.events.append((event, name, path))
+
+    def summarize(self, name: str, path: Path, load: Any) -> Any:
+        """Summary of the report at ``path``; ``load()`` is only called on a miss."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return load()  # missing report: load() warns or fails as usual
+        entry_path = self._entry(name, path)
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        if not _valid_entry(entry):
+            entry = None  # truncated or foreign file: best effort, so treat it as a miss
+        if entry is not None and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            self._record("hit", name, path)
+            return CachedSummary(entry["summary"])
+        digest = _file_digest(path)
+        if entry is not None and (entry["size"], entry["digest"]) == (stat.st_size, digest):
+            self._record("rehash_hit", name, path)
+            summary = entry["summary"]
+        else:
+            self._record("miss", name, path)
+            summary = SUMMARIZERS[name](load())
+        entry = {
+            "version": SUMMARY_CACHE_VERSION,
+            "path": str(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest,
+            "summary": summary,
+        }
+        tmp = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(json.dumps(entry), encoding="utf-8")
+            os.replace(tmp, entry_path)
+        except OSError as exc:
+            warn(f"could not write summary cache entry {entry_path}: {exc}")
+        return CachedSummary(summary)
+
+    def report(self) -> None:
+        for event, name, path in self.events:
+            warn(f"cache {event.replace('_', ' ')}: {name} ({path})")
+        warn(
+            f"summary cache: {self.stats['hit']} hits, {self.stats['rehash_hit']} hits after rehash, "
+            f"{self.stats['miss']} misses"
+        )
+
+
+def _valid_entry(entry: Any) -> bool:
+    return (
+        isinstance(entry, dict)
+        and entry.get("version") == SUMMARY_CACHE_VERSION
+        and all(key in entry for key in ("size", "mtime_ns", "digest"))
+        and isinstance(entry.get("summary"), dict)
+    )
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def build_spec(raw: Optional[Any]) -> Dict[str, float]:
     default = {"RC": 0.8, "TR": 0.75, "AM": 0.2, "CN": 0.15, "EX": 0.8}
     if not isinstance(raw, dict):
@@ -252,12 +630,12 @@ def build_dep(eslint: Dict[str, float], pytest: Dict[str, float], jest: Dict[str
 
 
 def build_metrics(reports: Dict[str, Any]) -> Dict[str, Any]:
-    eslint = summarize_eslint(reports.get("eslint"))
-    jest = summarize_jest(reports.get("jest"))
-    pytest = summarize_pytest(reports.get("pytest"))
-    syft = summarize_syft(reports.get("syft"))
-    semgrep = summarize_semgrep(reports.get("semgrep"))
-    stryker = summarize_stryker(reports.get("stryker"))
+    eslint = summarize("eslint", reports.get("eslint"))
+    jest = summarize("jest", reports.get("jest"))
+    pytest = summarize("pytest", reports.get("pytest"))
+    syft = summarize("syft", reports.get("syft"))
+    semgrep = summarize("semgrep", reports.get("semgrep"))
+    stryker = summarize("stryker", reports.get("stryker"))
 
     lint_denominator = max(1.0, eslint["files"] * 5.0)
     code_sa = clip(1.0 - (eslint["errors"] / lint_denominator))
@@ -311,26 +689,213 @@ def build_metrics(reports: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def load_reports(sources: Dict[str, Any], *, threshold: int = DEFAULT_STREAM_THRESHOLD,
+                 jobs: int = 0, cache: Optional[SummaryCache] = None) -> Dict[str, Any]:
+    """Load independent reports concurrently on a thread pool.
+
+    ``sources`` maps report names to ``(path, label, required)`` or ``None``.
+    Large ESLint/Syft/Semgrep reports are streamed and summarized inside their
+    pool task, so they come back as :class:`CachedSummary` like cached ones.
+    """
+    pending = {name: source for name, source in sources.items() if source is not None}
+    reports: Dict[str, Any] = {name: None for name in sources}
+    if not pending:
+        return reports
+
+    def load(name: str) -> Optional[Any]:
+        path, label, required = pending[name]
+
+        def read() -> Optional[Any]:
+            return load_report(path, label=label, required=required, stream_key=STREAMABLE_REPORTS.get(name),
+                               stream=name in STREAMABLE_REPORTS, threshold=threshold)
+
+        if cache is not None and name in SUMMARIZERS:
+            return cache.summarize(name, path, read)
+        report = read()
+        if isinstance(report, StreamedReport):
+            return CachedSummary(SUMMARIZERS[name](report))
+        return report
+
+    with ThreadPoolExecutor(max_workers=jobs if jobs > 0 else len(pending)) as pool:
+        futures = {name: pool.submit(load, name) for name in pending}
+        for name, future in futures.items():
+            reports[name] = future.result()
+    return reports
+
+
+def flatten_metrics(metrics: Dict[str, Any]) -> Dict[str, float]:
+    """``{"face.key": value}`` in output order, with ``uncertainty_sigma`` unprefixed.
+
+    A fleet-mode ``path`` tag is not a metric and is left out.
+    """
+    flat: Dict[str, float] = {}
+    for face, values in metrics.items():
+        if face == "path":
+            continue
+        if isinstance(values, dict):
+            flat.update((f"{face}.{key}", float(value)) for key, value in values.items())
+        else:
+            flat[face] = float(values)
+    return flat
+
+
+def write_metrics(records: Iterable[Dict[str, Any]], fmt: str, out: Any) -> int:
+    """Write metric dicts to ``out`` (a byte stream for ``binary``); returns the record count.
+
+    ``json`` always writes an array; ``jsonl`` writes and flushes each record
+    as it arrives; ``csv`` adds a leading ``path`` column for tagged records;
+    ``binary`` drops the tags.
+    """
+    count = 0
+    if fmt == "json":
+        items = list(records)
+        json.dump(items, out, indent=2)
+        out.write("\n")
+        return len(items)
+    if fmt == "jsonl":
+        for record in records:
+            out.write(json.dumps(record, separators=(",", ":")))
+            out.write("\n")
+            out.flush()
+            count += 1
+        return count
+    writer: Any = None
+    columns: List[str] = []
+    for record in records:
+        flat = flatten_metrics(record)
+        tag = [record["path"]] if fmt == "csv" and "path" in record else []
+        if writer is None:
+            columns = list(flat)
+            if fmt == "csv":
+                writer = csv.writer(out, lineterminator="\n")
+                writer.writerow(["path", *columns] if tag else columns)
+            else:
+                out.write(_binary_header(columns))
+                writer = struct.Struct(f"<{len(columns)}d")
+        if list(flat) != columns:
+            raise SystemExit(f"Inconsistent metric columns in record {count + 1}")
+        if fmt == "csv":
+            writer.writerow([*tag, *flat.values()])
+        else:
+            out.write(writer.pack(*flat.values()))
+        count += 1
+    out.flush()
+    return count
+
+
+def _binary_header(columns: List[str]) -> bytes:
+    encoded = [name.encode("utf-8") for name in columns]
+    for name, raw in zip(columns, encoded):
+        if len(raw) >= _BINARY_NAME_SIZE:
+            raise SystemExit(f"Metric name too long for the binary format: {name!r}")
+    names = b"".join(raw.ljust(_BINARY_NAME_SIZE, b"\0") for raw in encoded)
+    offset = _BINARY_HEADER.size + len(names)
+    offset += -offset % 8
+    header = _BINARY_HEADER.pack(b"SFM1", 1, 8 * len(columns), len(columns), offset) + names
+    return header.ljust(offset, b"\0")
+
+
+def collect_directory(directory: str, options: Dict[str, Any]
+                      ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Counter]:
+    """Fleet-mode worker: ``(metrics tagged with path, None, cache stats)`` or ``(None, error, stats)``."""
+    cache = SummaryCache(Path(options["cache_dir"])) if options.get("cache_dir") else None
+    try:
+        sources = report_sources(Path(directory), required=options["strict"])
+        reports = load_reports(sources, threshold=options["threshold"], jobs=options["jobs"], cache=cache)
+        metrics = build_metrics(reports)
+    except SystemExit as exc:
+        return None, str(exc.code), cache.stats if cache else Counter()
+    except Exception as exc:  # noqa: BLE001 - one bad directory must not stop the fleet
+        return None, f"{exc.__class__.__name__}: {exc}", cache.stats if cache else Counter()
+    return {"path": directory, **metrics}, None, cache.stats if cache else Counter()
+
+
+def discover_directories(patterns: Iterable[str], manifest: Optional[str]) -> List[str]:
+    """Report directories from glob patterns and/or a manifest, in order and without duplicates."""
+    found: List[str] = []
+    for pattern in patterns:
+        found.extend(sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isdir(path)))
+    if manifest:
+        lines = sys.stdin.readlines() if manifest == "-" else Path(manifest).read_text(encoding="utf-8").splitlines()
+        found.extend(line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#"))
+    return list(dict.fromkeys(found))
+
+
+def collect_fleet(directories: List[str], options: Dict[str, Any], *, workers: int = 0
+                  ) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str], Counter]]:
+    """Yield ``(directory, metrics, error, cache stats)`` per directory, in input order."""
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    if workers == 1 or len(directories) <= 1:
+        for directory in directories:
+            yield (directory, *collect_directory(directory, options))
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(directories))) as pool:
+        results = pool.map(collect_directory, directories, [options] * len(directories), chunksize=4)
+        for directory, result in zip(directories, results):
+            yield (directory, *result)
+
+
+def run_fleet(args: argparse.Namespace) -> int:
+    directories = discover_directories(args.reports_glob or [], args.manifest)
+    if not directories:
+        raise SystemExit("No report directories matched")
+    options = {
+        "strict": args.strict,
+        "threshold": args.stream_threshold,
+        "jobs": args.jobs or 1,
+        "cache_dir": args.cache_dir,
+    }
+    fmt = args.format or "jsonl"
+    errors = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    failed = 0
+    totals: Counter = Counter()
+
+    def records() -> Iterator[Dict[str, Any]]:
+        nonlocal failed
+        for directory, metrics, error, stats in collect_fleet(directories, options, workers=args.workers):
+            totals.update(stats)
+            if metrics is None:
+                failed += 1
+                errors.write(json.dumps({"path": directory, "error": error}) + "\n")
+                errors.flush()
+                continue
+            yield metrics
+
+    try:
+        written = write_metrics(records(), fmt, sys.stdout.buffer if fmt == "binary" else sys.stdout)
+    finally:
+        if errors is not sys.stderr:
+            errors.close()
+    if args.verbose:
+        warn(f"collected {written} of {len(directories)} directories ({failed} failed)")
+        if args.cache_dir:
+            warn(
+                f"summary cache: {totals['hit']} hits, {totals['rehash_hit']} hits after rehash, "
+                f"{totals['miss']} misses"
+            )
+    return 1 if failed else 0
+
+
 def main(argv: Iterable[str] | None = None) -> int:
     args = parse_args(argv)
-    base = Path(args.reports_dir)
-    required = args.strict
-
-    reports = {
-        "eslint": load_json(resolve(base, args.eslint, "eslint.json"), label="ESLint", required=required),
-        "jest": load_json(resolve(base, args.jest, "coverage-summary.json"), label="Jest", required=required),
-        "pytest": load_json(resolve(base, args.pytest, "pytest-report.json"), label="pytest", required=required),
-        "stryker": load_json(resolve(base, args.stryker, "stryker-report.json"), label="Stryker", required=required),
-        "semgrep": load_json(resolve(base, args.semgrep, "semgrep.json"), label="Semgrep", required=required),
-        "syft": load_json(resolve(base, args.syft, "syft.json"), label="Syft", required=required),
-        "spec": load_json(Path(args.spec), label="Spec", required=False) if args.spec else None,
-        "pr": load_json(Path(args.pr), label="PR", required=False) if args.pr else None,
-        "dep": load_json(Path(args.dep), label="Deploy", required=False) if args.dep else None,
-    }
+    if args.reports_glob or args.manifest:
+        return run_fleet(args)
+
+    overrides = {name: getattr(args, name) for name in (*REPORT_FILES, "spec", "pr", "dep")}
+    sources = report_sources(Path(args.reports_dir), required=args.strict, overrides=overrides)
+    cache = SummaryCache(Path(args.cache_dir)) if args.cache_dir else None
+    reports = load_reports(sources, threshold=args.stream_threshold, jobs=args.jobs, cache=cache)
+    if cache is not None and args.verbose:
+        cache.report()
 
     metrics = build_metrics(reports)
-    json.dump(metrics, sys.stdout, indent=2)
-    sys.stdout.write("\n")
+    fmt = args.format or "json"
+    if fmt == "json":
+        # A single reports directory keeps its metrics.json shape: one object.
+        json.dump(metrics, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        write_metrics([metrics], fmt, sys.stdout.buffer if fmt == "binary" else sys.stdout)
     return 0
 
 
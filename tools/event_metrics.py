@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""Rolling-window PR and deploy metrics from an event stream.
+
+    python tools/event_metrics.py events.jsonl --window 30d > pr-dep.json
+    python tools/event_metrics.py events.jsonl --pr-out pr.json --dep-out dep.json
+    python tools/collect_metrics.py --pr pr.json --dep dep.json > metrics.json
+    tail -F events.jsonl | python tools/event_metrics.py - --emit-every 1h   # one JSONL snapshot per hour
+
+Each input line is one event, ``{"type": ..., "ts": ISO 8601 or Unix seconds, ...}``:
+
+    pr_merged    reviewed (bool), risk (0-1, optional)
+    pr_reverted
+    ci           ok (bool)
+    deploy       ok (bool), perf_regression (bool, optional)
+    rollback
+    incident     restore_minutes, downtime_minutes (default: restore_minutes)
+
+Counters live in a ring of ``--buckets`` time buckets spanning ``--window``;
+each event updates one bucket and the running window totals, and buckets are
+expired as time moves on, so work per event is O(1) (amortized) and a snapshot
+only reads the totals. Events older than the window are dropped.
+
+Metrics without events in the window are left out, so ``collect_metrics.py
+--pr/--dep`` keeps its own value for them:
+
+    pr.RR    reviewed / merged             dep.SR   successful deploys / deploys
+    pr.risk  mean risk of merged PRs       dep.CFR  incidents / deploys
+    pr.DV    merged / --target-merges      dep.MT   mean restore time / --restore-scale
+    pr.RB    reverted / merged             dep.RBK  rollbacks / deploys
+    pr.CI    passing CI runs / CI runs     dep.PRG  deploys with a perf regression / deploys
+                                           dep.EB   downtime / error budget of --slo over the window
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+DEFAULT_WINDOW = 30 * 86400.0
+DEFAULT_BUCKETS = 30
+DEFAULT_TARGET_MERGES = 50.0
+DEFAULT_RESTORE_SCALE = 24 * 60.0
+DEFAULT_SLO = 0.999
+
+# Key order of build_pr()/build_dep() in collect_metrics.py.
+PR_KEYS = ("RR", "risk", "DV", "RB", "CI")
+DEP_KEYS = ("SR", "CFR", "MT", "RBK", "PRG", "EB")
+
+# Window counters, in ring-buffer column order.
+COUNTERS = (
+    "merged", "reviewed", "risk_sum", "risk_count", "reverted", "ci_runs", "ci_ok",
+    "deploys", "deploys_ok", "perf_regressions", "rollbacks", "incidents",
+    "restore_sum", "restore_count", "downtime",
+)
+_INDEX = {name: i for i, name in enumerate(COUNTERS)}
+
+_DURATION = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([smhdw]?)\s*$")
+_UNITS = {"": 1.0, "s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0, "w": 7 * 86400.0}
+
+
+def clip(value: float) -> float:
+    return max(0.0, min(1.0, value))
+
+
+def ratio(part: float, whole: float) -> float:
+    return 0.0 if whole <= 0 else part / whole
+
+
+def warn(message: str) -> None:
+    print(f"[event-metrics] {message}", file=sys.stderr)
+
+
+def parse_duration(value: str) -> float:
+    """Seconds from ``"30d"``, ``"12h"``, ``"15m"``, ``"90s"`` or a plain number."""
+    match = _DURATION.match(value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration: {value!r}")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def parse_timestamp(value: Any) -> float:
+    """Unix seconds from a number or an ISO 8601 string (UTC if naive)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _finite_timestamp(float(value), value)
+    if not isinstance(value, str):
+        raise ValueError(f"invalid timestamp: {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        pass
+    else:
+        return _finite_timestamp(number, value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _finite_timestamp(ts: float, value: Any) -> float:
+    if not math.isfinite(ts):
+        raise ValueError(f"invalid timestamp: {value!r}")
+    return ts
+
+
+def _number(event: Dict[str, Any], key: str, default: float) -> float:
+    """A finite numeric field of ``event``; ValueError for anything else (e.g. null)."""
+    value = event.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"invalid {key}: {value!r}")
+    return float(value)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class RollingWindow:
+    """Sums of :data:`COUNTERS` over the last ``window`` seconds, in ``buckets`` time buckets.
+
+    The window ends at the newest event seen (or the time passed to
+    :meth:`advance`); resolution is one bucket, i.e. ``window / buckets``.
+    """
+
+    def __init__(self, window: float = DEFAULT_WINDOW, buckets: int = DEFAULT_BUCKETS) -> None:
+        if window <= 0 or buckets < 1:
+            raise ValueError("window must be positive and buckets at least 1")
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.ring: List[List[float]] = [[0.0] * len(COUNTERS) for _ in range(buckets)]
+        self.totals = [0.0] * len(COUNTERS)
+        self.head: Optional[int] = None  # bucket number of the newest bucket
+        self.dropped = 0
+
+    def advance(self, ts: float) -> None:
+        """Move the window end to ``ts``, expiring buckets that fall out of it."""
+        bucket = int(ts // self.width)
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        # Each bucket is cleared at most once per pass over the ring.
+        for number in range(max(self.head + 1, bucket - self.buckets + 1), bucket + 1):
+            slot = self.ring[number % self.buckets]
+            for i, value in enumerate(slot):
+                if value:
+                    self.totals[i] -= value
+                    slot[i] = 0.0
+        self.head = bucket
+
+    def add(self, ts: float, counts: Dict[str, float]) -> bool:
+        """Add ``counts`` at time ``ts``; returns False if ``ts`` is already outside the window."""
+        self.advance(ts)
+        bucket = int(ts // self.width)
+        assert self.head is not None
+        if bucket <= self.head - self.buckets:
+            self.dropped += 1
+            return False
+        slot = self.ring[bucket % self.buckets]
+        for name, value in counts.items():
+            i = _INDEX[name]
+            slot[i] += value
+            self.totals[i] += value
+        return True
+
+    def total(self, name: str) -> float:
+        return self.totals[_INDEX[name]]
+
+
+def event_counts(event: Dict[str, Any]) -> Dict[str, float]:
+    """Counter increments for one event (empty for unknown types).
+
+    Raises ValueError when a numeric field is not a finite number.
+    """
+    kind = event.get("type")
+    if kind == "pr_merged":
+        counts = {"merged": 1.0, "reviewed": 1.0 if event.get("reviewed") else 0.0}
+        if event.get("risk") is not None:
+            counts.update(risk_sum=clip(_number(event, "risk", 0.0)), risk_count=1.0)
+        return counts
+    if kind == "pr_reverted":
+        return {"reverted": 1.0}
+    if kind == "ci":
+        return {"ci_runs": 1.0, "ci_ok": 1.0 if event.get("ok") else 0.0}
+    if kind == "deploy":
+        return {
+            "deploys": 1.0,
+            "deploys_ok": 1.0 if event.get("ok", True) else 0.0,
+            "perf_regressions": 1.0 if event.get("perf_regression") else 0.0,
+        }
+    if kind == "rollback":
+        return {"rollbacks": 1.0}
+    if kind == "incident":
+        restore = _number(event, "restore_minutes", 0.0)
+        return {
+            "incidents": 1.0,
+            "restore_sum": restore,
+            "restore_count": 1.0 if "restore_minutes" in event else 0.0,
+            "downtime": _number(event, "downtime_minutes", restore),
+        }
+    return {}
+
+
+class EventAggregator:
+    """Consume PR/deploy events and produce ``pr``/``dep`` metric dicts on demand."""
+
+    def __init__(
+        self,
+        window: float = DEFAULT_WINDOW,
+        buckets: int = DEFAULT_BUCKETS,
+        *,
+        target_merges: float = DEFAULT_TARGET_MERGES,
+        restore_scale: float = DEFAULT_RESTORE_SCALE,
+        slo: float = DEFAULT_SLO,
+    ) -> None:
+        self.counters = RollingWindow(window, buckets)
+        self.target_merges = target_merges
+        self.restore_scale = restore_scale
+        self.slo = slo
+        self.events = 0
+        self.ignored = 0
+
+    def consume(self, event: Dict[str, Any]) -> None:
+        counts = event_counts(event)
+        if not counts:
+            self.ignored += 1
+            return
+        if self.counters.add(parse_timestamp(event["ts"]), counts):
+            self.events += 1
+
+    def consume_all(self, events: Iterable[Dict[str, Any]]) -> None:
+        for event in events:
+            self.consume(event)
+
+    def metrics(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Current ``{"pr": {...}, "dep": {...}}``; ``now`` first advances the window."""
+        if now is not None:
+            self.counters.advance(now)
+        total = self.counters.total
+        pr: Dict[str, float] = {}
+        merged = total("merged")
+        if merged:
+            pr.update(
+                RR=clip(ratio(total("reviewed"), merged)),
+                DV=clip(merged / self.target_merges),
+                RB=clip(ratio(total("reverted"), merged)),
+            )
+        if total("risk_count"):
+            pr["risk"] = clip(ratio(total("risk_sum"), total("risk_count")))
+        if total("ci_runs"):
+            pr["CI"] = clip(ratio(total("ci_ok"), total("ci_runs")))
+        pr = {key: pr[key] for key in PR_KEYS if key in pr}
+
+        dep: Dict[str, float] = {}
+        deploys = total("deploys")
+        if deploys:
+            dep.update(
+                SR=clip(ratio(total("deploys_ok"), deploys)),
+                CFR=clip(ratio(total("incidents"), deploys)),
+                RBK=clip(ratio(total("rollbacks"), deploys)),
+                PRG=clip(ratio(total("perf_regressions"), deploys)),
+            )
+        if total("restore_count"):
+            dep["MT"] = clip(ratio(total("restore_sum"), total("restore_count")) / self.restore_scale)
+        if deploys or total("incidents"):
+            budget = (1.0 - self.slo) * self.counters.window / 60.0
+            dep["EB"] = clip(ratio(total("downtime"), budget))
+        return {"pr": pr, "dep": {key: dep[key] for key in DEP_KEYS if key in dep}}
+
+
+def iter_events(reader: TextIO) -> Iterator[Dict[str, Any]]:
+    for lineno, line in enumerate(reader, 1):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+            if not isinstance(event, dict) or "ts" not in event:
+                raise ValueError("expected an object with a 'ts' field")
+            parse_timestamp(event["ts"])
+            event_counts(event)  # numeric fields
+        except ValueError as exc:
+            warn(f"line {lineno}: skipped ({exc})")
+            continue
+        yield event
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rolling-window PR/deploy metrics from a JSONL event stream")
+    parser.add_argument("events", help="Events JSONL file ('-' for stdin)")
+    parser.add_argument("--window", type=parse_duration, default=DEFAULT_WINDOW, help="Window length (default 30d)")
+    parser.add_argument("--buckets", type=int, default=DEFAULT_BUCKETS, help="Time buckets per window (default 30)")
+    parser.add_argument("--now", help="End the window here (ISO 8601 or Unix seconds) instead of at the last event")
+    parser.add_argument("--target-merges", type=float, default=DEFAULT_TARGET_MERGES,
+                        help="Merged PRs per window that count as full delivery velocity (pr.DV)")
+    parser.add_argument("--restore-scale", type=parse_duration, default=DEFAULT_RESTORE_SCALE * 60,
+                        help="Restore time that maps to dep.MT = 1 (default 24h)")
+    parser.add_argument("--slo", type=float, default=DEFAULT_SLO, help="Availability SLO for dep.EB (default 0.999)")
+    parser.add_argument("--emit-every", type=parse_duration,
+                        help="Write a JSONL snapshot each time event time passes this interval")
+    parser.add_argument("--pr-out", help="Also write the pr metrics here (input for collect_metrics.py --pr)")
+    parser.add_argument("--dep-out", help="Also write the dep metrics here (input for collect_metrics.py --dep)")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    if args.now is not None:
+        try:
+            args.now = parse_timestamp(args.now)
+        except ValueError as exc:
+            parser.error(f"--now: {exc}")
+    return args
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    args = parse_args(argv)
+    aggregator = EventAggregator(
+        args.window, args.buckets, target_merges=args.target_merges, restore_scale=args.restore_scale / 60.0,
+        slo=args.slo,
+    )
+    reader = sys.stdin if args.events == "-" else open(args.events, encoding="utf-8")
+    try:
+        if args.emit_every:
+            next_emit: Optional[float] = None
+            for event in iter_events(reader):
+                ts = parse_timestamp(event["ts"])
+                while next_emit is not None and ts >= next_emit:
+                    snapshot = aggregator.metrics(next_emit)
+                    sys.stdout.write(json.dumps({"ts": _iso(next_emit), **snapshot}, separators=(",", ":")) + "\n")
+                    sys.stdout.flush()
+                    next_emit += args.emit_every
+                if next_emit is None:
+                    next_emit = (ts // args.emit_every + 1) * args.emit_every
+                aggregator.consume(event)
+        else:
+            aggregator.consume_all(iter_events(reader))
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+
+    metrics = aggregator.metrics(args.now)
+    if aggregator.counters.dropped:
+        warn(f"dropped {aggregator.counters.dropped} events older than the window")
+    for path, face in ((args.pr_out, "pr"), (args.dep_out, "dep")):
+        if path:
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump(metrics[face], handle, indent=2)
+                handle.write("\n")
+    if args.emit_every:
+        sys.stdout.write(json.dumps(metrics, separators=(",", ":")) + "\n")
+    else:
+        json.dump(metrics, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())